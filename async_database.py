@@ -0,0 +1,273 @@
+"""
+Asyncio interface to the library database.
+
+AsyncDatabaseConnection runs DatabaseConnection methods on a dedicated
+thread pool sized to the connection pool, so coroutines never block the
+event loop. A semaphore bounds how many statements run at once, and
+cancelling a call interrupts the statement it is running.
+
+Usage:
+    async with AsyncDatabaseConnection() as db:
+        books, results = await asyncio.gather(
+            db.get_all_books(), db.search_books("tolkien"))
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DatabaseConnection
+
+
+class _Call:
+    """One DatabaseConnection call, tracking the connection it runs on so it can be interrupted"""
+
+    def __init__(self, db, method, args, kwargs):
+        self.db = db
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.connection = None
+        self.replica = None
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def run(self):
+        if self.cancelled:
+            return None
+        # Hold one pooled connection for the whole call, so it is known here
+        with self.db._pinned(), self.db._tracking(self):
+            self.use(None, None)
+            try:
+                return getattr(self.db, self.method)(*self.args, **self.kwargs)
+            finally:
+                # Cleared before _pinned() gives the connection back to the pool
+                with self._lock:
+                    self.connection = None
+                    self.replica = None
+
+    def use(self, connection, replica):
+        """
+        Note the connection statements run on: a replica's, or else the pinned one
+
+        A replica connection is replaced here, under the lock, before it goes
+        back to its pool.
+        """
+        with self._lock:
+            self.connection = connection or self.db.connection
+            self.replica = replica
+
+    def cancel(self):
+        """Skip the call if it has not started, or interrupt its running statement"""
+        # The lock is held until the interrupt is sent, so the connection
+        # cannot be returned to the pool and handed to another call meanwhile
+        with self._lock:
+            self.cancelled = True
+            if self.connection is not None:
+                self.db.interrupt(self.connection, self.replica)
+
+
+class AsyncDatabaseConnection:
+    """
+    Coroutine versions of the DatabaseConnection operations.
+
+    Always runs in pooled mode. At most max_concurrency calls run at once;
+    further calls wait their turn without holding a thread or a connection.
+    """
+
+    def __init__(self, config_file='config.ini', max_concurrency=None, result_cache=None, prepared=None):
+        """
+        Initialize the connection pool and worker threads
+
+        Args:
+            config_file (str): Path to the configuration file
+            max_concurrency (int, optional): Calls running at once; defaults
+                to the max_size of the [pool] section
+            result_cache (bool, optional): Cache get_all_books and search_books results
+            prepared (bool, optional): Run statements as server-side prepared statements
+        """
+        self.db = DatabaseConnection(
+            config_file=config_file, pooled=True, result_cache=result_cache, prepared=prepared
+        )
+        if max_concurrency is None:
+            max_concurrency = self.db.pool.max_size
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='async-db')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+    async def _run(self, method, *args, **kwargs):
+        """
+        Run a DatabaseConnection method on the worker threads
+
+        Cancelling the awaiting task interrupts the running statement; the
+        worker then gives its connection back to the pool.
+
+        Args:
+            method (str): Name of the DatabaseConnection method
+            *args: Positional arguments for the method
+            **kwargs: Keyword arguments for the method
+
+        Returns:
+            The method's result
+        """
+        async with self._semaphore:
+            call = _Call(self.db, method, args, kwargs)
+            future = asyncio.get_running_loop().run_in_executor(self._executor, call.run)
+            try:
+                return await future
+            except asyncio.CancelledError:
+                call.cancel()
+                raise
+
+    async def get_all_books(self):
+        """Get all books from the database"""
+        return await self._run('get_all_books')
+
+    async def search_books(self, search_term, mode=None):
+        """
+        Search for books by title, author, or genre
+
+        Args:
+            search_term (str): Term to search for
+            mode (str, optional): 'like', 'natural' or 'boolean'
+
+        Returns:
+            list: Matching books or None if error
+        """
+        return await self._run('search_books', search_term, mode=mode)
+
+    async def get_books_page(self, after=None, before=None, page_size=100):
+        """Get one page of books ordered by title and ID, see DatabaseConnection.get_books_page"""
+        return await self._run('get_books_page', after=after, before=before, page_size=page_size)
+
+    async def search_books_page(self, search_term, after=None, before=None, page_size=100, mode=None):
+        """Get one page of matching books, see DatabaseConnection.search_books_page"""
+        return await self._run(
+            'search_books_page', search_term, after=after, before=before, page_size=page_size, mode=mode
+        )
+
+    async def suggest(self, prefix, limit=10):
+        """Suggest titles and author names for a partly typed term, see DatabaseConnection.suggest"""
+        return await self._run('suggest', prefix, limit)
+
+    async def get_book_details(self, book_id):
+        """Get every column of one book, see DatabaseConnection.get_book_details"""
+        return await self._run('get_book_details', book_id)
+
+    async def get_books_details(self, book_ids, batch_size=500):
+        """Get every column of many books, see DatabaseConnection.get_books_details"""
+        return await self._run('get_books_details', book_ids, batch_size)
+
+    async def export_books(self, path, file_format='csv', search_term=None, mode=None, chunk_size=10000,
+                           compression=None):
+        """
+        Stream the books table to a file, see DatabaseConnection.export_books
+
+        Returns:
+            dict: rows, bytes and seconds of the export, or None if error
+        """
+        return await self._run(
+            'export_books', path, file_format=file_format, search_term=search_term, mode=mode,
+            chunk_size=chunk_size, compression=compression
+        )
+
+    async def add_book(self, title, author, genre, publication_year=None, isbn=None):
+        """
+        Add a new book to the database
+
+        Returns:
+            int: ID of the new book or None if error
+        """
+        return await self._run('add_book', title, author, genre, publication_year, isbn)
+
+    async def update_book(self, book_id, title, author, genre, publication_year=None, isbn=None):
+        """
+        Update an existing book
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return await self._run('update_book', book_id, title, author, genre, publication_year, isbn)
+
+    async def delete_book(self, book_id):
+        """
+        Delete a book by ID
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return await self._run('delete_book', book_id)
+
+    async def delete_books(self, book_ids, batch_size=500):
+        """
+        Delete many books in one transaction
+
+        Returns:
+            int: Number of books deleted or None if error
+        """
+        return await self._run('delete_books', book_ids, batch_size)
+
+    async def update_books(self, book_ids, changes, batch_size=500):
+        """
+        Set the same field values on many books in one transaction
+
+        Returns:
+            int: Number of books changed or None if error
+        """
+        return await self._run('update_books', book_ids, changes, batch_size)
+
+    async def checkout_book(self, book_id, borrower, loan_days=None):
+        """
+        Lend one copy to a borrower, see DatabaseConnection.checkout_book
+
+        Returns:
+            int: ID of the new loan, or None if the copy is not available or on error
+        """
+        return await self._run('checkout_book', book_id, borrower, loan_days)
+
+    async def checkout_books(self, book_ids, borrower, loan_days=None):
+        """
+        Lend a stack of copies in one transaction, see DatabaseConnection.checkout_books
+
+        Returns:
+            dict: book_id -> loan ID for the copies lent, or None if error
+        """
+        return await self._run('checkout_books', book_ids, borrower, loan_days)
+
+    async def return_book(self, book_id):
+        """
+        Take a copy back
+
+        Returns:
+            bool: True if the copy was on loan, False otherwise
+        """
+        return await self._run('return_book', book_id)
+
+    async def renew_loan(self, book_id, loan_days=None):
+        """
+        Extend the open loan of a copy, see DatabaseConnection.renew_loan
+
+        Returns:
+            datetime: New due date, or None if the loan cannot be renewed
+        """
+        return await self._run('renew_loan', book_id, loan_days)
+
+    async def get_catalogue_stats(self, top=10):
+        """Get book and availability counts by genre, author and decade, see DatabaseConnection.get_catalogue_stats"""
+        return await self._run('get_catalogue_stats', top)
+
+    async def get_stat_count(self, dimension, value):
+        """Get the counts of one genre, author or decade, see DatabaseConnection.get_stat_count"""
+        return await self._run('get_stat_count', dimension, value)
+
+    async def close(self):
+        """Wait for running calls to finish, then close every pooled connection"""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        self.db.close()
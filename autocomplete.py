@@ -0,0 +1,298 @@
+"""
+In-process prefix index for search box suggestions.
+
+Every word of a book's title and author name starts a key: the folded
+text from that word on, so "tolk" suggests "J.R.R. Tolkien" and "of the r"
+suggests "The Lord of the Rings". Keys live in one sorted list, and a
+prefix lookup is a bisect followed by a scan of the matching range.
+
+Suggestions are ranked by popularity, the number of books sharing the
+title or author, then by recency, the newest such book. Prefixes that
+match many keys ("a", "the") would take milliseconds to rank, so their top
+suggestions are memoized and patched on each write.
+"""
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import nlargest
+from itertools import groupby
+
+from book_index import BookIndex
+from text_fold import fold_text
+
+# Suggestion kinds, in the order the GUI labels them
+KINDS = ('title', 'author')
+
+# Keys are cut to this many characters; longer prefixes are checked in full
+KEY_LENGTH = 24
+
+# Prefixes this short are ranked when the index is built
+MEMO_PREFIX_LENGTH = 2
+
+# Longer prefixes are memoized once they match this many keys
+MEMO_MIN_KEYS = 1000
+
+_WORD_START = re.compile(r'\w+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(text):
+    """Fold case and accents and collapse whitespace, keeping a trailing space"""
+    return _SPACES.sub(' ', fold_text(text).lstrip())
+
+
+def word_starts(folded):
+    """Every suffix of a normalized text that starts at a word"""
+    return [folded[match.start():] for match in _WORD_START.finditer(folded)]
+
+
+class Autocompleter(BookIndex):
+    """
+    Sorted prefix index over book titles and author names.
+
+    A suggestion is one distinct (kind, normalized text) pair. _keys and
+    _ids are parallel lists sorted by key, holding one entry per word start
+    of each suggestion, so a book only adds entries when its title or
+    author is new to the catalogue.
+    """
+
+    def __init__(self, overlap=2.0, memo_size=20):
+        """
+        Args:
+            overlap (float): Seconds each refresh re-reads before the previous
+                marker, to pick up transactions that committed late
+            memo_size (int): Suggestions kept for each memoized prefix, the
+                largest limit suggest() answers from the memo
+        """
+        super().__init__(overlap)
+        self.memo_size = memo_size
+        self._keys = []
+        self._ids = array('I')
+        # Per suggestion ID: kind, display text, normalized text, book count, newest book ID
+        self._suggestions = []
+        self._by_text = {}
+        self._free = []
+        # book_id -> (title suggestion ID, author suggestion ID)
+        self._books = {}
+        self._memo = {}
+
+    def __len__(self):
+        return len(self._books)
+
+    def _rank(self, suggestion_id):
+        """Sort key of a suggestion, larger is better"""
+        entry = self._suggestions[suggestion_id]
+        return entry[3], entry[4]
+
+    # Building
+    def build(self, rows):
+        """
+        Replace the index contents
+
+        Args:
+            rows (iterable): (book_id, title, author, genre) tuples
+        """
+        suggestions = []
+        by_text = {}
+        books = {}
+        for book_id, title, author, _ in rows:
+            ids = []
+            for kind, value in zip(KINDS, (title, author)):
+                folded = normalize(value)
+                suggestion_id = by_text.get((kind, folded))
+                if suggestion_id is None:
+                    suggestion_id = by_text[(kind, folded)] = len(suggestions)
+                    suggestions.append([kind, value, folded, 0, 0])
+                entry = suggestions[suggestion_id]
+                entry[3] += 1
+                if book_id > entry[4]:
+                    entry[1], entry[4] = value, book_id
+                ids.append(suggestion_id)
+            books[book_id] = tuple(ids)
+
+        entries = sorted(
+            (key[:KEY_LENGTH], suggestion_id)
+            for suggestion_id, entry in enumerate(suggestions)
+            for key in word_starts(entry[2])
+        )
+        with self._lock:
+            self._suggestions = suggestions
+            self._by_text = by_text
+            self._free = []
+            self._books = books
+            self._keys = [key for key, _ in entries]
+            self._ids = array('I', (suggestion_id for _, suggestion_id in entries))
+            self._memo = self._build_memo()
+
+    def _build_memo(self):
+        """Top suggestions of every short prefix, in one pass over the keys"""
+        # Each group of keys sharing their first two characters is ranked once,
+        # and a one-character prefix merges the top lists of its groups
+        memo = {}
+        groups = {}
+        position = 0
+        for head, keys in groupby(self._keys, key=lambda key: key[:MEMO_PREFIX_LENGTH]):
+            end = position + sum(1 for _ in keys)
+            top = nlargest(self.memo_size, set(self._ids[position:end]), key=self._rank)
+            groups.setdefault(head[:1], []).extend(top)
+            if len(head) == MEMO_PREFIX_LENGTH:
+                memo[head] = top
+            position = end
+        for head, candidates in groups.items():
+            memo[head] = nlargest(self.memo_size, set(candidates), key=self._rank)
+        return memo
+
+    # Incremental updates
+    def add(self, book_id, title, author, genre):
+        """Index a book, replacing any previous version of it"""
+        with self._lock:
+            old = self._books.get(book_id)
+            if old is not None and all(
+                self._suggestions[suggestion_id][2] == normalize(value)
+                for suggestion_id, value in zip(old, (title, author))
+            ):
+                # Refreshes re-read unchanged books, their counts stay as they are
+                return
+            new = (self._acquire('title', title, book_id), self._acquire('author', author, book_id))
+            self._books[book_id] = new
+            if old is not None:
+                for suggestion_id in old:
+                    self._release(suggestion_id)
+
+    def update(self, book_id, title, author, genre):
+        """Re-index a book that is already indexed; unknown IDs are ignored"""
+        with self._lock:
+            if book_id in self._books:
+                self.add(book_id, title, author, genre)
+
+    def remove(self, book_id):
+        """Drop a book from the index"""
+        with self._lock:
+            old = self._books.pop(book_id, None)
+            if old is not None:
+                for suggestion_id in old:
+                    self._release(suggestion_id)
+
+    def _acquire(self, kind, value, book_id):
+        """Count one more book for a suggestion, adding it if it is new"""
+        folded = normalize(value)
+        suggestion_id = self._by_text.get((kind, folded))
+        if suggestion_id is None:
+            entry = [kind, value, folded, 0, 0]
+            if self._free:
+                suggestion_id = self._free.pop()
+                self._suggestions[suggestion_id] = entry
+            else:
+                suggestion_id = len(self._suggestions)
+                self._suggestions.append(entry)
+            self._by_text[(kind, folded)] = suggestion_id
+            for key in word_starts(folded):
+                key = key[:KEY_LENGTH]
+                index = bisect_right(self._keys, key)
+                self._keys.insert(index, key)
+                self._ids.insert(index, suggestion_id)
+        entry = self._suggestions[suggestion_id]
+        entry[3] += 1
+        if book_id >= entry[4]:
+            entry[1], entry[4] = value, book_id
+        self._promote(suggestion_id)
+        return suggestion_id
+
+    def _release(self, suggestion_id):
+        """Count one book less for a suggestion, dropping it when none is left"""
+        entry = self._suggestions[suggestion_id]
+        entry[3] -= 1
+        # The newest book ID may now be gone too; keeping it only favours the
+        # suggestion until its next write, which is harmless for ranking
+        self._demote(suggestion_id)
+        if entry[3] > 0:
+            return
+        del self._by_text[(entry[0], entry[2])]
+        for key in word_starts(entry[2]):
+            key = key[:KEY_LENGTH]
+            index = bisect_left(self._keys, key)
+            while self._ids[index] != suggestion_id:
+                index += 1
+            del self._keys[index]
+            del self._ids[index]
+        self._suggestions[suggestion_id] = None
+        self._free.append(suggestion_id)
+
+    def _memo_heads(self, suggestion_id):
+        """The memoized prefixes a suggestion appears under"""
+        heads = set()
+        for key in word_starts(self._suggestions[suggestion_id][2]):
+            heads.update(key[:length] for length in range(1, min(len(key), KEY_LENGTH) + 1))
+        return heads.intersection(self._memo)
+
+    def _promote(self, suggestion_id):
+        """Move a suggestion whose rank went up into the memo lists it now belongs to"""
+        rank = self._rank(suggestion_id)
+        for head in self._memo_heads(suggestion_id):
+            top = self._memo[head]
+            if suggestion_id in top:
+                top.remove(suggestion_id)
+            elif len(top) >= self.memo_size and rank <= self._rank(top[-1]):
+                continue
+            index = 0
+            while index < len(top) and self._rank(top[index]) >= rank:
+                index += 1
+            top.insert(index, suggestion_id)
+            del top[self.memo_size:]
+
+    def _demote(self, suggestion_id):
+        """Forget the memo lists of a suggestion whose rank went down"""
+        # Whatever should replace it is unknown, so the list is rebuilt on demand
+        for head in self._memo_heads(suggestion_id):
+            if suggestion_id in self._memo[head]:
+                del self._memo[head]
+
+    # Lookup
+    def _scan(self, prefix, limit):
+        """
+        Rank the suggestions under a prefix by scanning its range of keys
+
+        Returns:
+            tuple: (suggestion IDs, best first; number of keys scanned)
+        """
+        start = bisect_left(self._keys, prefix[:KEY_LENGTH])
+        end = bisect_right(self._keys, prefix[:KEY_LENGTH] + '\U0010ffff', start)
+        candidates = set(self._ids[start:end])
+        if len(prefix) > KEY_LENGTH:
+            # Keys were cut short, check the whole text
+            candidates = {
+                suggestion_id for suggestion_id in candidates
+                if any(key.startswith(prefix) for key in word_starts(self._suggestions[suggestion_id][2]))
+            }
+        return nlargest(limit, candidates, key=self._rank), end - start
+
+    def suggest(self, prefix, limit=10):
+        """
+        Suggest titles and author names for a partly typed search term
+
+        Args:
+            prefix (str): Text typed so far; matched case- and accent-
+                insensitively against the start of any word
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            list: (kind, text, book_count) tuples, most popular first, where
+            kind is 'title' or 'author'
+        """
+        prefix = normalize(prefix)
+        if not prefix.strip() or limit < 1:
+            return []
+        with self._lock:
+            memoizable = limit <= self.memo_size and len(prefix) <= KEY_LENGTH
+            top = self._memo.get(prefix) if memoizable else None
+            if top is None:
+                top, scanned = self._scan(prefix, self.memo_size if memoizable else limit)
+                # Few prefixes match this many keys, which bounds the memo's size
+                if memoizable and (scanned >= MEMO_MIN_KEYS or len(prefix) <= MEMO_PREFIX_LENGTH):
+                    self._memo[prefix] = top
+            top = top[:limit]
+            return [
+                (self._suggestions[suggestion_id][0], self._suggestions[suggestion_id][1],
+                 self._suggestions[suggestion_id][3])
+                for suggestion_id in top
+            ]
@@ -0,0 +1,497 @@
+"""
+Storage backends for DatabaseConnection.
+
+A backend opens connections and supplies the few pieces of SQL that differ
+between database engines. Connections follow the mysql.connector interface
+(cursor(), commit(), rollback(), start_transaction(), in_transaction, ...),
+and statements use %s placeholders whichever backend runs them.
+
+- MySQLBackend talks to a MySQL server through mysql.connector.
+- SQLiteBackend runs an embedded SQLite database file in WAL mode, with the
+  schema from schema_sqlite.sql and an FTS5 index for the FULLTEXT modes.
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+from text_fold import fold_ascii_case, fold_text
+
+try:
+    import mysql.connector
+except ImportError:
+    # Only the mysql backend needs the driver
+    mysql = None
+
+
+class BackendError(Exception):
+    """Error raised by the SQLite backend and the connection pool"""
+
+    def __init__(self, msg=None, errno=None):
+        super().__init__(msg)
+        self.msg = msg
+        self.errno = errno
+
+
+class PoolError(BackendError):
+    """No pooled connection could be checked out"""
+
+
+class OperationalError(BackendError):
+    """The database could not run the statement, e.g. it is locked"""
+
+
+class IntegrityError(BackendError):
+    """A constraint was violated"""
+
+
+class TransactionError(BackendError):
+    """A transaction block was rolled back because one of its statements failed"""
+
+
+# Every error a backend can raise, for use in except clauses
+Error = (BackendError, mysql.connector.Error) if mysql else (BackendError,)
+
+BACKENDS = ('mysql', 'sqlite')
+
+
+def create_backend(name):
+    """
+    Create a backend by name
+
+    Args:
+        name (str): One of BACKENDS
+
+    Returns:
+        Backend: The backend
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    if name == 'mysql':
+        return MySQLBackend()
+    if name == 'sqlite':
+        return SQLiteBackend()
+    raise ValueError(f"Unknown database backend '{name}', expected one of {BACKENDS}")
+
+
+class Backend:
+    """The engine-specific parts of DatabaseConnection"""
+
+    name = None
+    # Statement returning the server time, used as a change marker
+    now_sql = None
+    # Statement returning the ID generated by the last INSERT on the connection
+    last_insert_id_sql = None
+    # Folds text the way LIKE compares it, so in-process matching finds the same rows
+    like_fold = staticmethod(fold_text)
+
+    def connect(self, **kwargs):
+        """
+        Open a connection
+
+        Args:
+            **kwargs: Connection settings from the [database] section, plus
+                autocommit for pooled connections
+
+        Returns:
+            A connection with the mysql.connector connection interface
+        """
+        raise NotImplementedError
+
+    def interrupt(self, connection, **kwargs):
+        """
+        Abort the statement a connection is running, from another thread
+
+        Args:
+            connection: Connection opened by this backend
+            **kwargs: Connection settings, for backends that need a second
+                connection to send the interrupt
+        """
+        raise NotImplementedError
+
+    def explain_sql(self, query):
+        """
+        Build the statement that shows a query's plan
+        
+        Args:
+            query (str): Statement to explain, with its %s placeholders
+
+        Returns:
+            str: Statement returning the plan rows
+        """
+        raise NotImplementedError
+
+    def plan_problems(self, plan):
+        """
+        Find the costly steps in a query plan
+
+        Args:
+            plan (list): Rows returned by explain_sql, as dicts
+
+        Returns:
+            list: (problem, table) tuples, where problem is 'full scan' (reading
+            every row of a table, or of an index that does not cover the
+            query), 'filesort' or 'temporary'
+        """
+        raise NotImplementedError
+
+    def fulltext_condition(self, mode):
+        """
+        Build a WHERE condition matching books against the FULLTEXT index
+
+        Args:
+            mode (str): 'natural' or 'boolean'
+
+        Returns:
+            str: SQL condition taking the search string as its one %s parameter
+        """
+        raise NotImplementedError
+
+    def fulltext_search_sql(self, mode):
+        """
+        Build a query for the books matching the FULLTEXT index, best matches first
+
+        Args:
+            mode (str): 'natural' or 'boolean'
+
+        Returns:
+            tuple: (query, count) where the query selects book_id, title,
+            author and genre, and takes the search string count times
+        """
+        raise NotImplementedError
+
+    def fulltext_query(self, search_term, words, mode):
+        """
+        Build the search string for fulltext_condition
+
+        Args:
+            search_term (str): Term typed by the user
+            words (list): Words of the term long enough to be indexed
+            mode (str): 'natural' or 'boolean'
+
+        Returns:
+            str: The search string, or None if nothing in the term can be searched
+        """
+        raise NotImplementedError
+
+
+class MySQLBackend(Backend):
+    """MySQL server through mysql.connector"""
+
+    name = 'mysql'
+    now_sql = "SELECT NOW(6)"
+    last_insert_id_sql = "SELECT LAST_INSERT_ID()"
+
+    def __init__(self):
+        if mysql is None:
+            raise ImportError("The mysql backend needs mysql-connector-python: pip install mysql-connector-python")
+
+    def connect(self, **kwargs):
+        return mysql.connector.connect(**kwargs)
+
+    def interrupt(self, connection, **kwargs):
+        # KILL QUERY stops the statement but keeps the connection open
+        killer = self.connect(**kwargs)
+        try:
+            cursor = killer.cursor()
+            cursor.execute("KILL QUERY %s", (connection.connection_id,))
+            cursor.close()
+        finally:
+            killer.close()
+
+    def explain_sql(self, query):
+        return "EXPLAIN " + query
+
+    def plan_problems(self, plan):
+        problems = []
+        for row in plan:
+            table = row.get('table')
+            extra = row.get('Extra') or ''
+            # 'index' is a full index scan, cheap only when the index covers the query
+            if row.get('type') == 'ALL' or (row.get('type') == 'index' and 'Using index' not in extra):
+                problems.append(('full scan', table))
+            if 'Using filesort' in extra:
+                problems.append(('filesort', table))
+            if 'Using temporary' in extra:
+                problems.append(('temporary', table))
+        return problems
+
+    def fulltext_condition(self, mode):
+        modifier = "IN BOOLEAN MODE" if mode == 'boolean' else "IN NATURAL LANGUAGE MODE"
+        return f"MATCH(title, author, genre) AGAINST (%s {modifier})"
+
+    def fulltext_search_sql(self, mode):
+        condition = self.fulltext_condition(mode)
+        # The repeated MATCH expression is evaluated once by MySQL
+        query = f"""
+            SELECT book_id, title, author, genre
+            FROM books
+            WHERE {condition}
+            ORDER BY {condition} DESC, title
+        """
+        return query, 2
+
+    def fulltext_query(self, search_term, words, mode):
+        if mode == 'natural':
+            return search_term.strip()
+        if not words:
+            return None
+        # Every word must match, as a prefix of an indexed word
+        return " ".join(f"+{word}*" for word in words)
+
+
+# Declared type of the SQLite timestamp columns, read back as datetime
+SQLITE_TIMESTAMP_TYPE = 'DATETIME6'
+
+sqlite3.register_converter(
+    SQLITE_TIMESTAMP_TYPE, lambda value: datetime.fromisoformat(value.decode())
+)
+
+SQLITE_SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_sqlite.sql')
+
+
+# A quoted string or identifier, kept as it is, or a placeholder
+_SQLITE_PLACEHOLDER = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|%s""")
+
+
+@lru_cache(maxsize=1024)
+def _sqlite_sql(query):
+    """Convert %s placeholders outside quotes to SQLite's ?, cached by SQL text"""
+    return _SQLITE_PLACEHOLDER.sub(lambda match: match.group(1) or '?', query)
+
+
+def _sqlite_param(value):
+    """Pass datetimes in the same text form as the timestamp columns"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S.') + f"{value.microsecond // 1000:03d}"
+    return value
+
+
+def _sqlite_error(e):
+    """Wrap an sqlite3 error in the matching BackendError"""
+    if isinstance(e, sqlite3.IntegrityError):
+        return IntegrityError(str(e))
+    if isinstance(e, sqlite3.OperationalError):
+        return OperationalError(str(e))
+    return BackendError(str(e))
+
+
+class SQLiteCursor:
+    """An sqlite3 cursor with the parts of the mysql.connector cursor interface the app uses"""
+
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection.raw.cursor()
+        self.dictionary = dictionary
+        self.rowcount = -1
+        self.lastrowid = None
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    def execute(self, query, params=()):
+        try:
+            self._cursor.execute(_sqlite_sql(query), [_sqlite_param(value) for value in params])
+        except sqlite3.Error as e:
+            raise _sqlite_error(e) from e
+        self.rowcount = self._cursor.rowcount
+        # MySQL reports the first ID of a multi-row insert, SQLite the last
+        if self._cursor.lastrowid and self.rowcount > 1:
+            self.lastrowid = self._cursor.lastrowid - self.rowcount + 1
+        else:
+            self.lastrowid = self._cursor.lastrowid
+
+    def _rows(self, rows):
+        if not self.dictionary:
+            return rows
+        names = self.column_names
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchall(self):
+        return self._rows(self._cursor.fetchall())
+
+    def fetchmany(self, size=1):
+        return self._rows(self._cursor.fetchmany(size))
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    An sqlite3 connection with the mysql.connector connection interface.
+
+    Statements commit on their own unless start_transaction() was called,
+    like a MySQL connection in autocommit mode.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._open = True
+
+    def cursor(self, buffered=None, dictionary=False, prepared=False):
+        # SQLite compiles each statement once per connection anyway
+        return SQLiteCursor(self, dictionary=dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._open and self.raw.in_transaction
+
+    def start_transaction(self):
+        try:
+            self.raw.execute("BEGIN")
+        except sqlite3.Error as e:
+            raise _sqlite_error(e) from e
+
+    def commit(self):
+        try:
+            if self.raw.in_transaction:
+                self.raw.commit()
+        except sqlite3.Error as e:
+            raise _sqlite_error(e) from e
+
+    def rollback(self):
+        try:
+            if self.raw.in_transaction:
+                self.raw.rollback()
+        except sqlite3.Error as e:
+            raise _sqlite_error(e) from e
+
+    def consume_results(self):
+        pass
+
+    def is_connected(self):
+        return self._open
+
+    def close(self):
+        if self._open:
+            self._open = False
+            self.raw.close()
+
+
+class SQLiteBackend(Backend):
+    """
+    Embedded SQLite database file.
+
+    The schema is created on the first connection. Each connection runs in
+    WAL mode, so readers never block the writer, with a larger page cache
+    and memory-mapped reads.
+    """
+
+    name = 'sqlite'
+    now_sql = (
+        "SELECT strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')"
+        f' AS "now [{SQLITE_TIMESTAMP_TYPE}]"'
+    )
+    last_insert_id_sql = "SELECT last_insert_rowid()"
+    # LIKE ignores the case of ASCII letters only, and never accents
+    like_fold = staticmethod(fold_ascii_case)
+
+    def __init__(self):
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def connect(self, database='librarydb.sqlite3', synchronous='NORMAL', cache_size_mb=64,
+                mmap_size_mb=256, busy_timeout=10.0, autocommit=False):
+        """
+        Open a connection to the database file, creating the schema if needed
+
+        Args:
+            database (str): Path of the database file
+            synchronous (str): PRAGMA synchronous; NORMAL is safe in WAL mode
+            cache_size_mb (int): Page cache per connection
+            mmap_size_mb (int): Bytes of the file read through memory mapping
+            busy_timeout (float): Seconds a writer waits for the lock
+            autocommit (bool): Accepted for the pool; statements outside
+                start_transaction() always commit on their own
+
+        Returns:
+            SQLiteConnection: The connection
+        """
+        try:
+            # Pooled connections move between threads, but only one uses them at a time
+            raw = sqlite3.connect(
+                database,
+                timeout=busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+                detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            )
+            raw.execute("PRAGMA journal_mode = WAL")
+            raw.execute(f"PRAGMA synchronous = {synchronous}")
+            raw.execute(f"PRAGMA cache_size = {-int(cache_size_mb * 1024)}")
+            raw.execute(f"PRAGMA mmap_size = {int(mmap_size_mb * 1024 * 1024)}")
+            raw.execute("PRAGMA temp_store = MEMORY")
+            raw.execute("PRAGMA foreign_keys = ON")
+            self._create_schema(raw)
+        except sqlite3.Error as e:
+            raise _sqlite_error(e) from e
+        return SQLiteConnection(raw)
+
+    def interrupt(self, connection, **kwargs):
+        # The running statement fails with OperationalError: interrupted
+        connection.raw.interrupt()
+
+    def _create_schema(self, raw):
+        """
+        Apply schema_sqlite.sql to a new database file, once per backend
+
+        A file that already has the books table is left as it is: later
+        changes are migrations, and re-running the script would bring back
+        what they dropped (idx_title) and wait for any open write.
+        """
+        with self._lock:
+            if self._schema_ready:
+                return
+            exists = raw.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books'").fetchone()
+            if not exists:
+                with open(SQLITE_SCHEMA_FILE, encoding='utf-8') as f:
+                    raw.executescript(f.read())
+            self._schema_ready = True
+
+    def explain_sql(self, query):
+        return "EXPLAIN QUERY PLAN " + query
+
+    def plan_problems(self, plan):
+        problems = []
+        for row in plan:
+            detail = row['detail']
+            words = detail.split()
+            if (words[0] == 'SCAN' and words[1] != 'CONSTANT'
+                    and 'COVERING INDEX' not in detail and 'VIRTUAL TABLE' not in detail):
+                # Older SQLite versions say 'SCAN TABLE books'
+                problems.append(('full scan', words[2] if words[1] == 'TABLE' else words[1]))
+            elif detail.startswith('USE TEMP B-TREE FOR ') and 'ORDER BY' in detail:
+                problems.append(('filesort', None))
+            elif detail.startswith('USE TEMP B-TREE FOR '):
+                problems.append(('temporary', None))
+        return problems
+
+    def fulltext_condition(self, mode):
+        return "book_id IN (SELECT rowid FROM books_fts WHERE books_fts MATCH %s)"
+
+    def fulltext_search_sql(self, mode):
+        # FTS5's rank column is the bm25() score, lower for better matches
+        query = """
+            SELECT books.book_id, books.title, books.author, books.genre
+            FROM books_fts
+            JOIN books ON books.book_id = books_fts.rowid
+            WHERE books_fts MATCH %s
+            ORDER BY books_fts.rank, books.title
+        """
+        return query, 1
+
+    def fulltext_query(self, search_term, words, mode):
+        if not words:
+            return None
+        # Quoting keeps FTS5 operators typed by the user literal
+        if mode == 'natural':
+            return " OR ".join(f'"{word}"' for word in words)
+        return " ".join(f'"{word}"*' for word in words)
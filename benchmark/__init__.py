@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for the library database layer.
+
+generate builds reproducible synthetic catalogues, and run loads one into a
+database (an embedded SQLite file by default), times the DatabaseConnection
+operations and reports the results as JSON.
+"""
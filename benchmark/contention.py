@@ -0,0 +1,215 @@
+"""
+Contention benchmark for checkout and return.
+
+Usage:
+    python -m benchmark.contention
+    python -m benchmark.contention --desks 32 --hot 20 --stack 5 --seconds 30
+    python -m benchmark.contention --config scratch.ini --output contention.json
+
+Every desk is a thread that checks out stacks of copies drawn from a small
+set of popular books and returns them again, so desks keep racing for the
+same rows. The run reports latency and throughput of checkout_books and
+return_book, how many copies were refused because another desk had them,
+and then checks that no copy was ever lent twice. It exits with status 1
+if a copy has two open loans or an availability flag disagrees with the
+loans table.
+
+Migrations are applied first, since the loans and holds tables come from
+migration 4. As with benchmark.run, --config should name a scratch
+database.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from benchmark.generate import CatalogueGenerator
+from benchmark.run import open_database, summarize
+from migrations import MigrationRunner
+
+
+class ContentionBenchmark:
+    """Run desks that race to check out the same copies, then verify the loans"""
+
+    def __init__(self, db, book_ids, desks=8, stack=3, seconds=10.0, seed=42):
+        """
+        Args:
+            db (DatabaseConnection): Pooled database with the circulation tables
+            book_ids (list): The popular copies every desk draws from
+            desks (int): Threads checking out and returning at once
+            stack (int): Copies per checkout_books call
+            seconds (float): How long the desks run
+            seed (int): Random seed; each desk gets its own generator from it
+        """
+        self.db = db
+        self.book_ids = book_ids
+        self.desks = desks
+        self.stack = stack
+        self.seconds = seconds
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._checkouts = []
+        self._returns = []
+        self._counts = {'requested': 0, 'lent': 0, 'refused': 0, 'returned': 0, 'errors': 0}
+
+    def _desk(self, desk, deadline):
+        rng = random.Random(self.seed + desk)
+        borrower = f"desk-{desk}"
+        on_loan = []
+        checkouts = []
+        returns = []
+        counts = dict.fromkeys(self._counts, 0)
+        while time.perf_counter() < deadline:
+            if on_loan and rng.random() < 0.5:
+                book_id = on_loan.pop(rng.randrange(len(on_loan)))
+                start = time.perf_counter()
+                returned = self.db.return_book(book_id)
+                returns.append(time.perf_counter() - start)
+                counts['returned' if returned else 'errors'] += 1
+                continue
+            stack = rng.sample(self.book_ids, min(self.stack, len(self.book_ids)))
+            start = time.perf_counter()
+            loans = self.db.checkout_books(stack, borrower)
+            checkouts.append(time.perf_counter() - start)
+            counts['requested'] += len(stack)
+            if loans is None:
+                counts['errors'] += 1
+                continue
+            on_loan.extend(loans)
+            counts['lent'] += len(loans)
+            counts['refused'] += len(stack) - len(loans)
+        with self._lock:
+            self._checkouts.extend(checkouts)
+            self._returns.extend(returns)
+            for name, count in counts.items():
+                self._counts[name] += count
+
+    def run(self):
+        """
+        Run the desks for the configured time
+
+        Returns:
+            dict: checkout_books and return_book latency summaries, copy counts
+            and checkouts per minute
+        """
+        deadline = time.perf_counter() + self.seconds
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._desk, args=(desk, deadline), name=f"desk-{desk}")
+            for desk in range(self.desks)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return {
+            'operations': {
+                'checkout_books': summarize(self._checkouts),
+                'return_book': summarize(self._returns),
+            },
+            'copies': dict(self._counts),
+            'checkouts_per_min': round(self._counts['lent'] / elapsed * 60, 1) if elapsed else 0.0,
+            'seconds': round(elapsed, 3),
+        }
+
+    def verify(self):
+        """
+        Check the circulation invariants after a run
+
+        Returns:
+            dict: Copies with more than one open loan, and copies whose
+            available flag disagrees with their open loans
+
+        Raises:
+            RuntimeError: If the checks cannot be read
+        """
+        doubles = self.db.execute_query("""
+            SELECT book_id FROM loans
+            WHERE returned_at IS NULL
+            GROUP BY book_id
+            HAVING COUNT(*) > 1
+        """)
+        placeholders = ", ".join(["%s"] * len(self.book_ids))
+        mismatched = self.db.execute_query(f"""
+            SELECT b.book_id FROM books b
+            LEFT JOIN loans l ON l.book_id = b.book_id AND l.returned_at IS NULL
+            WHERE b.book_id IN ({placeholders})
+            AND ((b.available = 1 AND l.loan_id IS NOT NULL) OR (b.available = 0 AND l.loan_id IS NULL))
+        """, tuple(self.book_ids))
+        if doubles is None or mismatched is None:
+            raise RuntimeError("Verifying the loans failed, see the error printed above")
+        return {
+            'double_loans': [row[0] for row in doubles],
+            'flag_mismatches': [row[0] for row in mismatched],
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark concurrent checkout and return of popular copies.")
+    parser.add_argument('--desks', type=int, default=8, help="Desks (threads) running at once")
+    parser.add_argument('--hot', type=int, default=50, help="Popular copies the desks compete for")
+    parser.add_argument('--stack', type=int, default=3, help="Copies per checkout")
+    parser.add_argument('--seconds', type=float, default=10.0, help="How long the desks run")
+    parser.add_argument('--size', type=int, default=10000, help="Books in the synthetic catalogue")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--config', help="Benchmark the database in this config file")
+    parser.add_argument('--output', help="Write the JSON results to this file as well")
+    args = parser.parse_args(argv)
+    args.pooled = True
+    args.cache = False
+
+    started = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    with tempfile.TemporaryDirectory(prefix='library-contention-') as directory:
+        db = open_database(args, directory, pool_size=args.desks)
+        try:
+            if MigrationRunner(db).apply() is None:
+                raise RuntimeError("Applying the migrations failed")
+            if db.add_books_bulk(CatalogueGenerator(args.size, seed=args.seed), return_ids=False) is None:
+                raise RuntimeError("Loading the catalogue failed")
+            rows = db.execute_query("SELECT book_id FROM books WHERE available = 1 ORDER BY book_id LIMIT %s",
+                                    (args.hot,))
+            if not rows:
+                raise RuntimeError("No available books to lend")
+            benchmark = ContentionBenchmark(
+                db, [row[0] for row in rows], desks=args.desks, stack=args.stack,
+                seconds=args.seconds, seed=args.seed
+            )
+            results = benchmark.run()
+            violations = benchmark.verify()
+        finally:
+            db.close()
+
+    output = json.dumps({
+        'settings': {
+            'backend': db.backend.name,
+            'desks': args.desks,
+            'hot': args.hot,
+            'stack': args.stack,
+            'seconds': args.seconds,
+            'size': args.size,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'started': started,
+        },
+        **results,
+        'violations': violations,
+    }, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+
+    for name, book_ids in violations.items():
+        if book_ids:
+            print(f"Invariant broken, {name}: {book_ids}", file=sys.stderr)
+    return 1 if any(violations.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+Synthetic catalogue generator.
+
+Books are generated lazily and reproducibly from a seed. Authors, genres
+and title words follow Zipf-like distributions, so a few authors and
+genres dominate the catalogue and most appear only rarely, as in a real
+library. Usage:
+
+    python -m benchmark.generate 100000 --output books.csv
+    python -m benchmark.generate 1000000 --format jsonl --seed 7 > books.jsonl
+
+The files can be loaded with import_books.py.
+"""
+import argparse
+import csv
+import itertools
+import json
+import random
+import sys
+
+from database import BOOK_FIELDS
+
+FIRST_NAMES = (
+    "Ada", "Alan", "Alice", "Amara", "Anna", "Boris", "Carmen", "Chen", "Clara", "Daniel",
+    "Diego", "Elena", "Emil", "Farah", "Felix", "Grace", "Hana", "Henrik", "Ines", "Ivan",
+    "James", "Jia", "Jonas", "Karin", "Kofi", "Lars", "Leila", "Lucia", "Malik", "Maria",
+    "Mei", "Nadia", "Nikolai", "Noor", "Olga", "Omar", "Paula", "Pedro", "Priya", "Rafael",
+    "Rosa", "Sakura", "Samuel", "Sofia", "Tomas", "Uma", "Victor", "Wen", "Yusuf", "Zara",
+)
+
+LAST_NAMES = (
+    "Abbott", "Adeyemi", "Alvarez", "Andersen", "Bauer", "Becker", "Brontë", "Castillo", "Chopra",
+    "Costa", "Dubois", "Eriksson", "Fischer", "Garcia", "Hansen", "Hoffmann", "Ibrahim", "Ito",
+    "Jensen", "Kaur", "Kim", "Kowalski", "Larsen", "Lefebvre", "Lindqvist", "Martin", "Moreau",
+    "Müller", "Nakamura", "Nguyen", "Novak", "Okafor", "Olsen", "Park", "Petrov", "Popescu",
+    "Rossi", "Santos", "Schmidt", "Silva", "Smith", "Suzuki", "Tanaka", "Vargas", "Wagner",
+    "Wang", "Weber", "Yamamoto", "Zhang", "Zielinski",
+)
+
+GENRES = (
+    "Fiction", "Mystery", "Romance", "Fantasy", "Science Fiction", "Thriller", "Biography",
+    "History", "Children", "Young Adult", "Horror", "Poetry", "Self-Help", "Travel", "Cooking",
+    "Science", "Philosophy", "Religion", "Art", "Music", "Drama", "Humor", "Politics",
+    "Economics", "Psychology", "Health", "Sports", "Nature", "Graphic Novel", "Dystopian",
+    "Gothic Fiction", "Classics", "Short Stories", "Essays", "Memoir", "True Crime",
+    "Mathematics", "Computing", "Law", "Reference",
+)
+
+TITLE_WORDS = (
+    "Night", "House", "River", "Garden", "Winter", "Shadow", "Light", "City", "Sea", "Stone",
+    "Fire", "Queen", "King", "Road", "Dream", "Silence", "Storm", "Forest", "Mirror", "Island",
+    "Song", "Letter", "Secret", "Memory", "Glass", "Iron", "Summer", "Bridge", "Tower", "Moon",
+    "Star", "Journey", "Promise", "Border", "Harvest", "Empire", "Machine", "Clock", "Lantern",
+    "Orchard", "Harbor", "Library", "Map", "Crown", "Wolf", "Raven", "Salt", "Thread", "Compass",
+    "Winds", "Ashes", "Echo", "Labyrinth", "Meadow", "Signal", "Voyage", "Archive", "Frontier",
+    "Origin", "Paradox",
+)
+
+TITLE_PATTERNS = (
+    "The {0}",
+    "The {0} of the {1}",
+    "{0} and {1}",
+    "A {0} in the {1}",
+    "The Last {0}",
+    "{0} {1}",
+    "Beyond the {0}",
+    "The {0}'s {1}",
+)
+
+
+def zipf_weights(count, exponent=1.1):
+    """Cumulative weights where the item at rank r has weight 1 / r**exponent"""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def isbn13(number):
+    """Build a valid ISBN-13 from a 9-digit number"""
+    digits = f"978{number % 10 ** 9:09d}"
+    total = sum(int(digit) * (3 if index % 2 else 1) for index, digit in enumerate(digits))
+    return f"{digits}{(10 - total % 10) % 10}"
+
+
+class CatalogueGenerator:
+    """
+    Reproducible generator of synthetic book records.
+
+    The author pool grows with the catalogue (one author per ~authors_ratio
+    books), so author searches stay selective at every size.
+    """
+
+    def __init__(self, count, seed=42, authors_ratio=20, exponent=1.1):
+        """
+        Args:
+            count (int): Number of books to generate
+            seed (int): Random seed; the same seed gives the same catalogue
+            authors_ratio (int): Average books per author
+            exponent (float): Zipf exponent; higher values skew harder
+        """
+        self.count = count
+        self.seed = seed
+        rng = random.Random(seed)
+
+        author_count = max(1, count // authors_ratio)
+        names = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+        rng.shuffle(names)
+        # Beyond the 2,500 name combinations, add numbered pen names
+        self.authors = [
+            names[index] if index < len(names) else f"{names[index % len(names)]} {index // len(names) + 1}"
+            for index in range(author_count)
+        ]
+        self.genres = list(GENRES)
+        rng.shuffle(self.genres)
+        self.words = list(TITLE_WORDS)
+        rng.shuffle(self.words)
+
+        self._author_weights = zipf_weights(len(self.authors), exponent)
+        self._genre_weights = zipf_weights(len(self.genres), exponent)
+        self._word_weights = zipf_weights(len(self.words), exponent)
+
+    def __iter__(self):
+        """
+        Yield book records in BOOK_FIELDS order
+
+        Yields:
+            tuple: (title, author, genre, publication_year, isbn)
+        """
+        rng = random.Random(self.seed)
+        choices = rng.choices
+        for index in range(self.count):
+            first, second = choices(self.words, cum_weights=self._word_weights, k=2)
+            title = rng.choice(TITLE_PATTERNS).format(first, second)
+            author = choices(self.authors, cum_weights=self._author_weights)[0]
+            genre = choices(self.genres, cum_weights=self._genre_weights)[0]
+            # Recent books are more common than old ones
+            year = int(rng.triangular(1800, 2025, 2020))
+            # 7919 is coprime with 10**9, so ISBNs are unique up to a billion books
+            yield title, author, genre, year, isbn13(index * 7919 + self.seed)
+
+    def common_genre(self):
+        """The most frequent genre, a broad search term"""
+        return self.genres[0]
+
+    def common_word(self):
+        """The most frequent title word, a broad search term"""
+        return self.words[0]
+
+    def rare_author(self):
+        """An author from the tail of the distribution, a selective search term"""
+        return self.authors[-1]
+
+
+def write_csv(books, stream):
+    writer = csv.writer(stream)
+    writer.writerow(BOOK_FIELDS)
+    writer.writerows(books)
+
+
+def write_jsonl(books, stream):
+    for book in books:
+        stream.write(json.dumps(dict(zip(BOOK_FIELDS, book)), ensure_ascii=False) + "\n")
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic book catalogue.")
+    parser.add_argument('count', type=int, help="Number of books")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--format', choices=sorted(WRITERS), default='csv', help="Output format")
+    parser.add_argument('--output', help="Output file (default: standard output)")
+    args = parser.parse_args(argv)
+
+    books = CatalogueGenerator(args.count, seed=args.seed)
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as stream:
+            WRITERS[args.format](books, stream)
+    else:
+        WRITERS[args.format](books, sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
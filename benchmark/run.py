@@ -0,0 +1,313 @@
+"""
+Benchmark DatabaseConnection against a synthetic catalogue.
+
+Usage:
+    python -m benchmark.run --size 100000
+    python -m benchmark.run --size 1000000 --output results.json
+    python -m benchmark.run --size 100000 --baseline results.json
+
+By default the catalogue is loaded into an embedded SQLite database in a
+temporary directory, so no server is needed. --config runs against the
+database in that config file instead; point it at a scratch database,
+since the synthetic books are added to it.
+
+The results are printed as JSON: p50/p95/p99 latency and throughput for
+each operation, plus the settings of the run. --baseline compares against
+an earlier results file and exits with status 1 if an operation regressed.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from benchmark.generate import CatalogueGenerator
+from database import SEARCH_MODES, DatabaseConnection
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a sorted list of samples"""
+    if not samples:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(samples)) - 1)
+    return samples[index]
+
+
+def summarize(samples, rows=None):
+    """
+    Summarize the latencies of one operation
+
+    Args:
+        samples (list): Seconds taken by each call
+        rows (int, optional): Total rows returned by the calls; left out of
+            the summary if not measured
+
+    Returns:
+        dict: Call count, row count if given, p50/p95/p99/mean/max in
+        milliseconds and calls per second
+    """
+    ordered = sorted(samples)
+    total = sum(ordered)
+    summary = {'calls': len(ordered)}
+    if rows is not None:
+        summary['rows'] = rows
+    return {
+        **summary,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+        'mean_ms': round(total / len(ordered) * 1000, 3) if ordered else 0.0,
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        'ops_per_s': round(len(ordered) / total, 1) if total else 0.0,
+    }
+
+
+def time_calls(calls):
+    """
+    Run callables one after another and time each
+
+    Args:
+        calls (iterable): Zero-argument callables
+
+    Returns:
+        tuple: (samples, rows) where rows counts the rows of list results,
+        or is None if no call returned a list
+
+    Raises:
+        RuntimeError: If a call reports failure by returning None or False
+    """
+    samples = []
+    rows = None
+    for call in calls:
+        start = time.perf_counter()
+        result = call()
+        samples.append(time.perf_counter() - start)
+        if result is None or result is False:
+            raise RuntimeError("Benchmarked call failed, see the error printed above")
+        if isinstance(result, list):
+            rows = (rows or 0) + len(result)
+    return samples, rows
+
+
+class Benchmark:
+    """Load a synthetic catalogue and time the DatabaseConnection operations"""
+
+    def __init__(self, db, generator, repeat=20, writes=200, batch_size=1000, search_mode=None, group_size=100):
+        """
+        Args:
+            db (DatabaseConnection): Database to benchmark
+            generator (CatalogueGenerator): Catalogue to load
+            repeat (int): Calls per read operation
+            writes (int): Calls per write operation
+            batch_size (int): Rows per INSERT while loading
+            search_mode (str, optional): search_books mode, defaults to the configured one
+            group_size (int): Writes per commit for add_book_grouped
+        """
+        self.db = db
+        self.generator = generator
+        self.repeat = repeat
+        self.writes = writes
+        self.batch_size = batch_size
+        self.search_mode = search_mode
+        self.group_size = group_size
+        self.rng = random.Random(generator.seed)
+
+    def load(self):
+        """
+        Bulk load the catalogue
+
+        Returns:
+            dict: Rows loaded, seconds taken and rows per second
+        """
+        start = time.perf_counter()
+        loaded = self.db.add_books_bulk(self.generator, batch_size=self.batch_size, return_ids=False)
+        elapsed = time.perf_counter() - start
+        if loaded is None:
+            raise RuntimeError("Loading the catalogue failed")
+        return {
+            'rows': loaded,
+            'seconds': round(elapsed, 3),
+            'rows_per_s': round(loaded / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def run(self):
+        """
+        Time the read and write operations
+
+        Returns:
+            dict: Summary per operation: get_all_books, search_selective,
+            search_broad, add_book, add_book_grouped (in a unit of work),
+            update_book and delete_book
+        """
+        db = self.db
+        id_range = db.execute_query("SELECT MIN(book_id), MAX(book_id) FROM books")
+        if not id_range or id_range[0][0] is None:
+            raise RuntimeError("The books table is empty")
+        first_id, last_id = id_range[0]
+
+        results = {}
+        reads = {
+            'get_all_books': lambda: db.get_all_books(),
+            'search_selective': lambda: db.search_books(self.generator.rare_author(), mode=self.search_mode),
+            'search_broad': lambda: db.search_books(self.generator.common_genre(), mode=self.search_mode),
+        }
+        for name, call in reads.items():
+            # One untimed call warms caches and connections
+            call()
+            results[name] = summarize(*time_calls([call] * self.repeat))
+
+        # ISBNs are unique once migrated, so each write pass gets its own
+        # seed; seeds this close together never share an ISBN
+        seed = self.generator.seed
+        new_books = list(CatalogueGenerator(self.writes, seed=seed + 1))
+        grouped_books = list(CatalogueGenerator(self.writes, seed=seed + 2))
+        updates = list(CatalogueGenerator(self.writes, seed=seed + 3))
+        added = []
+
+        def add(book):
+            book_id = db.add_book(*book)
+            added.append(book_id)
+            return book_id
+
+        results['add_book'] = summarize(*time_calls(lambda book=book: add(book) for book in new_books))
+        # As many inserts again, committed group_size at a time
+        with db.unit_of_work(group_size=self.group_size):
+            results['add_book_grouped'] = summarize(*time_calls(
+                lambda book=book: add(book) for book in grouped_books
+            ))
+
+        targets = [self.rng.randint(first_id, last_id) for _ in updates]
+        results['update_book'] = summarize(*time_calls(
+            lambda book_id=book_id, book=book: db.update_book(book_id, *book)
+            for book_id, book in zip(targets, updates)
+        ))
+
+        # Deleting the books added above leaves the catalogue size unchanged
+        results['delete_book'] = summarize(*time_calls(
+            lambda book_id=book_id: db.delete_book(book_id) for book_id in added
+        ))
+        return results
+
+
+def compare(results, baseline, threshold=0.10, metric='p95_ms'):
+    """
+    Find operations that got slower than in a baseline run
+
+    Args:
+        results (dict): Results of this run
+        baseline (dict): Results of an earlier run
+        threshold (float): Relative slowdown that counts as a regression
+        metric (str): Summary field compared
+
+    Returns:
+        list: (operation, baseline value, current value) for each regression
+    """
+    regressions = []
+    for name, summary in results['operations'].items():
+        before = baseline.get('operations', {}).get(name)
+        if not before or not before.get(metric):
+            continue
+        if summary[metric] > before[metric] * (1 + threshold):
+            regressions.append((name, before[metric], summary[metric]))
+    return regressions
+
+
+def open_database(args, directory, pool_size=None):
+    """
+    Open the database to benchmark, a scratch SQLite file unless --config was given
+
+    Args:
+        args (argparse.Namespace): Parsed options with config, pooled and cache
+        directory (str): Scratch directory for the SQLite file and its config
+        pool_size (int, optional): max_size of the scratch database's pool
+    """
+    config_file = args.config
+    if not config_file:
+        config_file = os.path.join(directory, 'config.ini')
+        with open(config_file, 'w') as f:
+            f.write('[database]\n')
+            f.write('backend = sqlite\n')
+            f.write(f"path = {os.path.join(directory, 'catalogue.sqlite3')}\n")
+            if pool_size:
+                f.write('\n[pool]\n')
+                f.write(f'max_size = {pool_size}\n')
+    return DatabaseConnection(
+        config_file=config_file,
+        pooled=True if args.pooled else None,
+        result_cache=args.cache
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark DatabaseConnection on a synthetic catalogue.")
+    parser.add_argument('--size', type=int, default=10000, help="Books in the synthetic catalogue")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the catalogue")
+    parser.add_argument('--repeat', type=int, default=20, help="Calls per read operation")
+    parser.add_argument('--writes', type=int, default=200, help="Calls per write operation")
+    parser.add_argument('--group-size', type=int, default=100,
+                        help="Writes per commit for add_book_grouped")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Rows per INSERT while loading")
+    parser.add_argument('--config', help="Benchmark the MySQL database in this config file")
+    parser.add_argument('--pooled', action='store_true', help="Use a connection pool")
+    parser.add_argument('--search-mode', choices=SEARCH_MODES, help="search_books mode (default: from the config)")
+    parser.add_argument('--cache', action='store_true', help="Enable the result cache")
+    parser.add_argument('--output', help="Write the JSON results to this file as well")
+    parser.add_argument('--baseline', help="Compare against an earlier results file")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Relative p95 slowdown reported as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    generator = CatalogueGenerator(args.size, seed=args.seed)
+    started = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    with tempfile.TemporaryDirectory(prefix='library-bench-') as directory:
+        db = open_database(args, directory)
+        try:
+            benchmark = Benchmark(db, generator, repeat=args.repeat, writes=args.writes,
+                                  batch_size=args.batch_size, search_mode=args.search_mode,
+                                  group_size=args.group_size)
+            load = benchmark.load()
+            operations = benchmark.run()
+        finally:
+            db.close()
+
+    results = {
+        'settings': {
+            'backend': db.backend.name,
+            'search_mode': args.search_mode or db.search_config['mode'],
+            'size': args.size,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'writes': args.writes,
+            'group_size': args.group_size,
+            'pooled': bool(db.pool),
+            'result_cache': bool(db.result_cache),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'started': started,
+        },
+        'load': load,
+        'operations': operations,
+    }
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, threshold=args.threshold)
+        for name, before, after in regressions:
+            print(f"Regression in {name}: p95 {before} ms -> {after} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Base class for in-process indexes over the books table.
+
+A BookIndex is built once from the whole table and then kept current: a
+DatabaseConnection applies its own writes to it directly, and changes from
+other clients are pulled in through the updated_at change marker and the
+book_deletions tombstones, like CatalogueCache does.
+"""
+import threading
+import time
+from datetime import timedelta
+
+
+class BookIndex:
+    """
+    Load and incremental refresh logic shared by the in-process indexes.
+
+    Subclasses implement build(rows), add(book_id, title, author, genre)
+    and remove(book_id), and guard their own data with self._lock. A
+    subclass that sets full_rows receives every BOOK_ROW_COLUMNS value
+    instead of the first four.
+    """
+
+    full_rows = False
+
+    def __init__(self, overlap=2.0):
+        """
+        Args:
+            overlap (float): Seconds each refresh re-reads before the previous
+                marker, to pick up transactions that committed late
+        """
+        self.overlap = timedelta(seconds=overlap)
+        self.marker = None
+        self.stale = False
+        self.refreshed_at = 0.0
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.marker is not None
+
+    def build(self, rows):
+        """
+        Replace the index contents
+
+        Args:
+            rows (iterable): (book_id, title, author, genre) tuples
+        """
+        raise NotImplementedError
+
+    def add(self, book_id, title, author, genre):
+        """Index a book, replacing any previous version of it"""
+        raise NotImplementedError
+
+    def remove(self, book_id):
+        """Drop a book from the index"""
+        raise NotImplementedError
+
+    def update(self, book_id, title, author, genre):
+        """Re-index a book that is already indexed; unknown IDs are ignored"""
+        raise NotImplementedError
+
+    def _index_rows(self, rows):
+        return rows if self.full_rows else (row[:4] for row in rows)
+
+    def load(self, db):
+        """
+        Build the index from the whole books table
+
+        Args:
+            db (DatabaseConnection): Database to index
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        # Take the marker first so writes made during the load are re-read later
+        marker = db.get_server_time()
+        if marker is None:
+            return False
+        self.build(self._index_rows(db.iter_books_changed_since()))
+        self.marker = marker
+        self.stale = False
+        self.refreshed_at = time.monotonic()
+        return True
+
+    def refresh(self, db):
+        """
+        Apply changes made since the last load or refresh
+
+        Args:
+            db (DatabaseConnection): Indexed database
+
+        Returns:
+            tuple: (changed, deleted) counts, or None if error
+        """
+        if not self.loaded:
+            return (0, 0) if self.load(db) else None
+
+        marker = db.get_server_time()
+        if marker is None:
+            return None
+        since = self.marker - self.overlap
+        changed = list(self._index_rows(db.iter_books_changed_since(since)))
+        deleted = db.get_deleted_book_ids_since(since)
+        if deleted is None:
+            return None
+
+        with self._lock:
+            for row in changed:
+                self.add(*row)
+            # Deletions win over updates read in the same window
+            for book_id in deleted:
+                self.remove(book_id)
+        self.marker = marker
+        self.stale = False
+        self.refreshed_at = time.monotonic()
+        return len(changed), len(deleted)
+
+    def sync(self, db, max_age):
+        """
+        Load the index, or refresh it if it is stale or older than max_age
+
+        Args:
+            db (DatabaseConnection): Indexed database
+            max_age (float): Seconds between refreshes
+
+        Returns:
+            bool: True if the index can be used, False otherwise
+        """
+        # One thread loads or refreshes, the others wait and reuse its work
+        with self._sync_lock:
+            if not self.loaded:
+                return self.load(db)
+            if self.stale or time.monotonic() - self.refreshed_at >= max_age:
+                return self.refresh(db) is not None
+            return True
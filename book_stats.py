@@ -0,0 +1,235 @@
+"""
+In-process summary statistics of the catalogue.
+
+Usage:
+    python book_stats.py
+    python book_stats.py --top 20 --verify
+
+BookStats counts books and available copies per genre, author and
+publication decade. It is a BookIndex: built once from the whole table,
+then kept current by this process's writes and by incremental refreshes,
+never by GROUP BY scans. Looking up one count is a dictionary lookup, and
+a top-N list costs time proportional to the number of distinct values,
+not the number of books.
+
+The command rebuilds the counters from scratch and prints them. --verify
+also runs the GROUP BY queries once and reports any count that differs.
+"""
+import argparse
+import sys
+from heapq import nlargest
+
+from book_index import BookIndex
+from database import STAT_DIMENSIONS, DatabaseConnection
+
+
+def decade_of(publication_year):
+    """First year of the decade, e.g. 1960 for 1967; None if the year is unknown"""
+    return None if publication_year is None else publication_year // 10 * 10
+
+
+class BookStats(BookIndex):
+    """
+    Book and available-copy counts per genre, author and decade.
+
+    Each book's contribution is remembered, so an update moves it from its
+    old genre, author, decade and availability to the new ones, and a
+    refresh that re-reads an unchanged book leaves the counts alone.
+    """
+
+    full_rows = True
+
+    def __init__(self, overlap=2.0):
+        """
+        Args:
+            overlap (float): Seconds each refresh re-reads before the previous
+                marker, to pick up transactions that committed late
+        """
+        super().__init__(overlap)
+        self._counts = {dimension: {} for dimension in STAT_DIMENSIONS}
+        self._totals = [0, 0]
+        # book_id -> (genre, author, decade, available)
+        self._books = {}
+
+    def __len__(self):
+        return len(self._books)
+
+    # Building
+    def build(self, rows):
+        """
+        Replace the counters
+
+        Args:
+            rows (iterable): Rows in BOOK_ROW_COLUMNS order
+        """
+        with self._lock:
+            self._counts = {dimension: {} for dimension in STAT_DIMENSIONS}
+            self._totals = [0, 0]
+            self._books = {}
+            for row in rows:
+                self.add(*row)
+
+    # Incremental updates, callers pass BOOK_ROW_COLUMNS values
+    def add(self, book_id, title, author, genre, publication_year=None, isbn=None, available=None,
+            updated_at=None):
+        """
+        Count a book, replacing any previous version of it
+
+        An unknown availability (None) keeps the book's current one, or
+        counts a new book as available, like the column default.
+        """
+        with self._lock:
+            old = self._books.get(book_id)
+            if available is None:
+                available = old[3] if old is not None else True
+            entry = (genre, author, decade_of(publication_year), bool(available))
+            if entry == old:
+                return
+            if old is not None:
+                self._count(old, -1)
+            self._books[book_id] = entry
+            self._count(entry, 1)
+
+    def update(self, book_id, title, author, genre, publication_year=None, isbn=None, available=None,
+               updated_at=None):
+        """Recount a book that is already counted; unknown IDs are ignored"""
+        with self._lock:
+            if book_id in self._books:
+                self.add(book_id, title, author, genre, publication_year, isbn, available, updated_at)
+
+    def set_available(self, book_id, available):
+        """Move a counted book between available and on loan"""
+        with self._lock:
+            old = self._books.get(book_id)
+            if old is not None and old[3] != available:
+                self._count(old, -1)
+                self._books[book_id] = old[:3] + (available,)
+                self._count(self._books[book_id], 1)
+
+    def remove(self, book_id):
+        """Stop counting a book"""
+        with self._lock:
+            old = self._books.pop(book_id, None)
+            if old is not None:
+                self._count(old, -1)
+
+    def _count(self, entry, step):
+        available = step if entry[3] else 0
+        self._totals[0] += step
+        self._totals[1] += available
+        for dimension, value in zip(STAT_DIMENSIONS, entry):
+            counts = self._counts[dimension]
+            books, available_books = counts.get(value, (0, 0))
+            if books + step:
+                counts[value] = (books + step, available_books + available)
+            else:
+                del counts[value]
+
+    # Lookup
+    def totals(self):
+        """(books, available) over the whole catalogue"""
+        return tuple(self._totals)
+
+    def count(self, dimension, value):
+        """
+        Books and available copies for one genre, author or decade
+
+        Args:
+            dimension (str): One of STAT_DIMENSIONS
+            value: Genre, author, or decade as returned by decade_of
+
+        Returns:
+            tuple: (books, available), (0, 0) if there are none
+        """
+        return self._counts[dimension].get(value, (0, 0))
+
+    def top(self, dimension, limit=10):
+        """
+        The values of a dimension with the most books
+
+        Args:
+            dimension (str): One of STAT_DIMENSIONS
+            limit (int, optional): Number of values; all of them if None
+
+        Returns:
+            list: (value, books, available) tuples, most books first
+        """
+        with self._lock:
+            items = [(value, books, available) for value, (books, available) in self._counts[dimension].items()]
+        if limit is None:
+            return sorted(items, key=lambda item: item[1], reverse=True)
+        return nlargest(limit, items, key=lambda item: item[1])
+
+
+# GROUP BY queries that compute the same counts, used by --verify only
+VERIFY_QUERIES = {
+    'genre': "SELECT genre, COUNT(*), SUM(CASE WHEN available = 1 THEN 1 ELSE 0 END) FROM books GROUP BY genre",
+    'author': "SELECT author, COUNT(*), SUM(CASE WHEN available = 1 THEN 1 ELSE 0 END) FROM books GROUP BY author",
+    'decade': (
+        "SELECT publication_year, COUNT(*), SUM(CASE WHEN available = 1 THEN 1 ELSE 0 END) "
+        "FROM books GROUP BY publication_year"
+    ),
+}
+
+
+def verify(db, stats):
+    """
+    Compare the counters with GROUP BY queries over the books table
+
+    Returns:
+        list: (dimension, value, counted, queried) for every difference, or
+        None if a query failed
+    """
+    differences = []
+    for dimension, query in VERIFY_QUERIES.items():
+        rows = db.execute_query(query)
+        if rows is None:
+            return None
+        expected = {}
+        for value, books, available in rows:
+            if dimension == 'decade':
+                value = decade_of(value)
+            previous = expected.get(value, (0, 0))
+            expected[value] = (previous[0] + books, previous[1] + int(available or 0))
+        for value in set(expected) | set(stats._counts[dimension]):
+            counted = stats.count(dimension, value)
+            if counted != expected.get(value, (0, 0)):
+                differences.append((dimension, value, counted, expected.get(value, (0, 0))))
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild and print the catalogue summary statistics.")
+    parser.add_argument('--config', default='config.ini', help="Database configuration file")
+    parser.add_argument('--top', type=int, default=10, help="Values listed per breakdown")
+    parser.add_argument('--verify', action='store_true', help="Check the counters against GROUP BY queries")
+    args = parser.parse_args(argv)
+
+    db = DatabaseConnection(config_file=args.config, result_cache=False)
+    try:
+        stats = db.rebuild_catalogue_stats()
+        if stats is None:
+            return 1
+        books, available = stats.totals()
+        print(f"{books} books, {available} available")
+        for dimension in STAT_DIMENSIONS:
+            print(f"\nBy {dimension}:")
+            for value, count, available in stats.top(dimension, args.top):
+                label = 'unknown' if value is None else f"{value}s" if dimension == 'decade' else value
+                print(f"  {label:40} {count:8} {available:8}")
+
+        if args.verify:
+            differences = verify(db, stats)
+            if differences is None:
+                return 1
+            for dimension, value, counted, queried in differences:
+                print(f"Mismatch in {dimension} {value!r}: counted {counted}, GROUP BY {queried}")
+            print("\nCounters match the GROUP BY queries" if not differences else "")
+            return 1 if differences else 0
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
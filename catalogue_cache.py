@@ -0,0 +1,331 @@
+"""
+Client-side copy of the books table, kept current with incremental refreshes.
+
+The cache loads the catalogue once, applies writes made through it
+directly, and afterwards only reads rows whose updated_at change marker
+moved, plus the deletion tombstones in book_deletions. A refresh therefore
+costs time proportional to the number of changes, not to the table size.
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import timedelta
+
+from catalogue_snapshot import write_snapshot
+from database import BOOK_ROW_COLUMNS
+
+_ID = BOOK_ROW_COLUMNS.index('book_id')
+_TITLE = BOOK_ROW_COLUMNS.index('title')
+_AUTHOR = BOOK_ROW_COLUMNS.index('author')
+_GENRE = BOOK_ROW_COLUMNS.index('genre')
+
+
+class CatalogueCache:
+    """
+    In-memory catalogue on top of a DatabaseConnection.
+
+    The read methods return rows shaped like DatabaseConnection's
+    (book_id, title, author, genre), so the cache can stand in for it as
+    a data source. Search matches substrings like the 'like' search mode,
+    with text folded the way the backend's LIKE compares it, and books are
+    ordered by their folded title and ID, as the database's case-insensitive
+    collation orders them.
+    """
+
+    def __init__(self, db, overlap=2.0):
+        """
+        Args:
+            db (DatabaseConnection): Database to cache
+            overlap (float): Seconds each refresh re-reads before the previous
+                marker, to pick up transactions that committed late
+        """
+        self.db = db
+        self._fold = db.backend.like_fold
+        self.overlap = timedelta(seconds=overlap)
+        self.marker = None
+        self._rows = {}
+        self._keys = []
+        self._search_text = {}
+        self._lock = threading.RLock()
+
+    @property
+    def loaded(self):
+        return self.marker is not None
+
+    def __len__(self):
+        return len(self._rows)
+
+    # Loading
+    def load(self):
+        """
+        Read the whole books table into the cache
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        # Take the marker first so writes made during the load are re-read later
+        marker = self.db.get_server_time()
+        if marker is None:
+            return False
+
+        rows = {}
+        for row in self.db.iter_books_changed_since():
+            rows[row[_ID]] = row
+
+        with self._lock:
+            self._rows = {}
+            self._search_text = {}
+            for row in rows.values():
+                self._store(row)
+            self._keys = sorted(self._key(row) for row in rows.values())
+            self.marker = marker
+        return True
+
+    def refresh(self):
+        """
+        Apply changes made since the last load or refresh
+
+        Returns:
+            tuple: (changed, deleted) counts, or None if error
+        """
+        if not self.loaded:
+            return (len(self), 0) if self.load() else None
+
+        marker = self.db.get_server_time()
+        if marker is None:
+            return None
+        since = self.marker - self.overlap
+        changed = list(self.db.iter_books_changed_since(since))
+        deleted = self.db.get_deleted_book_ids_since(since)
+        if deleted is None:
+            return None
+
+        with self._lock:
+            for row in changed:
+                self._apply(row)
+            # Deletions win over updates read in the same window
+            for book_id in deleted:
+                self._remove(book_id)
+            self.marker = marker
+        return len(changed), len(deleted)
+
+    def apply_changes(self, events):
+        """
+        Apply events from a change feed, see change_feed.ChangeFeed
+
+        Args:
+            events (list): (operation, book_id, row) events
+
+        Returns:
+            int: Number of events applied; 0 until the cache is loaded, as
+            the load reads the changes anyway
+        """
+        with self._lock:
+            if not self.loaded:
+                return 0
+            for operation, book_id, row in events:
+                if row is None:
+                    self._remove(book_id)
+                else:
+                    self._apply(row)
+        return len(events)
+
+    # Snapshots
+    def restore(self, snapshot):
+        """
+        Load the cache from a CatalogueSnapshot instead of the database
+
+        The next refresh then only reads the changes made after the
+        snapshot's marker, which reconciles the cache with the database.
+
+        Args:
+            snapshot (CatalogueSnapshot): Snapshot written by save_snapshot
+        """
+        with self._lock:
+            self._rows = {}
+            self._search_text = {}
+            for row in snapshot:
+                self._store(row)
+            self._keys = sorted(self._key(row) for row in self._rows.values())
+            self.marker = snapshot.marker
+
+    def save_snapshot(self, path):
+        """
+        Write the cached catalogue to a snapshot file, see catalogue_snapshot.py
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        with self._lock:
+            if not self.loaded:
+                return False
+            rows = [self._rows[book_id] for _, book_id in self._keys]
+            marker = self.marker
+        try:
+            write_snapshot(path, rows, marker, self._fold)
+        except OSError as e:
+            print(f"Error saving catalogue snapshot: {e}")
+            return False
+        return True
+
+    # Internal row bookkeeping, callers hold the lock
+    def _key(self, row):
+        return self._fold(row[_TITLE]), row[_ID]
+
+    def _cursor(self, key):
+        """Sort key of a (title, book_id) page cursor"""
+        return None if key is None else (self._fold(key[0]), key[1])
+
+    def _store(self, row):
+        book_id = row[_ID]
+        self._rows[book_id] = row
+        self._search_text[book_id] = tuple(
+            self._fold(row[column]) for column in (_TITLE, _AUTHOR, _GENRE)
+        )
+
+    def _apply(self, row):
+        old = self._rows.get(row[_ID])
+        if old is not None and old[_TITLE] != row[_TITLE]:
+            self._remove_key(self._key(old))
+        self._store(row)
+        if old is None or old[_TITLE] != row[_TITLE]:
+            insort(self._keys, self._key(row))
+
+    def _remove(self, book_id):
+        old = self._rows.pop(book_id, None)
+        if old is None:
+            return
+        del self._search_text[book_id]
+        self._remove_key(self._key(old))
+
+    def _remove_key(self, key):
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+
+    def _summary(self, key):
+        row = self._rows[key[1]]
+        return (row[_ID], row[_TITLE], row[_AUTHOR], row[_GENRE])
+
+    def _matches(self, key, needle):
+        return any(needle in text for text in self._search_text[key[1]])
+
+    # Reads
+    def get_book(self, book_id):
+        """
+        Get one full cached row
+
+        Returns:
+            tuple: Row in BOOK_ROW_COLUMNS order or None if not cached
+        """
+        return self._rows.get(book_id)
+
+    def get_book_details(self, book_id):
+        """Cached equivalent of DatabaseConnection.get_book_details"""
+        row = self._rows.get(int(book_id))
+        return dict(zip(BOOK_ROW_COLUMNS, row)) if row is not None else None
+
+    def get_books_details(self, book_ids):
+        """Cached equivalent of DatabaseConnection.get_books_details"""
+        with self._lock:
+            rows = [self._rows.get(int(book_id)) for book_id in book_ids]
+        return {row[_ID]: dict(zip(BOOK_ROW_COLUMNS, row)) for row in rows if row is not None}
+
+    def get_all_books(self):
+        """Get all cached books ordered by title"""
+        with self._lock:
+            return [self._summary(key) for key in self._keys]
+
+    def search_books(self, search_term):
+        """Get cached books whose title, author or genre contains search_term"""
+        needle = self._fold(search_term)
+        with self._lock:
+            return [self._summary(key) for key in self._keys if self._matches(key, needle)]
+
+    def _page(self, needle, after, before, page_size):
+        """Collect one keyset page, walking forwards or backwards from a key"""
+        keys = self._keys
+        after, before = self._cursor(after), self._cursor(before)
+        if before is not None and after is None:
+            indexes = range(bisect_left(keys, before) - 1, -1, -1)
+        else:
+            start = bisect_right(keys, after) if after is not None else 0
+            indexes = range(start, len(keys))
+
+        page = []
+        for index in indexes:
+            key = keys[index]
+            if after is not None and before is not None and key >= before:
+                break
+            if needle is None or self._matches(key, needle):
+                page.append(self._summary(key))
+                if len(page) == page_size:
+                    break
+        if before is not None and after is None:
+            page.reverse()
+        return page
+
+    def get_books_page(self, after=None, before=None, page_size=100):
+        """Cached equivalent of DatabaseConnection.get_books_page"""
+        with self._lock:
+            return self._page(None, after, before, page_size)
+
+    def search_books_page(self, search_term, after=None, before=None, page_size=100):
+        """Cached equivalent of DatabaseConnection.search_books_page"""
+        with self._lock:
+            return self._page(self._fold(search_term), after, before, page_size)
+
+    # Writes go to the database first, then straight into the cache
+    def add_book(self, title, author, genre, publication_year=None, isbn=None):
+        """Add a book through the database and cache it; returns the new ID or None"""
+        book_id = self.db.add_book(title, author, genre, publication_year, isbn)
+        if book_id:
+            with self._lock:
+                self._apply((book_id, title, author, genre, publication_year, isbn, True, None))
+        return book_id
+
+    def update_book(self, book_id, title, author, genre, publication_year=None, isbn=None):
+        """Update a book through the database and in the cache; returns True on success"""
+        if not self.db.update_book(book_id, title, author, genre, publication_year, isbn):
+            return False
+        book_id = int(book_id)
+        with self._lock:
+            old = self._rows.get(book_id)
+            available = old[BOOK_ROW_COLUMNS.index('available')] if old else True
+            self._apply((book_id, title, author, genre, publication_year, isbn, available, None))
+        return True
+
+    def delete_book(self, book_id):
+        """Delete a book through the database and from the cache; returns True on success"""
+        if not self.db.delete_book(book_id):
+            return False
+        with self._lock:
+            self._remove(int(book_id))
+        return True
+
+    def delete_books(self, book_ids, batch_size=500, on_batch=None):
+        """Delete many books through the database and from the cache, see DatabaseConnection.delete_books"""
+        # Read twice, by the database and then by the cache
+        book_ids = list(book_ids)
+        deleted = self.db.delete_books(book_ids, batch_size, on_batch)
+        if deleted is not None:
+            with self._lock:
+                for book_id in book_ids:
+                    self._remove(int(book_id))
+        return deleted
+
+    def update_books(self, book_ids, changes, batch_size=500, on_batch=None):
+        """Change fields of many books through the database and in the cache, see DatabaseConnection.update_books"""
+        book_ids = list(book_ids)
+        changed = self.db.update_books(book_ids, changes, batch_size, on_batch)
+        if changed is not None:
+            columns = [(BOOK_ROW_COLUMNS.index(field), value) for field, value in changes.items()]
+            with self._lock:
+                for book_id in book_ids:
+                    old = self._rows.get(int(book_id))
+                    if old is None:
+                        continue
+                    row = list(old)
+                    for column, value in columns:
+                        row[column] = value
+                    self._apply(tuple(row))
+        return changed
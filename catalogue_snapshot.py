@@ -0,0 +1,249 @@
+"""
+On-disk snapshot of the catalogue, for showing the book list before the database answers.
+
+The file is memory-mapped and holds fixed-width records in (title, book_id)
+order, followed by a heap of UTF-8 strings that the records point into.
+Titles are ordered by their folded form, as the database's case-insensitive
+collation orders them; each record points at its folded title too, and the
+header names the fold, so page cursors taken from database rows line up.
+Authors and genres repeat a lot and are stored once each. Opening a
+snapshot reads nothing but its header, and a page of books is found by
+binary search over the records, so showing the first screen takes the
+same time whatever the size of the catalogue.
+
+Rows are tuples in database.BOOK_ROW_COLUMNS order: book_id, title, author,
+genre, publication_year, isbn, available, updated_at. This module only
+uses the standard library and text_fold, so the GUI can import it before
+the database driver.
+"""
+import mmap
+import os
+import struct
+import time
+from datetime import datetime, timedelta
+
+from text_fold import FOLDS, fold_text
+
+MAGIC = b'LIBSNAP2'
+
+# magic, record count, heap offset, saved_at (Unix time), change marker,
+# name of the fold in text_fold.FOLDS
+_HEADER = struct.Struct('<8sIQdq16s')
+
+# book_id, publication_year, available, updated_at, then (offset, length)
+# into the string heap for title, author, genre, isbn and the folded title
+_RECORD = struct.Struct('<IiBqIHIHIHIHIH')
+
+# Stand-ins for NULL in the fixed-width fields
+_NULL_INT = -2 ** 31
+_NULL_BYTE = 255
+_NULL_TIME = -2 ** 63
+_NULL_LENGTH = 0xFFFF
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_micros(value):
+    return _NULL_TIME if value is None else (value - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(value):
+    return None if value == _NULL_TIME else _EPOCH + value * _MICROSECOND
+
+
+def write_snapshot(path, rows, marker, fold=fold_text):
+    """
+    Write a snapshot file, replacing any previous one at path
+
+    Args:
+        path (str): Snapshot file path
+        rows (iterable): Full rows in BOOK_ROW_COLUMNS order, sorted by
+            (fold(title), book_id)
+        marker (datetime): Change marker the rows are current as of
+        fold (callable): One of text_fold.FOLDS, the backend's like_fold
+
+    Returns:
+        int: Number of rows written
+
+    Raises:
+        ValueError: If fold is not one of text_fold.FOLDS
+    """
+    fold_name = next((name for name, function in FOLDS.items() if function is fold), None)
+    if fold_name is None:
+        raise ValueError("Snapshots can only record the folds in text_fold.FOLDS")
+    heap = bytearray()
+    interned = {}
+
+    def string(value):
+        if value is None:
+            return 0, _NULL_LENGTH
+        ref = interned.get(value)
+        if ref is None:
+            data = value.encode('utf-8')
+            ref = interned[value] = (len(heap), len(data))
+            heap.extend(data)
+        return ref
+
+    partial_path = path + '.part'
+    count = 0
+    with open(partial_path, 'wb') as f:
+        f.write(bytes(_HEADER.size))
+        for book_id, title, author, genre, year, isbn, available, updated_at in rows:
+            f.write(_RECORD.pack(
+                book_id,
+                _NULL_INT if year is None else year,
+                _NULL_BYTE if available is None else int(available),
+                _to_micros(updated_at),
+                *string(title), *string(author), *string(genre), *string(isbn), *string(fold(title))
+            ))
+            count += 1
+        heap_offset = f.tell()
+        f.write(heap)
+        f.seek(0)
+        f.write(_HEADER.pack(
+            MAGIC, count, heap_offset, time.time(), _to_micros(marker), fold_name.encode('ascii')
+        ))
+    os.replace(partial_path, path)
+    return count
+
+
+class CatalogueSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+
+    get_books_page and get_all_books return rows shaped like
+    DatabaseConnection's, so a snapshot can stand in as the GUI's data
+    source until the database is reachable.
+    """
+
+    def __init__(self, path):
+        """
+        Map a snapshot file
+
+        Args:
+            path (str): Snapshot file path
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is not a snapshot
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError(f"'{path}' is not a catalogue snapshot")
+        magic, self._count, self._heap, self.saved_at, marker, fold_name = _HEADER.unpack_from(self._map)
+        self._fold = FOLDS.get(fold_name.rstrip(b'\0').decode('ascii', 'replace'))
+        if magic != MAGIC or _HEADER.size + self._count * _RECORD.size != self._heap or self._fold is None:
+            self.close()
+            raise ValueError(f"'{path}' is not a catalogue snapshot")
+        self.marker = _from_micros(marker)
+
+    @classmethod
+    def open(cls, path):
+        """
+        Map a snapshot file if there is a usable one
+
+        Returns:
+            CatalogueSnapshot: The snapshot, or None if missing or unreadable
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring catalogue snapshot: {e}")
+            return None
+
+    def close(self):
+        self._map.close()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def age(self):
+        """Seconds since the snapshot was written"""
+        return time.time() - self.saved_at
+
+    # Decoding
+    def _string(self, offset, length):
+        if length == _NULL_LENGTH:
+            return None
+        start = self._heap + offset
+        return self._map[start:start + length].decode('utf-8')
+
+    def _fields(self, index):
+        return _RECORD.unpack_from(self._map, _HEADER.size + index * _RECORD.size)
+
+    def row(self, index):
+        """The full row at a position in (title, book_id) order"""
+        (book_id, year, available, updated_at, title, title_length, author, author_length,
+         genre, genre_length, isbn, isbn_length, _, _) = self._fields(index)
+        return (
+            book_id,
+            self._string(title, title_length),
+            self._string(author, author_length),
+            self._string(genre, genre_length),
+            None if year == _NULL_INT else year,
+            self._string(isbn, isbn_length),
+            None if available == _NULL_BYTE else available,
+            _from_micros(updated_at),
+        )
+
+    def __iter__(self):
+        return (self.row(index) for index in range(self._count))
+
+    def _summary(self, index):
+        fields = self._fields(index)
+        return (fields[0], self._string(*fields[4:6]), self._string(*fields[6:8]), self._string(*fields[8:10]))
+
+    def _key(self, index):
+        fields = self._fields(index)
+        return self._string(*fields[12:14]), fields[0]
+
+    def _bisect(self, key, right=False):
+        """Like bisect_left (or bisect_right) over the (folded title, book_id) keys of the records"""
+        key = (self._fold(key[0]), key[1])
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            probe = self._key(middle)
+            if probe < key or (right and probe == key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    # Reads
+    def get_books_page(self, after=None, before=None, page_size=100):
+        """
+        Get one page of books in (title, book_id) order, like DatabaseConnection.get_books_page
+
+        Only the records of the page and the binary search probes are decoded.
+
+        Args:
+            after (tuple, optional): (title, book_id) key the page starts after
+            before (tuple, optional): (title, book_id) key the page ends before
+            page_size (int): Maximum rows in the page
+
+        Returns:
+            list: (book_id, title, author, genre) tuples
+        """
+        start = 0
+        end = self._count
+        if after is not None:
+            start = self._bisect(after, right=True)
+        if before is not None:
+            end = self._bisect(before)
+        if before is not None and after is None:
+            # Walking backwards from 'before' gives its closest rows
+            start = max(start, end - page_size)
+        end = min(end, start + page_size)
+        return [self._summary(index) for index in range(start, end)]
+
+    def get_all_books(self):
+        """Get every book in (title, book_id) order"""
+        return [self._summary(index) for index in range(self._count)]
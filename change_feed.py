@@ -0,0 +1,122 @@
+"""
+Live feed of book changes, read from the book_changes log by sequence number.
+
+Triggers on the books table append one book_changes row per insert,
+update and delete (migration 3 in migrations.py). A ChangeFeed remembers
+the last sequence number it delivered and each poll reads only the newer
+log rows, joined to the current book rows. Clients therefore receive
+deltas, and no longer reload the whole table to see another desk's edits.
+"""
+import threading
+import time
+
+# Log codes written by the triggers, and the event names delivered for them
+OPERATIONS = {'I': 'insert', 'U': 'update', 'D': 'delete'}
+
+
+class ChangeFeed:
+    """
+    Poll the change log and deliver batched events.
+
+    Each event is an (operation, book_id, row) tuple. operation is
+    'insert', 'update' or 'delete', and row is the book's current row in
+    BOOK_ROW_COLUMNS order, or None for a delete. The log entries of one
+    book within a batch are merged into a single event.
+
+    MySQL hands out sequence numbers when a statement runs, but
+    transactions commit in any order. A number skipped in the log may
+    belong to a transaction that is still open. Such gaps are re-read for
+    gap_timeout seconds before the feed treats them as rolled back.
+    """
+
+    def __init__(self, db, since, batch_size=500, gap_timeout=10.0):
+        """
+        Args:
+            db (DatabaseConnection): Database to follow
+            since (int): Sequence number already seen; later changes are delivered
+            batch_size (int): Most log rows read per poll
+            gap_timeout (float): Seconds a skipped sequence number is waited for
+        """
+        self.db = db
+        self.seq = since
+        self.batch_size = batch_size
+        self.gap_timeout = gap_timeout
+        # Sequence numbers above self.seq already delivered, and open gaps below them
+        self._seen = set()
+        self._gaps = {}
+        self._lock = threading.Lock()
+        self._stop = None
+
+    def poll(self):
+        """
+        Read the changes logged since the previous poll
+
+        Returns:
+            list: (operation, book_id, row) events, or None if error
+        """
+        with self._lock:
+            rows = self.db.get_changes_since(self.seq, self.batch_size)
+            if rows is None:
+                return None
+            now = time.monotonic()
+
+            events = {}
+            for seq, book_id, operation, *row in rows:
+                if seq in self._seen:
+                    continue
+                self._seen.add(seq)
+                self._gaps.pop(seq, None)
+                previous = events.get(book_id)
+                if row[0] is None or operation == 'D':
+                    # Gone now, whatever the log says happened before
+                    events[book_id] = ('delete', book_id, None)
+                elif previous is not None and previous[0] == 'insert':
+                    # The subscriber has not seen the book yet
+                    events[book_id] = ('insert', book_id, tuple(row))
+                else:
+                    events[book_id] = (OPERATIONS[operation], book_id, tuple(row))
+
+            newest = max(self._seen, default=self.seq)
+            for seq in range(self.seq + 1, newest):
+                if seq not in self._seen:
+                    self._gaps.setdefault(seq, now)
+            for seq, first_missed in list(self._gaps.items()):
+                if now - first_missed > self.gap_timeout:
+                    del self._gaps[seq]
+            # Later polls restart just below the oldest gap still waited for
+            self.seq = min(self._gaps) - 1 if self._gaps else newest
+            self._seen = {seq for seq in self._seen if seq > self.seq}
+
+        if events:
+            self.db._changes_received(list(events))
+        return list(events.values())
+
+    def start(self, callback, interval=2.0):
+        """
+        Poll every interval seconds from a daemon thread
+
+        Args:
+            callback (callable): Called with each non-empty list of events,
+                on the polling thread
+            interval (float): Seconds between polls
+        """
+        self.stop()
+        stop = threading.Event()
+        self._stop = stop
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    events = self.poll()
+                    if events:
+                        callback(events)
+                except Exception as e:
+                    print(f"Error delivering book changes: {e}")
+
+        threading.Thread(target=run, name="change-feed", daemon=True).start()
+
+    def stop(self):
+        """Stop the thread started by start()"""
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
@@ -1,28 +1,778 @@
-import mysql.connector
-from mysql.connector import Error
+from backends import BackendError, Error, PoolError, TransactionError, create_backend
 import configparser
 import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache, partial
+from itertools import islice
+from change_feed import ChangeFeed
+from query_stats import QueryStats
+
+# Writable book columns in the order add_book takes them
+BOOK_FIELDS = ('title', 'author', 'genre', 'publication_year', 'isbn')
+
+# Full book row, as returned by iter_books_changed_since
+BOOK_ROW_COLUMNS = ('book_id',) + BOOK_FIELDS + ('available', 'updated_at')
+
+# 'like' scans with LIKE '%term%'; the others use the FULLTEXT index
+SEARCH_MODES = ('like', 'natural', 'boolean')
+
+# Breakdowns of the catalogue statistics, in the order the GUI shows them
+STAT_DIMENSIONS = ('genre', 'author', 'decade')
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of reusable database connections.
+    
+    Connections are checked for liveness when they are checked out, and idle
+    connections above min_size are closed once they exceed idle_timeout.
+    """
+    
+    def __init__(self, db_config, connect, min_size=1, max_size=5, idle_timeout=300.0, checkout_timeout=10.0):
+        """
+        Initialize the pool and open min_size connections
+        
+        Args:
+            db_config (dict): Keyword arguments for connect
+            min_size (int): Number of connections kept open while idle
+            max_size (int): Maximum number of open connections
+            idle_timeout (float): Seconds an idle connection is kept above min_size
+            checkout_timeout (float): Seconds to wait for a free connection
+            connect (callable): Opens a connection from keyword arguments,
+                e.g. Backend.connect
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self.db_config = db_config
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'creations': 0,
+            'failed_liveness_checks': 0,
+            'evictions': 0,
+        }
+        
+        for _ in range(min_size):
+            self._size += 1
+            try:
+                self._idle.append((self._open(), time.monotonic()))
+            except Error as e:
+                self._size -= 1
+                print(f"Error opening pooled connection: {e}")
+                break
+            
+    def _open(self):
+        """
+        Open a new connection for a slot that has already been reserved
+        
+        Pooled connections run in autocommit mode so that a plain SELECT
+        never leaves a transaction (and a stale snapshot) behind.
+        """
+        connection = self.connect(autocommit=True, **self.db_config)
+        with self._lock:
+            self._stats['creations'] += 1
+        return connection
+    
+    def _discard(self, connection):
+        """Close a connection and release its slot in the pool"""
+        try:
+            connection.close()
+        except Error:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._lock.notify()
+            
+    def _evict_idle(self):
+        """Close idle connections above min_size that exceeded idle_timeout"""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            # The oldest idle connections sit at the left of the deque
+            while (self._idle and self._size - len(expired) > self.min_size
+                   and now - self._idle[0][1] > self.idle_timeout):
+                expired.append(self._idle.popleft()[0])
+            self._stats['evictions'] += len(expired)
+        for connection in expired:
+            self._discard(connection)
+    
+    def get_connection(self):
+        """
+        Check out a live connection, opening a new one if the pool has room
+        
+        Returns:
+            MySQLConnection: A connection that must be given back with release()
+            
+        Raises:
+            PoolError: If no connection becomes free within checkout_timeout
+        """
+        self._evict_idle()
+        deadline = time.monotonic() + self.checkout_timeout
+        waited = False
+        
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+                    
+                if self._idle:
+                    connection, _ = self._idle.pop()
+                elif self._size < self.max_size:
+                    # Reserve the slot now and connect outside the lock
+                    self._size += 1
+                    connection = None
+                else:
+                    if not waited:
+                        self._stats['waits'] += 1
+                        waited = True
+                        wait_start = time.monotonic()
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._lock.wait(remaining):
+                        if not self._idle and self._size >= self.max_size:
+                            self._stats['wait_time'] += time.monotonic() - wait_start
+                            raise PoolError(f"No connection available within {self.checkout_timeout}s")
+                    continue
+                    
+            if connection is None:
+                try:
+                    connection = self._open()
+                except Error:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+            elif not connection.is_connected():
+                # Liveness check failed, drop it and try again
+                with self._lock:
+                    self._stats['failed_liveness_checks'] += 1
+                self._discard(connection)
+                continue
+                
+            with self._lock:
+                self._stats['checkouts'] += 1
+                if waited:
+                    self._stats['wait_time'] += time.monotonic() - wait_start
+            return connection
+            
+    def release(self, connection):
+        """
+        Return a checked out connection to the pool
+        
+        Args:
+            connection (MySQLConnection): Connection obtained from get_connection()
+        """
+        try:
+            # Never hand an open transaction to the next borrower
+            if connection.in_transaction:
+                connection.rollback()
+        except Error:
+            self._discard(connection)
+            return
+            
+        with self._lock:
+            if not self._closed:
+                self._idle.append((connection, time.monotonic()))
+                self._lock.notify()
+                return
+        self._discard(connection)
+        
+    def close(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._lock:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._lock.notify_all()
+        for connection in idle:
+            self._discard(connection)
+            
+    def get_stats(self):
+        """
+        Get a snapshot of the pool statistics
+        
+        Returns:
+            dict: Counters plus the current size, idle and in-use connection counts
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+        return stats
+
+
+class Replica:
+    """A read replica: its connection settings, connection pool and health"""
+
+    def __init__(self, name, db_config, pool):
+        """
+        Args:
+            name (str): Name from the [replica:NAME] config section
+            db_config (dict): Connection settings, for interrupting statements
+            pool (ConnectionPool): Connections to the replica
+        """
+        self.name = name
+        self.db_config = db_config
+        self.pool = pool
+        self.in_flight = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.reads = 0
+        self.errors = 0
+        self.ejections = 0
+
+
+class ReplicaRouter:
+    """
+    Spreads reads over read replicas and ejects the unhealthy ones.
+
+    Each read goes to the healthy replica with the fewest reads in flight,
+    taking turns between equally busy ones. A replica that fails eject_after
+    reads in a row is skipped for eject_for seconds, then gets one read to
+    prove itself again.
+    """
+
+    def __init__(self, replicas, eject_after=3, eject_for=30.0):
+        """
+        Args:
+            replicas (list): Replica objects
+            eject_after (int): Consecutive failed reads before a replica is ejected
+            eject_for (float): Seconds an ejected replica is skipped
+        """
+        if eject_after < 1:
+            raise ValueError("eject_after must be at least 1")
+        self.replicas = replicas
+        self.eject_after = eject_after
+        self.eject_for = eject_for
+        self._turn = 0
+        self._lock = threading.Lock()
+
+    def choose(self, exclude=()):
+        """
+        Pick the replica for the next read and count it as in flight
+
+        Args:
+            exclude (collection): Replicas already tried for this read
+
+        Returns:
+            Replica: The replica, or None if every one is ejected or excluded
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                replica for replica in self.replicas
+                if replica not in exclude and replica.ejected_until <= now
+            ]
+            if not candidates:
+                return None
+            self._turn += 1
+            # Rotating the list first breaks ties between equally busy replicas in turn
+            start = self._turn % len(candidates)
+            replica = min(candidates[start:] + candidates[:start], key=lambda replica: replica.in_flight)
+            replica.in_flight += 1
+            return replica
+
+    def finished(self, replica, ok):
+        """
+        Record the outcome of a read started with choose()
+
+        Args:
+            replica (Replica): Replica that ran the read
+            ok (bool): Whether the read succeeded; None if it was cut short
+                for reasons unrelated to the replica
+        """
+        with self._lock:
+            replica.in_flight -= 1
+            if ok is None:
+                return
+            replica.reads += 1
+            if ok:
+                replica.failures = 0
+                return
+            replica.errors += 1
+            replica.failures += 1
+            if replica.failures >= self.eject_after:
+                replica.ejected_until = time.monotonic() + self.eject_for
+                replica.ejections += 1
+                # One more failure after the ejection ends ejects it again
+                replica.failures = self.eject_after - 1
+                print(f"Replica {replica.name} ejected for {self.eject_for:g}s after failed reads")
+
+    def close(self):
+        """Close every replica's pool"""
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def get_stats(self):
+        """
+        Get per-replica routing statistics
+
+        Returns:
+            dict: Replica name -> reads, errors, ejections, in-flight reads,
+            whether it is ejected now, and its pool statistics
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                replica.name: {
+                    'reads': replica.reads,
+                    'errors': replica.errors,
+                    'ejections': replica.ejections,
+                    'in_flight': replica.in_flight,
+                    'ejected': replica.ejected_until > now,
+                    'pool': replica.pool.get_stats(),
+                }
+                for replica in self.replicas
+            }
+
+
+# Leading keywords of statements that return a result set
+READ_KEYWORDS = ('SELECT', 'SHOW', 'EXPLAIN', 'DESCRIBE', 'PRAGMA')
+
+# MySQL error raised for statements the prepared protocol does not support
+ER_UNSUPPORTED_PS = 1295
+
+
+@lru_cache(maxsize=1024)
+def _returns_rows(query):
+    """Whether a statement returns a result set, cached by SQL text"""
+    words = query.lstrip().split(None, 1)
+    return bool(words) and words[0].upper() in READ_KEYWORDS
+
+
+class _Transaction:
+    """
+    The explicit transaction a thread holds through DatabaseConnection.transaction().
+    
+    levels has one [savepoint name, failed, len(on_commit) at the start]
+    entry per open block, the outermost (with no savepoint) first. Callbacks in on_commit run once
+    the writes they depend on are committed.
+    """
+    
+    def __init__(self, connection, group_size=None):
+        """
+        Args:
+            connection: Connection the transaction runs on
+            group_size (int, optional): Writes per commit in a unit of work,
+                None for a single transaction
+        """
+        self.connection = connection
+        self.group_size = group_size
+        self.writes = 0
+        self.levels = [[None, False, 0]]
+        self.on_commit = []
+        # Set when the server rolled back the whole transaction, e.g. on a deadlock
+        self.aborted = False
+
+
+class StatementCache:
+    """
+    Reusable cursors per connection.
+    
+    Plain cursors are reused as they are. In prepared mode every SQL text
+    gets its own server-side prepared cursor, so the server parses each
+    statement once per connection; the least recently used prepared
+    statements beyond max_prepared are closed. The cursors are stored on
+    the connection itself so they go away with it, and a connection is
+    only ever used by one thread at a time.
+    """
+    
+    def __init__(self, max_prepared=64):
+        """
+        Args:
+            max_prepared (int): Prepared statements kept open per connection
+        """
+        self.max_prepared = max_prepared
+        self._lock = threading.Lock()
+        self._stats = {'prepares': 0, 'reuses': 0, 'closes': 0}
+        
+    def cursor(self, connection, query, prepared=False, dictionary=False):
+        """
+        Get a cursor for a statement on a connection, creating it on first use
+        
+        Args:
+            connection (MySQLConnection): Connection the cursor belongs to
+            query (str): SQL text, which keys prepared cursors
+            prepared (bool): Use a server-side prepared statement
+            dictionary (bool): Return rows as dicts instead of tuples
+            
+        Returns:
+            MySQLCursor: A buffered or prepared cursor
+        """
+        key = (query if prepared else None, dictionary)
+        cursors = self._cursors(connection)
+        cursor = cursors.get(key)
+        if cursor is not None:
+            cursors.move_to_end(key)
+            self._count('reuses')
+            return cursor
+            
+        if prepared:
+            cursor = connection.cursor(prepared=True, dictionary=dictionary)
+        else:
+            cursor = connection.cursor(buffered=True, dictionary=dictionary)
+        cursors[key] = cursor
+        
+        if prepared:
+            self._count('prepares')
+            prepared_keys = [other for other in cursors if other[0] is not None]
+            for other in prepared_keys[:max(0, len(prepared_keys) - self.max_prepared)]:
+                self._close(cursors.pop(other))
+                self._count('closes')
+        return cursor
+    
+    def discard(self, connection, cursor):
+        """Forget and close a cursor, e.g. after it raised an error"""
+        cursors = self._cursors(connection)
+        for key, cached in list(cursors.items()):
+            if cached is cursor:
+                del cursors[key]
+        self._close(cursor)
+        
+    @staticmethod
+    def _cursors(connection):
+        """The cursors cached on a connection, oldest first"""
+        cursors = getattr(connection, '_statement_cursors', None)
+        if cursors is None:
+            cursors = connection._statement_cursors = OrderedDict()
+        return cursors
+    
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+        
+    @staticmethod
+    def _close(cursor):
+        try:
+            cursor.close()
+        except Error:
+            pass
+            
+    def get_stats(self):
+        """
+        Get a snapshot of the statement cache statistics
+        
+        Returns:
+            dict: Prepared statements created, cursor reuses and closes
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+class ResultCache:
+    """
+    A thread-safe LRU cache of query results with a time-to-live.
+    
+    Entries are tagged with the cache generation at the time the query
+    started, so a result that was in flight while the cache was invalidated
+    is never stored.
+    """
+    
+    def __init__(self, max_entries=256, ttl=30.0):
+        """
+        Args:
+            max_entries (int): Entries kept before the least recently used is evicted
+            ttl (float): Seconds an entry stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'superset_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+        }
+        
+    def _lookup(self, key):
+        """Get a live entry and mark it recently used; callers hold the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            self._stats['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def get(self, key, count_miss=True):
+        """
+        Get a cached result
+        
+        Args:
+            key (tuple): Cache key
+            count_miss (bool): Count a miss if the key is not cached
+            
+        Returns:
+            The cached value or None
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self._stats['hits'] += 1
+            elif count_miss:
+                self._stats['misses'] += 1
+            return value
+        
+    def get_superset(self, keys):
+        """
+        Get the first live entry among candidate keys, counted as a superset hit
+        
+        Args:
+            keys (iterable): Candidate keys, best first
+            
+        Returns:
+            The cached value or None
+        """
+        with self._lock:
+            for key in keys:
+                value = self._lookup(key)
+                if value is not None:
+                    self._stats['superset_hits'] += 1
+                    return value
+        return None
+    
+    def put(self, key, value, generation):
+        """
+        Store a result unless the cache was invalidated after the query started
+        
+        Args:
+            key (tuple): Cache key
+            value: Result to store
+            generation (int): self.generation read before running the query
+        """
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+                
+    def invalidate(self):
+        """Drop every entry"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+            
+    def get_stats(self):
+        """
+        Get a snapshot of the cache statistics
+        
+        Returns:
+            dict: Hit, miss, eviction and invalidation counters plus the entry count
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+
+class DetailCache(ResultCache):
+    """
+    Full book rows keyed by book_id, with ResultCache's LRU eviction and time-to-live.
+    
+    Writes through the DatabaseConnection drop the rows they touch; other
+    clients' changes show up once an entry's ttl has passed.
+    """
+    
+    def get_many(self, book_ids):
+        """
+        Look up several books at once
+        
+        Args:
+            book_ids (iterable): Book IDs
+            
+        Returns:
+            tuple: (found, missing) where found maps book_id to a copy of the
+            cached row and missing lists the IDs that are not cached
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for book_id in book_ids:
+                row = self._lookup(book_id)
+                if row is None:
+                    missing.append(book_id)
+                else:
+                    found[book_id] = dict(row)
+            self._stats['hits'] += len(found)
+            self._stats['misses'] += len(missing)
+        return found, missing
+        
+    def put_many(self, rows, generation):
+        """
+        Store fetched rows unless the cache was invalidated after the fetch started
+        
+        Args:
+            rows (dict): Rows keyed by book_id
+            generation (int): self.generation read before running the query
+        """
+        for book_id, row in rows.items():
+            self.put(book_id, dict(row), generation)
+            
+    def invalidate(self, book_ids=None):
+        """
+        Drop the given books, or every entry
+        
+        Args:
+            book_ids (iterable, optional): Books to drop; all of them if None
+        """
+        if book_ids is None:
+            super().invalidate()
+            return
+        with self._lock:
+            # Rows of other books fetched concurrently are dropped as well, which is safe
+            self.generation += 1
+            for book_id in book_ids:
+                self._entries.pop(book_id, None)
+            self._stats['invalidations'] += 1
+
 
 class DatabaseConnection:
     """
     A class to handle database connection and operations for the library application.
     """
     
-    def __init__(self, config_file='config.ini'):
+    def __init__(self, config_file='config.ini', pooled=None, result_cache=None, prepared=None):
         """
         Initialize the database connection using the config file
         
         Args:
             config_file (str): Path to the configuration file
+            pooled (bool, optional): Use a connection pool; defaults to the
+                enabled setting of the [pool] section in the config file
+            result_cache (bool, optional): Cache get_all_books and search_books
+                results; defaults to the enabled setting of the [cache] section
+            prepared (bool, optional): Run statements as server-side prepared
+                statements; defaults to the prepared setting of the [statements] section
         """
-        self.connection = None
+        self._local = threading.local()
         self.config_file = config_file
+        self.backend = create_backend(self._read_backend_name())
         self.db_config = self._read_config()
+        self.pool_config = self._read_pool_config()
+        self.search_config = self._read_search_config()
+        self.cache_config = self._read_cache_config()
+        self.statement_config = self._read_statement_config()
+        self.stats_config = self._read_stats_config()
+        self.changes_config = self._read_changes_config()
+        self.circulation_config = self._read_circulation_config()
+        self.summary_config = self._read_summary_config()
+        
+        self.query_stats = None
+        if self.stats_config['enabled']:
+            self.query_stats = QueryStats(slow_query_ms=self.stats_config['slow_query_ms'])
+        
+        self.search_index = None
+        if self.search_config['trigram_index']:
+            # Imported only when enabled, like the other in-process indexes
+            from trigram_index import TrigramIndex
+            self.search_index = TrigramIndex(fold=self.backend.like_fold)
+        self.autocomplete = None
+        if self.search_config['autocomplete']:
+            from autocomplete import Autocompleter
+            self.autocomplete = Autocompleter()
+        self.book_stats = None
+        if self.summary_config['enabled']:
+            from book_stats import BookStats
+            self.book_stats = BookStats()
+        
+        self.prepared = self.statement_config['prepared'] if prepared is None else prepared
+        self.statements = StatementCache(max_prepared=self.statement_config['max_prepared'])
+        
+        self.detail_cache = None
+        if self.cache_config['details']:
+            self.detail_cache = DetailCache(
+                max_entries=self.cache_config['detail_max_entries'],
+                ttl=self.cache_config['detail_ttl']
+            )
+            
+        if result_cache is None:
+            result_cache = self.cache_config['enabled']
+        self.result_cache = None
+        if result_cache:
+            self.result_cache = ResultCache(
+                max_entries=self.cache_config['max_entries'],
+                ttl=self.cache_config['ttl']
+            )
+        
+        if pooled is None:
+            pooled = self.pool_config['enabled']
+        self.pool = None
+        if pooled:
+            self.pool = ConnectionPool(
+                self.db_config,
+                self._connect,
+                min_size=self.pool_config['min_size'],
+                max_size=self.pool_config['max_size'],
+                idle_timeout=self.pool_config['idle_timeout'],
+                checkout_timeout=self.pool_config['checkout_timeout']
+            )
+            
+        self.replica_config = self._read_replica_config()
+        self.replicas = None
+        if self.replica_config['replicas']:
+            # Replica connections are always pooled, each read borrows one
+            self.replicas = ReplicaRouter(
+                [
+                    Replica(name, db_config, ConnectionPool(
+                        db_config,
+                        self._connect,
+                        min_size=0,
+                        max_size=self.pool_config['max_size'],
+                        idle_timeout=self.pool_config['idle_timeout'],
+                        checkout_timeout=self.pool_config['checkout_timeout']
+                    ))
+                    for name, db_config in self.replica_config['replicas']
+                ],
+                eject_after=self.replica_config['eject_after'],
+                eject_for=self.replica_config['eject_for']
+            )
+        # monotonic() time of this instance's last committed write, for read-your-writes
+        self._last_write = None
+            
+    @property
+    def connection(self):
+        """The connection held by the calling thread, if any"""
+        return getattr(self._local, 'connection', None)
+    
+    @connection.setter
+    def connection(self, value):
+        self._local.connection = value
+        
+    def _read_backend_name(self):
+        """Read the backend setting of the [database] section, 'mysql' by default"""
+        return self._read_section('database').get('backend', fallback='mysql').strip().lower()
         
     def _read_config(self):
         """Read database configuration from config file"""
-        config = configparser.ConfigParser()
-        
+        if self.backend.name == 'sqlite':
+            return self._read_sqlite_config()
+            
         # Check if config file exists
         if not os.path.exists(self.config_file):
             # Use default configuration
@@ -33,91 +783,1171 @@ class DatabaseConnection:
                 'database': 'librarydb'
             }
         
-        # Read configuration file
+        # Read configuration file, which may carry "; comments" after values
+        section = self._read_section('database')
+        db_config = {
+            'host': section['host'],
+            'user': section['user'],
+            'password': section['password'],
+            'database': section['database']
+        }
+        if section.get('port'):
+            db_config['port'] = section.getint('port')
+        return db_config
+        
+    def _read_sqlite_config(self):
+        """Read the SQLite file and tuning settings from the [database] section"""
+        section = self._read_section('database')
+        return {
+            'database': section.get('path', fallback='librarydb.sqlite3'),
+            'synchronous': section.get('synchronous', fallback='NORMAL').strip().upper(),
+            'cache_size_mb': section.getint('cache_size_mb', fallback=64),
+            'mmap_size_mb': section.getint('mmap_size_mb', fallback=256),
+            'busy_timeout': section.getfloat('busy_timeout', fallback=10)
+        }
+        
+    def _read_replica_config(self):
+        """Read read-replica settings from the [replicas] and [replica:NAME] sections of the config file"""
+        section = self._read_section('replicas')
+        config = configparser.ConfigParser(inline_comment_prefixes=(';', '#'))
+        config.read(self.config_file)
+        replicas = [
+            (name.partition(':')[2].strip(), self._replica_db_config(config[name]))
+            for name in config.sections() if name.startswith('replica:')
+        ]
+        return {
+            'replicas': replicas,
+            'read_your_writes': section.getfloat('read_your_writes', fallback=0),
+            'eject_after': section.getint('eject_after', fallback=3),
+            'eject_for': section.getfloat('eject_for', fallback=30)
+        }
+        
+    def _replica_db_config(self, section):
+        """Connection settings of one replica: the primary's, with the section's overrides"""
+        db_config = dict(self.db_config)
+        if self.backend.name == 'sqlite':
+            db_config['database'] = section.get('path', fallback=db_config['database'])
+            return db_config
+        for key in ('host', 'user', 'password', 'database'):
+            if key in section:
+                db_config[key] = section[key]
+        for key in ('port', 'connection_timeout'):
+            if key in section:
+                db_config[key] = section.getint(key)
+        return db_config
+        
+    def _read_section(self, name):
+        """Read an optional section of the config file, empty if it is missing"""
+        # Allow "key = value  ; comment" as shown in the README
+        config = configparser.ConfigParser(inline_comment_prefixes=(';', '#'))
         config.read(self.config_file)
+        if not config.has_section(name):
+            config.add_section(name)
+        return config[name]
+        
+    def _read_pool_config(self):
+        """Read connection pool settings from the [pool] section of the config file"""
+        section = self._read_section('pool')
         return {
-            'host': config['database']['host'],
-            'user': config['database']['user'],
-            'password': config['database']['password'],
-            'database': config['database']['database']
+            'enabled': section.getboolean('enabled', fallback=False),
+            'min_size': section.getint('min_size', fallback=1),
+            'max_size': section.getint('max_size', fallback=5),
+            'idle_timeout': section.getfloat('idle_timeout', fallback=300),
+            'checkout_timeout': section.getfloat('checkout_timeout', fallback=10)
+        }
+        
+    def _read_search_config(self):
+        """Read search settings from the [search] section of the config file"""
+        section = self._read_section('search')
+        mode = section.get('mode', fallback='like').strip().lower()
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+        return {
+            'mode': mode,
+            'min_fulltext_length': section.getint('min_fulltext_length', fallback=3),
+            'trigram_index': section.getboolean('trigram_index', fallback=False),
+            'index_refresh': section.getfloat('index_refresh', fallback=5),
+            'autocomplete': section.getboolean('autocomplete', fallback=False)
+        }
+        
+    def _read_cache_config(self):
+        """Read result and detail cache settings from the [cache] section of the config file"""
+        section = self._read_section('cache')
+        return {
+            'enabled': section.getboolean('enabled', fallback=False),
+            'max_entries': section.getint('max_entries', fallback=256),
+            'ttl': section.getfloat('ttl', fallback=30),
+            'details': section.getboolean('details', fallback=False),
+            'detail_max_entries': section.getint('detail_max_entries', fallback=5000),
+            'detail_ttl': section.getfloat('detail_ttl', fallback=60)
+        }
+        
+    def _read_statement_config(self):
+        """Read prepared statement settings from the [statements] section of the config file"""
+        section = self._read_section('statements')
+        return {
+            'prepared': section.getboolean('prepared', fallback=False),
+            'max_prepared': section.getint('max_prepared', fallback=64)
+        }
+        
+    def _read_stats_config(self):
+        """Read instrumentation settings from the [stats] section of the config file"""
+        section = self._read_section('stats')
+        slow_query_ms = section.get('slow_query_ms', fallback='500').strip()
+        return {
+            'enabled': section.getboolean('enabled', fallback=True),
+            'slow_query_ms': float(slow_query_ms) if slow_query_ms else None
+        }
+        
+    def _read_changes_config(self):
+        """Read change feed settings from the [changes] section of the config file"""
+        section = self._read_section('changes')
+        return {
+            'enabled': section.getboolean('enabled', fallback=False),
+            'interval': section.getfloat('interval', fallback=2),
+            'batch_size': section.getint('batch_size', fallback=500),
+            'gap_timeout': section.getfloat('gap_timeout', fallback=10)
+        }
+        
+    def _read_circulation_config(self):
+        """Read loan settings from the [circulation] section of the config file"""
+        section = self._read_section('circulation')
+        return {
+            'loan_days': section.getint('loan_days', fallback=21),
+            'max_renewals': section.getint('max_renewals', fallback=2)
+        }
+        
+    def _read_summary_config(self):
+        """Read catalogue statistics settings from the [summary] section of the config file"""
+        section = self._read_section('summary')
+        return {
+            'enabled': section.getboolean('enabled', fallback=False),
+            'refresh': section.getfloat('refresh', fallback=5)
         }
         
     def connect(self):
-        """Establish a database connection"""
+        """
+        Establish a database connection for the calling thread
+        
+        In pooled mode the connection is checked out of the pool and held
+        until disconnect() gives it back.
+        """
+        if self.connection:
+            return True
         try:
-            self.connection = mysql.connector.connect(**self.db_config)
+            self.connection = self._checkout()
             return True
         except Error as e:
-            print(f"Error connecting to MySQL database: {e}")
+            print(f"Error connecting to {self.backend.name} database: {e}")
+            return False
+            
+    def _checkout(self, pool=None):
+        """Open a connection, or check one out of a pool (the primary's by default), timing how long it takes"""
+        pool = pool or self.pool
+        start = time.perf_counter()
+        try:
+            if pool:
+                return pool.get_connection()
+            return self._connect(**self.db_config)
+        finally:
+            if self.query_stats:
+                self.query_stats.record_acquire(time.perf_counter() - start)
+                
+    def _connect(self, **kwargs):
+        """Open a new connection through the configured backend"""
+        return self.backend.connect(**kwargs)
+            
+    def interrupt(self, connection, replica=None):
+        """
+        Abort the statement running on a connection, e.g. one held by another thread
+        
+        Args:
+            connection: Connection to interrupt
+            replica (Replica, optional): Replica the connection belongs to;
+                the primary if None
+            
+        Returns:
+            bool: True if the interrupt was sent, False otherwise
+        """
+        try:
+            self.backend.interrupt(connection, **(replica.db_config if replica else self.db_config))
+            return True
+        except Error as e:
+            print(f"Error interrupting query: {e}")
             return False
             
     def disconnect(self):
-        """Close the database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        """Close the database connection, or return it to the pool in pooled mode"""
+        connection = self.connection
+        self.connection = None
+        if not connection:
+            return
+        if self.pool:
+            self.pool.release(connection)
+        elif connection.is_connected():
+            connection.close()
+            
+    def close(self):
+        """Disconnect and close every pooled connection"""
+        self.disconnect()
+        if self.pool:
+            self.pool.close()
+        if self.replicas:
+            self.replicas.close()
+            
+    def get_cache_stats(self):
+        """
+        Get result cache statistics
+        
+        Returns:
+            dict: Cache counters (hits, misses, superset_hits, ...) or None if not enabled
+        """
+        return self.result_cache.get_stats() if self.result_cache else None
+        
+    def get_detail_cache_stats(self):
+        """
+        Get book detail cache statistics
+        
+        Returns:
+            dict: Cache counters (hits, misses, evictions, ...) or None if not enabled
+        """
+        return self.detail_cache.get_stats() if self.detail_cache else None
+        
+    def _invalidate_results(self):
+        """Drop cached results after a write through this instance"""
+        if self.result_cache:
+            self.result_cache.invalidate()
+            
+    def get_statement_stats(self):
+        """
+        Get statement cache statistics
+        
+        Returns:
+            dict: Prepared statements created, cursor reuses and closes
+        """
+        return self.statements.get_stats()
+        
+    def get_query_stats(self, reset=False):
+        """
+        Get query instrumentation statistics
+        
+        Args:
+            reset (bool): Clear the counters after taking the snapshot
+            
+        Returns:
+            dict: Per-statement and per-action latency histograms, row and error
+            counts, connection acquisition times, or None if disabled
+        """
+        return self.query_stats.snapshot(reset=reset) if self.query_stats else None
+        
+    def reset_query_stats(self):
+        """Clear the query instrumentation counters"""
+        if self.query_stats:
+            self.query_stats.reset()
+            
+    def _record(self, query, start, rows=0, params=None, error=None):
+        """Record a statement that started at perf_counter() time start"""
+        captured = getattr(self._local, 'captured', None)
+        if captured is not None:
+            captured.append((query, params))
+        if self.query_stats:
+            self.query_stats.record(query, time.perf_counter() - start, rows, params, error)
+            
+    @contextmanager
+    def capture_statements(self):
+        """
+        Collect the statements the calling thread runs in a with block
+        
+        Usage:
+            with db.capture_statements() as statements:
+                db.get_all_books()
+            for query, params in statements:
+                print(db.explain(query, params))
+                
+        Yields:
+            list: (query, params) tuples, in the order the statements ran
+        """
+        captured = self._local.captured = []
+        try:
+            yield captured
+        finally:
+            self._local.captured = None
+            
+    def explain(self, query, params=None):
+        """
+        Get the plan the database would use for a statement
+        
+        Args:
+            query (str): Statement to explain
+            params (tuple, optional): Parameters for the statement
             
-    def execute_query(self, query, params=None):
+        Returns:
+            list: Plan rows as dicts, in the backend's EXPLAIN format, or None if error
+        """
+        return self.execute_query(self.backend.explain_sql(query), params, dictionary=True, prepared=False)
+        
+    def get_pool_stats(self):
+        """
+        Get connection pool statistics
+        
+        Returns:
+            dict: Pool counters (checkouts, waits, creations, ...) or None if not pooled
+        """
+        return self.pool.get_stats() if self.pool else None
+        
+    def get_replica_stats(self):
+        """
+        Get read replica routing statistics
+        
+        Returns:
+            dict: Per-replica reads, errors, ejections and pool counters, or
+            None if no replicas are configured
+        """
+        return self.replicas.get_stats() if self.replicas else None
+        
+    @contextmanager
+    def _pinned(self):
+        """Hold one pooled connection for the calling thread across several statements"""
+        if not self.pool or self.connection:
+            yield
+            return
+        if not self.connect():
+            raise PoolError("Could not check out a pooled connection")
+        try:
+            yield
+        finally:
+            self.disconnect()
+            
+    def _acquire(self):
+        """
+        Get a connection for a single statement
+        
+        Inside _replica_read the connection comes from the chosen replica.
+        
+        Returns:
+            tuple: (connection, pool) where pool is the ConnectionPool the
+            connection was checked out of for this statement only, to be
+            given back with _release(), or None
+        """
+        replica = getattr(self._local, 'replica', None)
+        if replica is not None:
+            connection = self._checkout(replica.pool)
+            self._track(connection, replica)
+            return connection, replica.pool
+        connection = self.connection
+        if connection and connection.is_connected():
+            return connection, None
+        if self.pool:
+            if connection:
+                # The held connection died, give its slot back
+                self.connection = None
+                self.pool.release(connection)
+            return self._checkout(), self.pool
+        self.connection = None
+        self.connect()
+        return self.connection, None
+        
+    def _release(self, connection, pool):
+        """Give back a connection _acquire() checked out for one statement"""
+        if pool is not self.pool:
+            self._track(None, None)
+        pool.release(connection)
+        
+    def _track(self, connection, replica):
+        """Tell the calling thread's _tracking() tracker which replica connection is in use"""
+        tracker = getattr(self._local, 'tracker', None)
+        if tracker:
+            tracker.use(connection, replica)
+            
+    def _cancelled(self):
+        """Whether the calling thread's _tracking() tracker was cancelled"""
+        tracker = getattr(self._local, 'tracker', None)
+        return bool(tracker and tracker.cancelled)
+        
+    @contextmanager
+    def _tracking(self, tracker):
+        """
+        Report the replica connections the calling thread uses in a with block
+        
+        Args:
+            tracker: Object whose use(connection, replica) is called when a
+                replica read starts, and with (None, None) when it ends; once
+                its cancelled attribute is true, failed reads are not retried
+        """
+        self._local.tracker = tracker
+        try:
+            yield
+        finally:
+            self._local.tracker = None
+            
+    # Read replicas
+    def _routes_to_replicas(self):
+        """Whether the calling thread's reads may go to a replica now"""
+        if not self.replicas or self.in_transaction:
+            return False
+        window = self.replica_config['read_your_writes']
+        # Right after a write the replicas may not have it yet
+        return not window or self._last_write is None or time.monotonic() - self._last_write >= window
+        
+    def _replica_read(self, run, *args):
+        """
+        Run a read on a replica, trying the others and then the primary if it fails
+        
+        Args:
+            run (callable): Runs the read, returning None on error
+            *args: Arguments for run
+            
+        Returns:
+            The result of run
+        """
+        if not self._routes_to_replicas():
+            return run(*args)
+        tried = []
+        while True:
+            replica = self.replicas.choose(exclude=tried)
+            if replica is None:
+                break
+            tried.append(replica)
+            self._local.replica = replica
+            try:
+                result = run(*args)
+            except BaseException:
+                self.replicas.finished(replica, None)
+                raise
+            finally:
+                self._local.replica = None
+            # An interrupted read says nothing about the replica's health
+            cancelled = result is None and self._cancelled()
+            self.replicas.finished(replica, None if cancelled else result is not None)
+            if result is not None or cancelled:
+                return result
+        return run(*args)
+            
+    # Explicit transactions
+    def _transaction_state(self):
+        """The calling thread's open transaction, if any"""
+        return getattr(self._local, 'transaction', None)
+        
+    @property
+    def in_transaction(self):
+        """True while the calling thread is inside transaction() or unit_of_work()"""
+        return self._transaction_state() is not None
+        
+    @contextmanager
+    def transaction(self):
+        """
+        Run the statements of a with block in one transaction
+        
+        Every method called in the block joins the transaction instead of
+        committing on its own. The block commits when it ends, and rolls
+        back if it raises or if any statement in it failed. Nested blocks
+        become savepoints, so an inner block can fail and be rolled back on
+        its own while the outer one carries on.
+        
+        Usage:
+            with db.transaction():
+                book_id = db.add_book("Dune", "Frank Herbert", "Science Fiction")
+                db.update_book(old_id, "Dune Messiah", "Frank Herbert", "Science Fiction")
+                
+        Raises:
+            TransactionError: If a statement in the block failed; the block
+                was rolled back
+        """
+        state = self._transaction_state()
+        if state is None:
+            with self._begin(None):
+                yield self
+        else:
+            with self._savepoint(state):
+                yield self
+                
+    @contextmanager
+    def unit_of_work(self, group_size=100):
+        """
+        Group the writes of a with block into commits of group_size statements
+        
+        Writes still run at once, so IDs and row counts are returned as
+        usual, but only every group_size-th write commits, which saves the
+        durable flush of every other one. A failed statement is reported
+        the usual way and does not undo the rest of its group. Inside an
+        enclosing transaction() the block simply joins it.
+        
+        Args:
+            group_size (int): Writes per commit; a nested transaction()
+                block counts as one write
+                
+        Raises:
+            TransactionError: If the server rolled back an open group, e.g.
+                after a deadlock; the writes since the last commit are lost
+        """
+        if group_size < 1:
+            raise ValueError("group_size must be at least 1")
+        if self.in_transaction:
+            yield self
+            return
+        with self._begin(group_size):
+            yield self
+            
+    @contextmanager
+    def _begin(self, group_size):
+        """Open the calling thread's outermost transaction on a pinned connection"""
+        with self._pinned():
+            connection, _ = self._acquire()
+            if connection is None:
+                raise BackendError("Could not connect to the database")
+            if connection.in_transaction:
+                # A read snapshot left open on a connection without autocommit
+                connection.commit()
+            connection.start_transaction()
+            state = _Transaction(connection, group_size)
+            self._local.transaction = state
+            try:
+                yield
+            except BaseException:
+                self._local.transaction = None
+                self._rollback_quietly(connection)
+                self._transaction_ended(state, committed=False)
+                raise
+                
+            self._local.transaction = None
+            if state.aborted or state.levels[0][1]:
+                self._rollback_quietly(connection)
+                self._transaction_ended(state, committed=False)
+                raise TransactionError("A statement in the transaction failed, the transaction was rolled back")
+            try:
+                connection.commit()
+            except Error:
+                self._rollback_quietly(connection)
+                self._transaction_ended(state, committed=False)
+                raise
+            self._transaction_ended(state, committed=True)
+            
+    @contextmanager
+    def _savepoint(self, state):
+        """Run a nested transaction block as a savepoint"""
+        name = f"sp_{len(state.levels)}"
+        self._run_control(state.connection, f"SAVEPOINT {name}")
+        level = [name, False, len(state.on_commit)]
+        state.levels.append(level)
+        try:
+            yield
+        except BaseException:
+            self._end_savepoint(state, level, rollback=True)
+            raise
+        if level[1] or state.aborted:
+            self._end_savepoint(state, level, rollback=True)
+            raise TransactionError(f"A statement in savepoint {name} failed, it was rolled back")
+        self._end_savepoint(state, level, rollback=False)
+        self._wrote(state)
+        
+    def _end_savepoint(self, state, level, rollback):
+        """Release a savepoint, first rolling back to it if asked"""
+        state.levels.pop()
+        name = level[0]
+        if rollback:
+            # Commit callbacks registered inside the savepoint go with it
+            del state.on_commit[level[2]:]
+        if state.aborted:
+            # The server already dropped every savepoint
+            return
+        try:
+            if rollback:
+                self._run_control(state.connection, f"ROLLBACK TO SAVEPOINT {name}")
+            self._run_control(state.connection, f"RELEASE SAVEPOINT {name}")
+        except Error as e:
+            print(f"Error ending savepoint {name}: {e}")
+            state.aborted = True
+            
+    @staticmethod
+    def _run_control(connection, statement):
+        """Run a transaction control statement such as SAVEPOINT"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+            
+    def _wrote(self, state):
+        """Count a write in the open transaction, committing the group in a unit of work"""
+        state.writes += 1
+        if (state.group_size is None or state.writes < state.group_size
+                or len(state.levels) > 1 or state.aborted or state.levels[0][1]):
+            return
+        connection = state.connection
+        try:
+            connection.commit()
+        except Error as e:
+            print(f"Error committing unit of work: {e}")
+            self._rollback_quietly(connection)
+            state.aborted = True
+        else:
+            self._transaction_ended(state, committed=True)
+        state.writes = 0
+        try:
+            connection.start_transaction()
+        except Error as e:
+            print(f"Error starting transaction: {e}")
+            state.aborted = True
+            
+    def _statement_failed(self, state):
+        """Mark the innermost block of the open transaction as failed"""
+        if not state.connection.in_transaction:
+            # The server rolled the whole transaction back, e.g. after a deadlock;
+            # keep later statements out of autocommit until the block ends
+            state.aborted = True
+            try:
+                state.connection.start_transaction()
+            except Error:
+                pass
+        elif state.group_size is None or len(state.levels) > 1:
+            state.levels[-1][1] = True
+            
+    def _transaction_ended(self, state, committed):
+        """Run or drop the commit callbacks of a finished transaction or group"""
+        callbacks, state.on_commit = state.on_commit, []
+        if committed:
+            self._last_write = time.monotonic()
+            for callback in callbacks:
+                callback()
+        self._invalidate_results()
+        
+    def _on_commit(self, callback):
+        """Run callback now, or once the calling thread's open transaction commits"""
+        state = self._transaction_state()
+        if state is None:
+            callback()
+        else:
+            state.on_commit.append(callback)
+            
+    def execute_query(self, query, params=None, dictionary=False, prepared=None):
         """
         Execute a query with optional parameters
         
+        Cursors are reused across calls on the same connection, and the
+        read/write classification of each SQL text is cached. Rows are
+        buffered in full; execute_query_iter streams them unbuffered.
+        
         Args:
             query (str): SQL query to execute
             params (tuple, optional): Parameters for the query
+            dictionary (bool): Return rows as dicts keyed by column name
+            prepared (bool, optional): Use a server-side prepared statement;
+                defaults to the instance's prepared setting
             
         Returns:
             list: Query results or None if error
         """
+        if prepared is None:
+            prepared = self.prepared
+        connection = None
+        pool = None
+        cursor = None
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-                
-            cursor = self.connection.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
+            connection, pool = self._acquire()
+            
+            start = time.perf_counter()
+            cursor = self.statements.cursor(connection, query, prepared, dictionary)
+            try:
+                cursor.execute(query, params or ())
+            except Error as e:
+                if not prepared or e.errno != ER_UNSUPPORTED_PS:
+                    raise
+                # Not every statement can be prepared, run it as plain text
+                self.statements.discard(connection, cursor)
+                cursor = self.statements.cursor(connection, query, False, dictionary)
+                cursor.execute(query, params or ())
                 
-            # Check if query is a SELECT statement
-            if query.strip().upper().startswith("SELECT"):
+            if _returns_rows(query):
                 result = cursor.fetchall()
+                self._record(query, start, len(result), params)
             else:
-                self.connection.commit()
+                # Inside an explicit transaction the commit waits for the block
+                state = self._transaction_state()
+                if state is None:
+                    connection.commit()
+                    self._last_write = time.monotonic()
                 result = cursor.rowcount
+                self._record(query, start, result, params)
+                if state is not None:
+                    self._wrote(state)
+            return result
+            
+        except Error as e:
+            print(f"Error executing query: {e}")
+            if cursor is not None:
+                self._record(query, start, params=params, error=e)
+                self.statements.discard(connection, cursor)
+            state = self._transaction_state()
+            if state is not None:
+                self._statement_failed(state)
+            return None
+        finally:
+            if pool:
+                self._release(connection, pool)
+                
+    def execute_query_iter(self, query, params=None, batch_size=500, buffered=False, dictionary=False,
+                           raise_errors=False):
+        """
+        Execute a SELECT query and yield its rows as they arrive
+        
+        By default rows are read from an unbuffered cursor with fetchmany(),
+        so memory use is bounded by batch_size rather than by the result
+        size. The connection stays busy until the generator is exhausted or
+        closed.
+        
+        Args:
+            query (str): SQL SELECT query to execute
+            params (tuple, optional): Parameters for the query
+            batch_size (int): Rows fetched from the server per round trip
+            buffered (bool): Read the whole result into the client first, which
+                frees the server sooner at the cost of memory
+            dictionary (bool): Yield dicts keyed by column name instead of tuples
+            raise_errors (bool): Re-raise a failed statement instead of ending
+                the iteration early, for callers that must not miss rows
+            
+        Yields:
+            tuple: One result row at a time
+        """
+        connection = None
+        pool = None
+        cursor = None
+        finished = False
+        count = 0
+        try:
+            connection, pool = self._acquire()
+            start = time.perf_counter()
+            cursor = connection.cursor(buffered=buffered, dictionary=dictionary)
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                count += len(rows)
+                yield from rows
+            finished = True
+            # Includes the time the caller spent consuming the rows
+            self._record(query, start, count, params)
+            
+        except Error as e:
+            print(f"Error executing query: {e}")
+            if cursor is not None:
+                self._record(query, start, count, params, error=e)
+            if raise_errors:
+                raise
+        finally:
+            if cursor:
+                try:
+                    if not finished:
+                        # Drain rows the caller never read so the connection can be reused
+                        connection.consume_results()
+                    cursor.close()
+                except Error:
+                    pass
+            if pool:
+                self._release(connection, pool)
+                
+    def _books_page(self, where, params, after, before, page_size):
+        """
+        Fetch one page of books in (title, book_id) order using keyset pagination
+        
+        Args:
+            where (str): Extra filter condition, or None
+            params (tuple): Parameters for the filter condition
+            after (tuple): (title, book_id) key the page starts after
+            before (tuple): (title, book_id) key the page ends before
+            page_size (int): Maximum rows in the page
+            
+        Returns:
+            list: Books in ascending (title, book_id) order or None if error
+        """
+        conditions = [f"({where})"] if where else []
+        params = list(params)
+        descending = before is not None and after is None
+        if after is not None:
+            conditions.append("(title > %s OR (title = %s AND book_id > %s))")
+            params.extend((after[0], after[0], after[1]))
+        if before is not None:
+            conditions.append("(title < %s OR (title = %s AND book_id < %s))")
+            params.extend((before[0], before[0], before[1]))
+            
+        query = "SELECT book_id, title, author, genre FROM books"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        # Walk backwards from the 'before' key, then restore ascending order
+        order = "DESC" if descending else "ASC"
+        query += f" ORDER BY title {order}, book_id {order} LIMIT %s"
+        params.append(page_size)
+        
+        rows = self._replica_read(self.execute_query, query, tuple(params))
+        if rows is not None and descending:
+            rows.reverse()
+        return rows
+        
+    def get_books_page(self, after=None, before=None, page_size=100):
+        """
+        Get one page of books ordered by title and ID
+        
+        Args:
+            after (tuple, optional): (title, book_id) of the last row of the previous page
+            before (tuple, optional): (title, book_id) of the first row of the next page,
+                to page backwards
+            page_size (int): Maximum number of books to return
+            
+        Returns:
+            list: Books in (title, book_id) order or None if error
+        """
+        return self._books_page(None, (), after, before, page_size)
+        
+    def search_books_page(self, search_term, after=None, before=None, page_size=100, mode=None):
+        """
+        Get one page of books matching a search term, ordered by title and ID
+        
+        Args:
+            search_term (str): Term to search for in title, author or genre
+            after (tuple, optional): (title, book_id) of the last row of the previous page
+            before (tuple, optional): (title, book_id) of the first row of the next page,
+                to page backwards
+            page_size (int): Maximum number of books to return
+            mode (str, optional): One of SEARCH_MODES, defaults to the configured mode
+            
+        Returns:
+            list: Matching books in (title, book_id) order or None if error
+        """
+        condition, params, _ = self._search_condition(search_term, mode)
+        return self._books_page(condition, params, after, before, page_size)
+        
+    def _iter_pages(self, fetch_page, page_size):
+        """Yield rows from successive keyset pages until a short page is returned"""
+        after = None
+        while True:
+            rows = fetch_page(after=after, page_size=page_size)
+            if not rows:
+                return
+            yield from rows
+            if len(rows) < page_size:
+                return
+            after = (rows[-1][1], rows[-1][0])
+            
+    def iter_books(self, page_size=1000):
+        """
+        Iterate over all books page by page
+        
+        Each page is a short keyset query, so no connection is held while
+        the caller processes rows.
+        
+        Args:
+            page_size (int): Books fetched per query
+            
+        Yields:
+            tuple: (book_id, title, author, genre) in (title, book_id) order
+        """
+        return self._iter_pages(self.get_books_page, page_size)
+        
+    def iter_search_books(self, search_term, page_size=1000, mode=None):
+        """
+        Iterate over books matching a search term page by page
+        
+        Args:
+            search_term (str): Term to search for in title, author or genre
+            page_size (int): Books fetched per query
+            mode (str, optional): One of SEARCH_MODES, defaults to the configured mode
+            
+        Yields:
+            tuple: (book_id, title, author, genre) in (title, book_id) order
+        """
+        return self._iter_pages(
+            lambda after, page_size: self.search_books_page(
+                search_term, after=after, page_size=page_size, mode=mode),
+            page_size
+        )
+            
+    def _cached(self, key, run):
+        """
+        Answer a read from the result cache, or run it and cache the result
+        
+        Args:
+            key (tuple): Cache key
+            run (callable): Runs the query when the key is not cached
+            
+        Returns:
+            list: Query results (a copy when served from the cache) or None if error
+        """
+        # A transaction sees its own uncommitted writes, which other threads must not
+        if not self.result_cache or self.in_transaction:
+            return run()
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        generation = self.result_cache.generation
+        result = run()
+        if result is not None:
+            self.result_cache.put(key, list(result), generation)
+        return result
+        
+    def get_all_books(self):
+        """Get all books from the database"""
+        query = """
+            SELECT book_id, title, author, genre
+            FROM books
+            ORDER BY title
+        """
+        return self._cached(('all',), lambda: self._replica_read(self.execute_query, query))
+        
+    def get_book_details(self, book_id):
+        """
+        Get every column of one book
+        
+        Args:
+            book_id (int): ID of the book
+            
+        Returns:
+            dict: Row keyed by BOOK_ROW_COLUMNS, or None if not found or error
+        """
+        details = self.get_books_details([book_id])
+        if details is None:
+            return None
+        return details.get(int(book_id))
+        
+    def get_books_details(self, book_ids, batch_size=500):
+        """
+        Get every column of many books, served from the detail cache where possible
+        
+        Books that are not cached are fetched with one
+        SELECT ... WHERE book_id IN (...) per batch_size IDs.
+        
+        Args:
+            book_ids (iterable): IDs of the books
+            batch_size (int): Number of IDs per statement
+            
+        Returns:
+            dict: Rows keyed by BOOK_ROW_COLUMNS, by book_id; books that do
+            not exist are left out. None if error
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        missing = self._sorted_ids(book_ids)
+        details = {}
+        # A transaction sees its own uncommitted writes, which must not be cached
+        cache = self.detail_cache if not self.in_transaction else None
+        if cache is not None:
+            details, missing = cache.get_many(missing)
+            generation = cache.generation
+            
+        columns = ", ".join(BOOK_ROW_COLUMNS)
+        full_placeholders = ", ".join(["%s"] * batch_size)
+        for offset in range(0, len(missing), batch_size):
+            chunk = missing[offset:offset + batch_size]
+            if len(chunk) == batch_size:
+                placeholders = full_placeholders
+            else:
+                placeholders = ", ".join(["%s"] * len(chunk))
+            rows = self.execute_query(
+                f"SELECT {columns} FROM books WHERE book_id IN ({placeholders})", chunk, dictionary=True
+            )
+            if rows is None:
+                return None
+            fetched = {row['book_id']: row for row in rows}
+            if cache is not None:
+                cache.put_many(fetched, generation)
+            details.update(fetched)
+        return details
+        
+    def _invalidate_details(self, book_ids):
+        """Drop cached details of books written through this instance, and again once the write commits"""
+        if self.detail_cache is None:
+            return
+        book_ids = [int(book_id) for book_id in book_ids]
+        self.detail_cache.invalidate(book_ids)
+        if self.in_transaction:
+            # Other threads may cache the old committed row until then
+            self._on_commit(partial(self.detail_cache.invalidate, book_ids))
+            
+    def _fulltext_query(self, search_term, mode):
+        """
+        Build the search string for a FULLTEXT search
+        
+        Args:
+            search_term (str): Term typed by the user
+            mode (str): 'natural' or 'boolean'
+            
+        Returns:
+            str: The search string, or None if the term is too short for the
+            FULLTEXT index and the LIKE path should be used instead
+        """
+        min_length = self.search_config['min_fulltext_length']
+        if len(search_term.strip()) < min_length:
+            return None
+        # Words below the index's minimum token size are never indexed
+        words = [word for word in re.findall(r"\w+", search_term) if len(word) >= min_length]
+        return self.backend.fulltext_query(search_term, words, mode)
+        
+    def _search_condition(self, search_term, mode=None):
+        """
+        Build the WHERE condition for a search term
+        
+        Args:
+            search_term (str): Term to search for
+            mode (str, optional): One of SEARCH_MODES, defaults to the configured mode
+            
+        Returns:
+            tuple: (condition, params, fulltext) where fulltext tells whether the
+            condition uses the FULLTEXT index
+        """
+        mode = mode or self.search_config['mode']
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+            
+        if mode != 'like':
+            against = self._fulltext_query(search_term, mode)
+            if against is not None:
+                return self.backend.fulltext_condition(mode), (against,), True
+                
+        search_pattern = f"%{search_term}%"
+        return (
+            "title LIKE %s OR author LIKE %s OR genre LIKE %s",
+            (search_pattern, search_pattern, search_pattern),
+            False
+        )
+        
+    def search_books(self, search_term, mode=None):
+        """
+        Search for books by title, author, or genre
+        
+        FULLTEXT modes return the most relevant books first and fall back to
+        a LIKE scan for terms shorter than min_fulltext_length. With the
+        trigram_index setting, LIKE searches are answered in process.
+        
+        Args:
+            search_term (str): Term to search for
+            mode (str, optional): 'like', 'natural' or 'boolean'; defaults to
+                the mode set in the [search] section of the config file
+            
+        Returns:
+            list: Matching books
+        """
+        mode = mode or self.search_config['mode']
+        condition, params, fulltext = self._search_condition(search_term, mode)
+        if fulltext:
+            query, count = self.backend.fulltext_search_sql(mode)
+            params = params * count
+        else:
+            query = f"""
+                SELECT book_id, title, author, genre
+                FROM books
+                WHERE {condition}
+                ORDER BY title
+            """
+            
+        # The in-process indexes only hold committed rows
+        in_transaction = self.in_transaction
+        if not fulltext and self.search_index is not None and not in_transaction:
+            indexed = self._search_indexed(search_term)
+            if indexed is not None:
+                return indexed
+            
+        # Terms LIKE treats as equal share a key: the condition plus folded parameters
+        key = ('search', condition, tuple(self.backend.like_fold(param) for param in params))
+        if self.result_cache and not fulltext and not in_transaction:
+            cached = self.result_cache.get(key, count_miss=False)
+            if cached is not None:
+                return list(cached)
+            narrowed = self._search_cached_prefix(search_term, condition)
+            if narrowed is not None:
+                return narrowed
+        return self._cached(key, lambda: self._replica_read(self.execute_query, query, params))
+        
+    def _search_indexed(self, search_term):
+        """
+        Answer a LIKE search from the trigram index, loading or refreshing it first if needed
+        
+        Args:
+            search_term (str): Term to search for
+            
+        Returns:
+            list: Matching books in title order, or None if the index cannot answer
+        """
+        if not self.search_index.sync(self, self.search_config['index_refresh']):
+            return None
+        return self.search_index.search(search_term)
+        
+    def _book_indexes(self):
+        """The enabled in-process indexes that follow writes"""
+        indexes = (self.search_index, self.autocomplete, self.book_stats)
+        return [index for index in indexes if index is not None]
+        
+    def _index_book(self, book_id, title, author, genre, publication_year=None, isbn=None, new=False):
+        """Apply a write through this instance to the loaded in-process indexes once it is committed"""
+        def apply():
+            for index in self._book_indexes():
+                if not index.loaded:
+                    continue
+                # Availability and updated_at are not written here; None keeps the indexed values
+                row = (int(book_id), title, author, genre)
+                if index.full_rows:
+                    row += (publication_year, isbn, None, None)
+                if new:
+                    index.add(*row)
+                else:
+                    index.update(*row)
+        self._on_commit(apply)
                 
-            cursor.close()
-            return result
+    def suggest(self, prefix, limit=10):
+        """
+        Suggest titles and author names for a partly typed search term
+        
+        Answered from the in-process prefix index, which is loaded on the
+        first call and refreshed like the trigram index.
+        
+        Args:
+            prefix (str): Text typed so far
+            limit (int): Maximum number of suggestions
             
-        except Error as e:
-            print(f"Error executing query: {e}")
+        Returns:
+            list: (kind, text, book_count) tuples with kind 'title' or
+            'author', most popular first; None if autocomplete is disabled
+            or the index could not be loaded
+        """
+        if self.autocomplete is None:
+            return None
+        # Inside a transaction a refresh would read uncommitted rows, so the index is used as it is
+        if self.in_transaction:
+            if not self.autocomplete.loaded:
+                return None
+        elif not self.autocomplete.sync(self, self.search_config['index_refresh']):
             return None
+        return self.autocomplete.suggest(prefix, limit)
             
-    def get_all_books(self):
-        """Get all books from the database"""
-        query = """
-            SELECT book_id, title, author, genre
-            FROM books
-            ORDER BY title
+    def _search_cached_prefix(self, search_term, condition):
         """
-        return self.execute_query(query)
+        Answer a LIKE search by filtering the cached result of one of its prefixes
         
-    def search_books(self, search_term):
-        """
-        Search for books by title, author, or genre
+        Every book containing the term also contains each of its prefixes, so
+        a cached prefix result is a superset that only needs local filtering.
+        Matching folds text the way the backend's LIKE compares it.
         
         Args:
             search_term (str): Term to search for
+            condition (str): The LIKE condition the term maps to
             
         Returns:
-            list: Matching books
-        """
-        query = """
-            SELECT book_id, title, author, genre
-            FROM books
-            WHERE title LIKE %s OR author LIKE %s OR genre LIKE %s
-            ORDER BY title
+            list: Matching books in title order, or None if no prefix is cached
         """
-        search_pattern = f"%{search_term}%"
-        return self.execute_query(query, (search_pattern, search_pattern, search_pattern))
+        # LIKE wildcards and escapes cannot be reproduced locally
+        if any(char in search_term for char in '%_\\'):
+            return None
+        fold = self.backend.like_fold
+        candidates = (
+            ('search', condition, (fold(f"%{search_term[:length]}%"),) * 3)
+            for length in range(len(search_term) - 1, 0, -1)
+        )
+        superset = self.result_cache.get_superset(candidates)
+        if superset is None:
+            return None
+        needle = fold(search_term)
+        return [
+            book for book in superset
+            if any(needle in fold(value) for value in book[1:4])
+        ]
         
     def add_book(self, title, author, genre, publication_year=None, isbn=None):
         """
@@ -139,11 +1969,120 @@ class DatabaseConnection:
         """
         params = (title, author, genre, publication_year, isbn)
         
-        if self.execute_query(query, params) is not None:
-            # Get the last inserted ID
-            return self.execute_query("SELECT LAST_INSERT_ID()")[0][0]
+        # LAST_INSERT_ID() is per connection, so both statements share one
+        with self._pinned():
+            inserted = self.execute_query(query, params) is not None
+            self._invalidate_results()
+            if inserted:
+                # Get the last inserted ID
+                book_id = self.execute_query(self.backend.last_insert_id_sql)[0][0]
+                self._index_book(book_id, title, author, genre, publication_year, isbn, new=True)
+                return book_id
         return None
         
+    def add_books_bulk(self, books, batch_size=1000, return_ids=True, on_batch=None):
+        """
+        Add many books using multi-row INSERT statements in one transaction
+        
+        The generated IDs are derived from each batch's first insert ID, which
+        InnoDB (and SQLite) assign consecutively for multi-row inserts with a known row
+        count (auto_increment_increment = 1), so no extra queries are needed.
+        
+        Args:
+            books (iterable): Book records, either dicts keyed by BOOK_FIELDS or
+                sequences in (title, author, genre, publication_year, isbn) order;
+                consumed lazily, one batch at a time
+            batch_size (int): Number of rows sent per INSERT statement
+            return_ids (bool): Collect the generated IDs; pass False when loading
+                very large files to keep memory constant
+            on_batch (callable, optional): Called as on_batch(rows_in_batch, first_id)
+                after each batch is sent
+            
+        Returns:
+            list: IDs of the new books in input order, or the number of books
+            added if return_ids is False; None if error (nothing is committed)
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+            
+        row_sql = "(" + ", ".join(["%s"] * len(BOOK_FIELDS)) + ")"
+        insert_sql = f"INSERT INTO books ({', '.join(BOOK_FIELDS)}) VALUES "
+        full_batch_sql = insert_sql + ", ".join([row_sql] * batch_size)
+        
+        ids = [] if return_ids else None
+        total = 0
+        try:
+            # Bad input records raise out of the block, which rolls the batches back
+            with self.transaction():
+                cursor = self.connection.cursor()
+                records = iter(books)
+                while True:
+                    batch = list(islice(records, batch_size))
+                    if not batch:
+                        break
+                        
+                    params = []
+                    for record in batch:
+                        params.extend(self._book_values(record))
+                    if len(batch) == batch_size:
+                        query = full_batch_sql
+                    else:
+                        query = insert_sql + ", ".join([row_sql] * len(batch))
+                    start = time.perf_counter()
+                    cursor.execute(query, params)
+                    self._record(query, start, len(batch), params)
+                    
+                    first_id = cursor.lastrowid
+                    if return_ids:
+                        ids.extend(range(first_id, first_id + len(batch)))
+                    total += len(batch)
+                    if on_batch:
+                        on_batch(len(batch), first_id)
+                cursor.close()
+                # Too many rows to apply one by one, the next lookup refreshes the indexes
+                self._on_commit(self._mark_indexes_stale)
+            return ids if return_ids else total
+            
+        except Error as e:
+            print(f"Error adding books in bulk: {e}")
+            return None
+                
+    def _mark_indexes_stale(self):
+        """Make the in-process indexes re-read changed rows on their next lookup"""
+        for index in self._book_indexes():
+            index.stale = True
+            
+    def _unindex_books(self, book_ids):
+        """Drop deleted books from the in-process indexes"""
+        for index in self._book_indexes():
+            for book_id in book_ids:
+                index.remove(book_id)
+                
+    def _count_availability(self, book_ids, available):
+        """Move lent or returned copies between the available and on-loan counts of the statistics"""
+        if self.book_stats is not None:
+            for book_id in book_ids:
+                self.book_stats.set_available(book_id, available)
+                
+    @staticmethod
+    def _rollback_quietly(connection):
+        """Roll back a failed transaction, ignoring a dead connection"""
+        if connection:
+            try:
+                connection.rollback()
+            except Error:
+                pass
+                
+    @staticmethod
+    def _book_values(record):
+        """Convert a dict or sequence book record to a tuple in BOOK_FIELDS order"""
+        if isinstance(record, dict):
+            return tuple(record.get(field) for field in BOOK_FIELDS)
+        values = tuple(record)
+        if not 3 <= len(values) <= len(BOOK_FIELDS):
+            raise ValueError(f"Book record must have 3 to {len(BOOK_FIELDS)} fields: {record!r}")
+        return values + (None,) * (len(BOOK_FIELDS) - len(values))
+        
     def update_book(self, book_id, title, author, genre, publication_year=None, isbn=None):
         """
         Update an existing book
@@ -166,7 +2105,12 @@ class DatabaseConnection:
         """
         params = (title, author, genre, publication_year, isbn, book_id)
         
-        return self.execute_query(query, params) is not None
+        success = self.execute_query(query, params) is not None
+        self._invalidate_results()
+        self._invalidate_details([book_id])
+        if success:
+            self._index_book(book_id, title, author, genre, publication_year, isbn)
+        return success
         
     def delete_book(self, book_id):
         """
@@ -182,4 +2126,644 @@ class DatabaseConnection:
             DELETE FROM books
             WHERE book_id = %s
         """
-        return self.execute_query(query, (book_id,)) is not None
\ No newline at end of file
+        success = self.execute_query(query, (book_id,)) is not None
+        self._invalidate_results()
+        self._invalidate_details([book_id])
+        if success:
+            self._on_commit(partial(self._unindex_books, [int(book_id)]))
+        return success
+        
+    def delete_books(self, book_ids, batch_size=500, on_batch=None):
+        """
+        Delete many books with chunked DELETE ... WHERE book_id IN (...) in one transaction
+        
+        Args:
+            book_ids (iterable): IDs of the books to delete
+            batch_size (int): Number of IDs per statement
+            on_batch (callable, optional): Called as on_batch(ids_in_batch,
+                rows_deleted, seconds) after each statement
+            
+        Returns:
+            int: Number of books deleted or None if error (nothing is committed)
+        """
+        book_ids = self._sorted_ids(book_ids)
+        deleted = self._run_id_batches(
+            book_ids, batch_size,
+            lambda placeholders: (f"DELETE FROM books WHERE book_id IN ({placeholders})", ()),
+            on_batch, "deleting books"
+        )
+        self._invalidate_details(book_ids)
+        if deleted is not None:
+            self._on_commit(partial(self._unindex_books, book_ids))
+        return deleted
+        
+    def update_books(self, book_ids, changes, batch_size=500, on_batch=None):
+        """
+        Set the same field values on many books with chunked UPDATE ... WHERE book_id IN (...)
+        in one transaction
+        
+        Args:
+            book_ids (iterable): IDs of the books to update
+            changes (dict): New values keyed by BOOK_FIELDS, e.g. {'genre': 'Fantasy'}
+            batch_size (int): Number of IDs per statement
+            on_batch (callable, optional): Called as on_batch(ids_in_batch,
+                rows_changed, seconds) after each statement
+            
+        Returns:
+            int: Number of books changed or None if error (nothing is committed)
+            
+        Raises:
+            ValueError: If changes names a field outside BOOK_FIELDS
+        """
+        unknown = set(changes) - set(BOOK_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown book fields: {', '.join(sorted(unknown))}")
+        if not changes:
+            return 0
+            
+        columns = [field for field in BOOK_FIELDS if field in changes]
+        assignments = ", ".join(f"{column} = %s" for column in columns)
+        values = tuple(changes[column] for column in columns)
+        book_ids = self._sorted_ids(book_ids)
+        changed = self._run_id_batches(
+            book_ids, batch_size,
+            lambda placeholders: (f"UPDATE books SET {assignments} WHERE book_id IN ({placeholders})", values),
+            on_batch, "updating books"
+        )
+        self._invalidate_details(book_ids)
+        if changed and {'title', 'author', 'genre'} & set(columns):
+            # The other fields of each row are not known here, the next lookup re-reads the changed rows
+            self._on_commit(self._mark_indexes_stale)
+        return changed
+        
+    @staticmethod
+    def _sorted_ids(book_ids):
+        """Distinct book IDs in ascending order, so concurrent bulk writes lock rows in the same order"""
+        return sorted({int(book_id) for book_id in book_ids})
+        
+    def _run_id_batches(self, book_ids, batch_size, build, on_batch, action):
+        """
+        Run one set-based statement per chunk of book IDs, all in one transaction
+        
+        Args:
+            book_ids (list): IDs to act on
+            batch_size (int): Number of IDs per statement
+            build (callable): Called as build(placeholders) with the %s list of
+                one chunk; returns (query, params) where params come before the IDs
+            on_batch (callable, optional): Called as on_batch(ids_in_batch,
+                rows_affected, seconds) after each statement
+            action (str): What the statements do, for the error message
+            
+        Returns:
+            int: Total rows affected or None if error (nothing is committed)
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if not book_ids:
+            return 0
+            
+        # Every full chunk sends the same SQL text, so it is prepared once
+        full_placeholders = ", ".join(["%s"] * batch_size)
+        total = 0
+        try:
+            # A failing on_batch callback raises out of the block, which rolls the batches back
+            with self.transaction():
+                cursor = self.connection.cursor()
+                for offset in range(0, len(book_ids), batch_size):
+                    chunk = book_ids[offset:offset + batch_size]
+                    if len(chunk) == batch_size:
+                        placeholders = full_placeholders
+                    else:
+                        placeholders = ", ".join(["%s"] * len(chunk))
+                    query, params = build(placeholders)
+                    params = list(params) + chunk
+                    start = time.perf_counter()
+                    cursor.execute(query, params)
+                    self._record(query, start, cursor.rowcount, params)
+                    total += max(cursor.rowcount, 0)
+                    if on_batch:
+                        on_batch(len(chunk), cursor.rowcount, time.perf_counter() - start)
+                cursor.close()
+            return total
+            
+        except Error as e:
+            print(f"Error {action}: {e}")
+            return None
+                
+    def get_server_time(self):
+        """
+        Get the database server's current time, used as a change marker
+        
+        Returns:
+            datetime: Server time with microseconds or None if error
+        """
+        result = self.execute_query(self.backend.now_sql)
+        return result[0][0] if result else None
+        
+    def iter_books_changed_since(self, since=None, batch_size=1000):
+        """
+        Stream full book rows added or updated at or after a change marker
+        
+        Args:
+            since (datetime, optional): updated_at marker; None streams every book
+            batch_size (int): Rows fetched from the server per round trip
+            
+        Yields:
+            tuple: Rows in BOOK_ROW_COLUMNS order
+        """
+        query = f"SELECT {', '.join(BOOK_ROW_COLUMNS)} FROM books"
+        if since is None:
+            return self.execute_query_iter(query, batch_size=batch_size)
+        return self.execute_query_iter(query + " WHERE updated_at >= %s", (since,), batch_size=batch_size)
+        
+    def iter_book_rows(self, search_term=None, mode=None, batch_size=1000, raise_errors=False):
+        """
+        Stream full book rows in book_id order, optionally filtered by a search term
+        
+        Unlike iter_books, this is one statement read from an unbuffered
+        cursor: no per-page queries, but the connection stays busy until
+        the rows are consumed.
+        
+        Args:
+            search_term (str, optional): Only books matching this term
+            mode (str, optional): One of SEARCH_MODES, defaults to the configured mode
+            batch_size (int): Rows fetched from the server per round trip
+            raise_errors (bool): Raise a failed statement instead of stopping early
+            
+        Yields:
+            tuple: Rows in BOOK_ROW_COLUMNS order
+        """
+        query = f"SELECT {', '.join(BOOK_ROW_COLUMNS)} FROM books"
+        params = ()
+        if search_term:
+            condition, params, _ = self._search_condition(search_term, mode)
+            query += f" WHERE {condition}"
+        return self.execute_query_iter(
+            query + " ORDER BY book_id", params, batch_size=batch_size, raise_errors=raise_errors
+        )
+        
+    def export_books(self, path, file_format='csv', search_term=None, mode=None, chunk_size=10000,
+                     compression=None, on_chunk=None):
+        """
+        Stream the books table to a CSV, JSONL or Parquet file
+        
+        Rows are read chunk_size at a time from an unbuffered cursor and
+        written as they arrive, so memory use does not grow with the table.
+        
+        Args:
+            path (str): Output file path
+            file_format (str): 'csv', 'jsonl' or 'parquet'
+            search_term (str, optional): Only export books matching this term
+            mode (str, optional): One of SEARCH_MODES, defaults to the configured mode
+            chunk_size (int): Rows fetched and written at a time; one Parquet
+                row group each
+            compression (str, optional): 'gzip', 'bz2' or 'xz' for CSV and
+                JSONL; a Parquet codec such as 'snappy' or 'zstd'
+            on_chunk (callable, optional): Called as on_chunk(rows_in_chunk, seconds)
+                after each chunk is written
+            
+        Returns:
+            dict: rows, bytes and seconds of the export, or None if error
+            
+        Raises:
+            ValueError: If the format, compression or search mode is unknown
+            ImportError: If the Parquet format is asked for without pyarrow
+        """
+        # Imported here because export_books imports this module
+        from export_books import write_rows
+        rows = self.iter_book_rows(search_term, mode, batch_size=chunk_size, raise_errors=True)
+        try:
+            return write_rows(rows, path, file_format, chunk_size, compression, on_chunk)
+        except Error as e:
+            print(f"Error exporting books: {e}")
+            return None
+        except OSError as e:
+            print(f"Error writing {path}: {e}")
+            return None
+        finally:
+            # Gives the connection back if writing stopped part way
+            rows.close()
+        
+    def get_deleted_book_ids_since(self, since):
+        """
+        Get IDs of books deleted at or after a change marker
+        
+        Args:
+            since (datetime): deleted_at marker
+            
+        Returns:
+            list: Deleted book IDs or None if error
+        """
+        query = """
+            SELECT book_id
+            FROM book_deletions
+            WHERE deleted_at >= %s
+        """
+        result = self.execute_query(query, (since,))
+        return None if result is None else [row[0] for row in result]
+        
+    def purge_book_deletions(self, before):
+        """
+        Remove deletion tombstones older than a change marker
+        
+        Args:
+            before (datetime): Tombstones with an earlier deleted_at are removed;
+                pick a time every client has refreshed past
+            
+        Returns:
+            int: Number of tombstones removed or None if error
+        """
+        query = """
+            DELETE FROM book_deletions
+            WHERE deleted_at < %s
+        """
+        return self.execute_query(query, (before,))
+        
+    def get_change_seq(self):
+        """
+        Get the newest sequence number in the book_changes log
+        
+        Returns:
+            int: Sequence number, 0 if the log is empty, or None if error
+        """
+        result = self.execute_query("SELECT MAX(seq) FROM book_changes")
+        return None if result is None else result[0][0] or 0
+        
+    def get_changes_since(self, seq, limit=500):
+        """
+        Get book_changes log entries after a sequence number, with each book's current row
+        
+        Args:
+            seq (int): Entries with a greater sequence number are returned
+            limit (int): Maximum entries
+            
+        Returns:
+            list: (seq, book_id, op, *row) tuples in sequence order, where op
+            is 'I', 'U' or 'D' and row is in BOOK_ROW_COLUMNS order, all None
+            if the book no longer exists; None if error
+        """
+        columns = ', '.join(f"b.{column}" for column in BOOK_ROW_COLUMNS)
+        query = f"""
+            SELECT c.seq, c.book_id, c.op, {columns}
+            FROM book_changes c
+            LEFT JOIN books b ON b.book_id = c.book_id
+            WHERE c.seq > %s
+            ORDER BY c.seq
+            LIMIT %s
+        """
+        return self.execute_query(query, (seq, int(limit)))
+        
+    def purge_book_changes(self, before):
+        """
+        Remove change log entries older than a change marker
+        
+        Args:
+            before (datetime): Entries with an earlier changed_at are removed;
+                pick a time every subscriber has polled past
+            
+        Returns:
+            int: Number of entries removed or None if error
+        """
+        query = """
+            DELETE FROM book_changes
+            WHERE changed_at < %s
+        """
+        return self.execute_query(query, (before,))
+        
+    def subscribe_changes(self, callback=None, since=None):
+        """
+        Follow the book_changes log, see change_feed.ChangeFeed
+        
+        Batch size, gap timeout and poll interval come from the [changes]
+        section of the config file.
+        
+        Args:
+            callback (callable, optional): Called with each batch of events from
+                a polling thread; without one, the caller polls the feed itself
+            since (int, optional): Sequence number to start after; defaults
+                to the newest, so only later changes are delivered
+            
+        Returns:
+            ChangeFeed: The feed, or None if the change log cannot be read
+        """
+        if since is None:
+            since = self.get_change_seq()
+            if since is None:
+                return None
+        feed = ChangeFeed(
+            self,
+            since,
+            batch_size=self.changes_config['batch_size'],
+            gap_timeout=self.changes_config['gap_timeout']
+        )
+        if callback is not None:
+            feed.start(callback, self.changes_config['interval'])
+        return feed
+        
+    def _changes_received(self, book_ids):
+        """Drop cached results and details of books a change feed reported as changed elsewhere"""
+        self._invalidate_results()
+        if self.detail_cache is not None:
+            self.detail_cache.invalidate([int(book_id) for book_id in book_ids])
+            
+    # Circulation
+    def _loan_due(self, loan_days):
+        """Current time and the due date of a loan starting now"""
+        now = datetime.now()
+        days = self.circulation_config['loan_days'] if loan_days is None else loan_days
+        return now, now + timedelta(days=days)
+        
+    def checkout_book(self, book_id, borrower, loan_days=None):
+        """
+        Lend one copy to a borrower
+        
+        Args:
+            book_id (int): ID of the copy
+            borrower (str): Borrower's card number or name
+            loan_days (int, optional): Loan period; defaults to loan_days of the
+                [circulation] section
+            
+        Returns:
+            int: ID of the new loan, or None if the copy is on loan, held for
+            another borrower, missing, or on error
+        """
+        loans = self.checkout_books([book_id], borrower, loan_days)
+        return loans.get(int(book_id)) if loans else None
+        
+    def checkout_books(self, book_ids, borrower, loan_days=None):
+        """
+        Lend a stack of copies to one borrower in one transaction
+        
+        Copies are claimed in ascending ID order, so desks checking out
+        overlapping stacks lock rows in the same order and cannot deadlock.
+        Copies that are not available are skipped, and the rest are lent.
+        
+        Args:
+            book_ids (iterable): IDs of the copies
+            borrower (str): Borrower's card number or name
+            loan_days (int, optional): Loan period; defaults to loan_days of the
+                [circulation] section
+            
+        Returns:
+            dict: book_id -> loan ID for the copies lent, or None if error
+            (nothing is committed)
+        """
+        # Claims a copy in one statement: the row lock on the book is the only
+        # lock taken, and of several desks racing for a copy only one changes
+        # the row. A copy with holds goes only to the borrower of the oldest.
+        claim = """
+            UPDATE books SET available = 0
+            WHERE book_id = %s AND available = 1
+            AND COALESCE((
+                SELECT borrower FROM holds
+                WHERE book_id = %s AND closed_at IS NULL
+                ORDER BY hold_id
+                LIMIT 1
+            ), %s) = %s
+        """
+        book_ids = self._sorted_ids(book_ids)
+        now, due = self._loan_due(loan_days)
+        loans = {}
+        try:
+            with self.transaction():
+                for book_id in book_ids:
+                    claimed = self.execute_query(claim, (book_id, book_id, borrower, borrower))
+                    if not claimed:
+                        # Lent or held elsewhere; a failed statement rolls the block back
+                        continue
+                    inserted = self.execute_query(
+                        "INSERT INTO loans (book_id, borrower, loaned_at, due_at) VALUES (%s, %s, %s, %s)",
+                        (book_id, borrower, now, due)
+                    )
+                    if inserted is None:
+                        break
+                    loans[book_id] = self.execute_query(self.backend.last_insert_id_sql)[0][0]
+                    # The borrower's holds on the copy are fulfilled
+                    self.execute_query(
+                        "UPDATE holds SET closed_at = %s WHERE book_id = %s AND borrower = %s AND closed_at IS NULL",
+                        (now, book_id, borrower)
+                    )
+        except Error as e:
+            print(f"Error checking out books: {e}")
+            return None
+        self._invalidate_details(list(loans))
+        self._on_commit(partial(self._count_availability, list(loans), False))
+        return loans
+        
+    def return_book(self, book_id):
+        """
+        Take a copy back and make it available again
+        
+        Args:
+            book_id (int): ID of the copy
+            
+        Returns:
+            bool: True if the copy was on loan, False if not or on error
+        """
+        try:
+            with self.transaction():
+                # The book row is locked first, in the same order as checkout
+                freed = self.execute_query(
+                    "UPDATE books SET available = 1 WHERE book_id = %s AND available = 0", (book_id,)
+                )
+                closed = self.execute_query(
+                    "UPDATE loans SET returned_at = %s WHERE book_id = %s AND returned_at IS NULL",
+                    (datetime.now(), book_id)
+                )
+        except Error as e:
+            print(f"Error returning book: {e}")
+            return False
+        self._invalidate_details([book_id])
+        if freed:
+            self._on_commit(partial(self._count_availability, [int(book_id)], True))
+        return bool(freed or closed)
+        
+    def renew_loan(self, book_id, loan_days=None):
+        """
+        Extend the open loan of a copy, unless someone holds it or it was renewed max_renewals times
+        
+        Args:
+            book_id (int): ID of the copy
+            loan_days (int, optional): New loan period from today; defaults to
+                loan_days of the [circulation] section
+            
+        Returns:
+            datetime: New due date, or None if the loan cannot be renewed or on error
+        """
+        now, due = self._loan_due(loan_days)
+        query = """
+            UPDATE loans SET due_at = %s, renewals = renewals + 1
+            WHERE book_id = %s AND returned_at IS NULL AND renewals < %s
+            AND NOT EXISTS (
+                SELECT 1 FROM holds
+                WHERE holds.book_id = %s AND holds.closed_at IS NULL
+            )
+        """
+        renewed = self.execute_query(query, (due, book_id, self.circulation_config['max_renewals'], book_id))
+        return due if renewed else None
+        
+    def place_hold(self, book_id, borrower):
+        """
+        Queue a borrower for a copy; once returned, only the first borrower in the queue can take it
+        
+        Args:
+            book_id (int): ID of the copy
+            borrower (str): Borrower's card number or name
+            
+        Returns:
+            int: ID of the hold or None if error
+        """
+        query = """
+            INSERT INTO holds (book_id, borrower, placed_at)
+            VALUES (%s, %s, %s)
+        """
+        with self._pinned():
+            if self.execute_query(query, (book_id, borrower, datetime.now())) is None:
+                return None
+            return self.execute_query(self.backend.last_insert_id_sql)[0][0]
+            
+    def cancel_hold(self, hold_id):
+        """
+        Remove a hold from its queue
+        
+        Args:
+            hold_id (int): ID of the hold
+            
+        Returns:
+            bool: True if the hold was open, False otherwise
+        """
+        query = """
+            UPDATE holds SET closed_at = %s
+            WHERE hold_id = %s AND closed_at IS NULL
+        """
+        return bool(self.execute_query(query, (datetime.now(), hold_id)))
+        
+    def get_loans(self, borrower=None, book_id=None, overdue=False):
+        """
+        Get open loans, optionally for one borrower or copy
+        
+        Args:
+            borrower (str, optional): Only this borrower's loans
+            book_id (int, optional): Only loans of this copy
+            overdue (bool): Only loans past their due date
+            
+        Returns:
+            list: Dicts with loan_id, book_id, title, borrower, loaned_at,
+            due_at and renewals, ordered by due date; None if error
+        """
+        conditions = ["l.returned_at IS NULL"]
+        params = []
+        if borrower is not None:
+            conditions.append("l.borrower = %s")
+            params.append(borrower)
+        if book_id is not None:
+            conditions.append("l.book_id = %s")
+            params.append(book_id)
+        if overdue:
+            conditions.append("l.due_at < %s")
+            params.append(datetime.now())
+        query = f"""
+            SELECT l.loan_id, l.book_id, b.title, l.borrower, l.loaned_at, l.due_at, l.renewals
+            FROM loans l
+            JOIN books b ON b.book_id = l.book_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY l.due_at, l.loan_id
+        """
+        return self.execute_query(query, tuple(params), dictionary=True)
+        
+    def get_holds(self, book_id):
+        """
+        Get the open holds on a copy in queue order
+        
+        Returns:
+            list: Dicts with hold_id, borrower and placed_at, or None if error
+        """
+        query = """
+            SELECT hold_id, borrower, placed_at
+            FROM holds
+            WHERE book_id = %s AND closed_at IS NULL
+            ORDER BY hold_id
+        """
+        return self.execute_query(query, (book_id,), dictionary=True)
+        
+    # Catalogue statistics
+    def _sync_book_stats(self):
+        """Load or refresh the statistics counters; True if they can answer"""
+        if self.book_stats is None:
+            return False
+        # Inside a transaction a refresh would read uncommitted rows, so the counters are used as they are
+        if self.in_transaction:
+            return self.book_stats.loaded
+        return self.book_stats.sync(self, self.summary_config['refresh'])
+        
+    def get_catalogue_stats(self, top=10):
+        """
+        Get book and availability counts by genre, author and publication decade
+        
+        Answered from in-process counters that add_book, update_book,
+        delete_book and the circulation methods keep current, and that pull
+        in other clients' changes through the change marker. No GROUP BY
+        query runs after the first load.
+        
+        Args:
+            top (int, optional): Values listed per breakdown, most books
+                first; all of them if None
+            
+        Returns:
+            dict: 'books', 'available' and 'available_ratio' over the whole
+            catalogue, and for each of 'genre', 'author' and 'decade' a list
+            of (value, books, available, available_ratio) tuples; None if the
+            statistics are disabled or could not be loaded
+        """
+        if not self._sync_book_stats():
+            return None
+        books, available = self.book_stats.totals()
+        stats = {
+            'books': books,
+            'available': available,
+            'available_ratio': available / books if books else 0.0,
+        }
+        for dimension in STAT_DIMENSIONS:
+            stats[dimension] = [
+                (value, count, available, available / count)
+                for value, count, available in self.book_stats.top(dimension, top)
+            ]
+        return stats
+        
+    def get_stat_count(self, dimension, value):
+        """
+        Get the book and available copy counts of one genre, author or decade
+        
+        Args:
+            dimension (str): 'genre', 'author' or 'decade'
+            value: The genre or author, or the first year of the decade (1960
+                for the 1960s); None counts books without one
+            
+        Returns:
+            tuple: (books, available), or None if the statistics are disabled
+            or could not be loaded
+            
+        Raises:
+            ValueError: If dimension is not one of the breakdowns
+        """
+        if dimension not in STAT_DIMENSIONS:
+            raise ValueError(f"Unknown statistics breakdown '{dimension}', expected one of {STAT_DIMENSIONS}")
+        if not self._sync_book_stats():
+            return None
+        return self.book_stats.count(dimension, value)
+        
+    def rebuild_catalogue_stats(self):
+        """
+        Recount the statistics from the whole books table
+        
+        A repair tool for counters suspected to have drifted; the regular
+        updates never need it. Creates the counters if the [summary] section
+        leaves them disabled.
+        
+        Returns:
+            BookStats: The rebuilt counters, or None if the table could not be read
+        """
+        if self.book_stats is None:
+            from book_stats import BookStats
+            self.book_stats = BookStats()
+        return self.book_stats if self.book_stats.load(self) else None
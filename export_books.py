@@ -0,0 +1,311 @@
+"""
+Command-line exporter that streams the books table to CSV, JSONL or Parquet files.
+
+Usage:
+    python export_books.py catalogue.csv
+    python export_books.py catalogue.jsonl.gz --search tolkien
+    python export_books.py catalogue.parquet --chunk-size 50000 --compression zstd
+
+Rows are read from an unbuffered cursor and written chunk by chunk, so
+memory use depends on the chunk size, not on the size of the catalogue.
+CSV and JSONL files use the same columns as import_books.py, so an export
+can be loaded again. Parquet files need pyarrow: pip install pyarrow
+"""
+import argparse
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import os
+import sys
+import time
+from datetime import datetime
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    # Only the parquet format needs pyarrow
+    pyarrow = None
+
+from database import BOOK_ROW_COLUMNS, SEARCH_MODES, DatabaseConnection
+
+# Compressed openers for the text formats, by compression name
+TEXT_COMPRESSION = {
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open,
+}
+
+# File extensions that imply a text compression
+COMPRESSION_EXTENSIONS = {
+    'gz': 'gzip',
+    'bz2': 'bz2',
+    'xz': 'xz',
+}
+
+# Codecs pyarrow can write into Parquet column chunks
+PARQUET_COMPRESSION = ('snappy', 'gzip', 'zstd', 'brotli', 'lz4', 'none')
+
+
+def _text_value(value):
+    """Datetimes as ISO 8601 text; everything else as it is"""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+
+class TextExportWriter:
+    """Base class for line-oriented writers, optionally compressed"""
+
+    def __init__(self, path, compression=None):
+        """
+        Args:
+            path (str): Output file path
+            compression (str, optional): One of TEXT_COMPRESSION
+        """
+        if compression is None:
+            self.file = open(path, 'w', newline='', encoding='utf-8')
+        elif compression in TEXT_COMPRESSION:
+            self.file = TEXT_COMPRESSION[compression](path, 'wt', newline='', encoding='utf-8')
+        else:
+            raise ValueError(
+                f"Unknown compression '{compression}' for this format, expected one of {tuple(TEXT_COMPRESSION)}"
+            )
+
+    def write(self, rows):
+        """
+        Write one chunk of rows
+
+        Args:
+            rows (list): Tuples in BOOK_ROW_COLUMNS order
+        """
+        raise NotImplementedError
+
+    def close(self):
+        self.file.close()
+
+
+class CSVExportWriter(TextExportWriter):
+    """CSV with a header row; NULL values are written as empty fields"""
+
+    def __init__(self, path, compression=None):
+        super().__init__(path, compression)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(BOOK_ROW_COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows([_text_value(value) for value in row] for row in rows)
+
+
+class JSONLExportWriter(TextExportWriter):
+    """One JSON object per line"""
+
+    def write(self, rows):
+        self.file.writelines(
+            json.dumps(dict(zip(BOOK_ROW_COLUMNS, map(_text_value, row))), ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+class ParquetExportWriter:
+    """Parquet file with one row group per chunk"""
+
+    def __init__(self, path, compression=None):
+        """
+        Args:
+            path (str): Output file path
+            compression (str, optional): One of PARQUET_COMPRESSION; pyarrow's
+                default (snappy) if None
+        """
+        if pyarrow is None:
+            raise ImportError("The parquet format needs pyarrow: pip install pyarrow")
+        if compression is not None and compression not in PARQUET_COMPRESSION:
+            raise ValueError(
+                f"Unknown compression '{compression}' for parquet, expected one of {PARQUET_COMPRESSION}"
+            )
+        self.schema = pyarrow.schema([
+            ('book_id', pyarrow.int64()),
+            ('title', pyarrow.string()),
+            ('author', pyarrow.string()),
+            ('genre', pyarrow.string()),
+            ('publication_year', pyarrow.int32()),
+            ('isbn', pyarrow.string()),
+            ('available', pyarrow.bool_()),
+            ('updated_at', pyarrow.timestamp('us')),
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression=compression or 'snappy')
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        # MySQL and SQLite both return booleans as 0/1
+        available = BOOK_ROW_COLUMNS.index('available')
+        columns[available] = [None if value is None else bool(value) for value in columns[available]]
+        arrays = [pyarrow.array(column, type=field.type) for column, field in zip(columns, self.schema)]
+        self.writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {
+    'csv': CSVExportWriter,
+    'jsonl': JSONLExportWriter,
+    'parquet': ParquetExportWriter,
+}
+
+
+def detect_format(path):
+    """
+    Guess the output format and compression from the file extension
+
+    Returns:
+        tuple: (format, compression) where compression is None unless the
+        name ends in .gz, .bz2 or .xz
+
+    Raises:
+        ValueError: If the extension is not a known format
+    """
+    root, extension = os.path.splitext(path)
+    extension = extension.lower().lstrip('.')
+    compression = COMPRESSION_EXTENSIONS.get(extension)
+    if compression is not None:
+        root, extension = os.path.splitext(root)
+        extension = extension.lower().lstrip('.')
+    if extension in ('json', 'ndjson'):
+        extension = 'jsonl'
+    if extension in WRITERS:
+        return extension, compression
+    raise ValueError(f"Cannot tell the format of '{path}', use --format")
+
+
+def write_rows(rows, path, file_format, chunk_size=10000, compression=None, on_chunk=None):
+    """
+    Write streamed book rows to a file
+
+    The file is written under a temporary name and renamed once complete,
+    so a failed export never leaves a truncated file at path.
+
+    Args:
+        rows (iterable): Tuples in BOOK_ROW_COLUMNS order
+        path (str): Output file path
+        file_format (str): One of the WRITERS keys
+        chunk_size (int): Rows per write (and per Parquet row group)
+        compression (str, optional): Compression codec for the format
+        on_chunk (callable, optional): Called as on_chunk(rows_in_chunk, seconds)
+            after each chunk is written
+
+    Returns:
+        dict: rows, bytes and seconds of the export
+    """
+    if file_format not in WRITERS:
+        raise ValueError(f"Unknown export format '{file_format}', expected one of {tuple(WRITERS)}")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    partial_path = path + '.part'
+    start = time.perf_counter()
+    count = 0
+    writer = WRITERS[file_format](partial_path, compression)
+    try:
+        rows = iter(rows)
+        while True:
+            chunk_start = time.perf_counter()
+            chunk = [row for _, row in zip(range(chunk_size), rows)]
+            if not chunk:
+                break
+            writer.write(chunk)
+            count += len(chunk)
+            if on_chunk:
+                on_chunk(len(chunk), time.perf_counter() - chunk_start)
+        writer.close()
+        os.replace(partial_path, path)
+    except BaseException:
+        writer.close()
+        os.remove(partial_path)
+        raise
+    return {
+        'rows': count,
+        'bytes': os.path.getsize(path),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+class ExportProgress:
+    """Print exported row counts and throughput while an export runs"""
+
+    def __init__(self, every=100000, stream=sys.stderr):
+        """
+        Args:
+            every (int): Report after at least this many new rows
+            stream (file): Where progress lines are written
+        """
+        self.every = every
+        self.stream = stream
+        self.rows = 0
+        self.start = time.perf_counter()
+        self._last_report = 0
+
+    def __call__(self, rows_in_chunk, seconds):
+        self.rows += rows_in_chunk
+        if self.rows - self._last_report >= self.every:
+            self._last_report = self.rows
+            elapsed = time.perf_counter() - self.start
+            rate = self.rows / elapsed if elapsed > 0 else 0.0
+            print(f"Exporting: {self.rows} books in {elapsed:.1f}s ({rate:.0f} rows/s)", file=self.stream)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export books to a CSV, JSONL or Parquet file.")
+    parser.add_argument('path', help="Output file; .gz, .bz2 or .xz compresses CSV and JSONL")
+    parser.add_argument('--format', choices=sorted(WRITERS), help="Output format (default: from the file extension)")
+    parser.add_argument('--compression', help="gzip, bz2 or xz for CSV and JSONL; "
+                        f"{', '.join(PARQUET_COMPRESSION)} for Parquet")
+    parser.add_argument('--search', help="Only export books matching this search term")
+    parser.add_argument('--mode', choices=SEARCH_MODES, help="Search mode for --search")
+    parser.add_argument('--config', default='config.ini', help="Database configuration file")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Rows fetched and written at a time")
+    parser.add_argument('--progress-every', type=int, default=100000, help="Rows between progress reports")
+    args = parser.parse_args(argv)
+
+    file_format, compression = args.format, args.compression
+    if file_format is None:
+        try:
+            file_format, detected = detect_format(args.path)
+        except ValueError as e:
+            parser.error(str(e))
+        compression = compression or detected
+
+    db = DatabaseConnection(config_file=args.config)
+    try:
+        stats = db.export_books(
+            args.path,
+            file_format=file_format,
+            search_term=args.search,
+            mode=args.mode,
+            chunk_size=args.chunk_size,
+            compression=compression,
+            on_chunk=ExportProgress(every=args.progress_every)
+        )
+    except (ImportError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+
+    if stats is None:
+        print("Export failed, no file was written", file=sys.stderr)
+        return 1
+
+    rate = stats['rows'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+    print(
+        f"Exported: {stats['rows']} books in {stats['seconds']:.1f}s "
+        f"({rate:.0f} rows/s, {stats['bytes'] / 1e6:.1f} MB)",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
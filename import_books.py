@@ -0,0 +1,183 @@
+"""
+Command-line loader that streams books from CSV or JSONL files into the database.
+
+Usage:
+    python import_books.py catalogue.csv
+    python import_books.py catalogue.jsonl --batch-size 5000
+
+CSV files need a header row with title, author and genre columns, and may
+also have publication_year and isbn. JSONL files hold one JSON object per
+line with the same keys. Rows are read lazily and sent in batches, so memory
+use does not grow with the file size.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from database import BOOK_FIELDS, DatabaseConnection
+
+
+def _clean_record(record, line_number):
+    """
+    Normalize one input record
+
+    Args:
+        record (dict): Raw record read from the file
+        line_number (int): Position in the file, for error messages
+
+    Returns:
+        tuple: Values in BOOK_FIELDS order, or None if the record is invalid
+    """
+    values = {}
+    for field in BOOK_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str):
+            value = value.strip() or None
+        values[field] = value
+
+    if not values['title'] or not values['author'] or not values['genre']:
+        print(f"Skipping line {line_number}: title, author and genre are required", file=sys.stderr)
+        return None
+
+    if values['publication_year'] is not None:
+        try:
+            values['publication_year'] = int(values['publication_year'])
+        except (TypeError, ValueError):
+            print(f"Skipping line {line_number}: publication_year must be a number", file=sys.stderr)
+            return None
+
+    return tuple(values[field] for field in BOOK_FIELDS)
+
+
+def read_csv(path):
+    """Yield raw records from a CSV file with a header row"""
+    with open(path, newline='', encoding='utf-8') as f:
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            yield line_number, row
+
+
+def read_jsonl(path):
+    """Yield raw records from a file with one JSON object per line"""
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {line_number}: {e}", file=sys.stderr)
+                continue
+            if not isinstance(record, dict):
+                print(f"Skipping line {line_number}: expected a JSON object", file=sys.stderr)
+                continue
+            yield line_number, record
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+def stream_books(path, file_format, stats):
+    """
+    Yield valid book records from a file
+
+    Args:
+        path (str): Input file path
+        file_format (str): One of the READERS keys
+        stats (dict): Updated with a 'skipped' count of invalid records
+    """
+    for line_number, record in READERS[file_format](path):
+        values = _clean_record(record, line_number)
+        if values is None:
+            stats['skipped'] += 1
+            continue
+        yield values
+
+
+def detect_format(path):
+    """Guess the input format from the file extension"""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('json', 'ndjson'):
+        return 'jsonl'
+    if extension in READERS:
+        return extension
+    raise ValueError(f"Cannot tell the format of '{path}', use --format")
+
+
+class ProgressReporter:
+    """Print loaded row counts and throughput while a bulk load runs"""
+
+    def __init__(self, every=10000, stream=sys.stderr):
+        """
+        Args:
+            every (int): Report after at least this many new rows
+            stream (file): Where progress lines are written
+        """
+        self.every = every
+        self.stream = stream
+        self.rows = 0
+        self.start = time.perf_counter()
+        self._last_report = 0
+
+    def __call__(self, rows_in_batch, first_id):
+        self.rows += rows_in_batch
+        if self.rows - self._last_report >= self.every:
+            self._last_report = self.rows
+            self.report()
+
+    def rate(self):
+        """Rows loaded per second so far"""
+        elapsed = time.perf_counter() - self.start
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def report(self, final=False):
+        elapsed = time.perf_counter() - self.start
+        label = "Loaded" if final else "Loading"
+        print(f"{label}: {self.rows} books in {elapsed:.1f}s ({self.rate():.0f} rows/s)", file=self.stream)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk load books from a CSV or JSONL file.")
+    parser.add_argument('path', help="Input file")
+    parser.add_argument('--format', choices=sorted(READERS), help="Input format (default: from the file extension)")
+    parser.add_argument('--config', default='config.ini', help="Database configuration file")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Rows per INSERT statement")
+    parser.add_argument('--progress-every', type=int, default=10000, help="Rows between progress reports")
+    args = parser.parse_args(argv)
+
+    try:
+        file_format = args.format or detect_format(args.path)
+    except ValueError as e:
+        parser.error(str(e))
+
+    db = DatabaseConnection(config_file=args.config)
+    stats = {'skipped': 0}
+    progress = ProgressReporter(every=args.progress_every)
+    try:
+        loaded = db.add_books_bulk(
+            stream_books(args.path, file_format, stats),
+            batch_size=args.batch_size,
+            return_ids=False,
+            on_batch=progress
+        )
+    finally:
+        db.close()
+
+    if loaded is None:
+        print("Import failed, no books were added", file=sys.stderr)
+        return 1
+
+    progress.report(final=True)
+    if stats['skipped']:
+        print(f"Skipped {stats['skipped']} invalid records", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
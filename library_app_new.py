@@ -1,19 +1,520 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
+import configparser
 import os
-from database import DatabaseConnection
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from catalogue_snapshot import CatalogueSnapshot
+
+
+class BackgroundRunner:
+    """
+    Runs database calls on worker threads and delivers results on the Tk thread.
+    
+    Tk widgets may only be touched from the main loop, so finished calls are
+    queued and picked up by a short root.after() poll that only runs while
+    work is outstanding.
+    """
+    
+    POLL_MS = 20
+    
+    def __init__(self, root, workers=2):
+        """
+        Args:
+            root (tk.Tk): Main window, used to schedule polling
+            workers (int): Number of worker threads
+        """
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="library-db")
+        self.done = queue.Queue()
+        self.outstanding = 0
+        self.closed = False
+        
+    def submit(self, callback, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on a worker thread
+        
+        Args:
+            callback (callable): Called on the Tk thread as callback(result, error),
+                where error is the exception raised by fn or None
+            fn (callable): Function to run
+            
+        Returns:
+            Future: Can be cancelled while the call is still queued
+        """
+        future = self.executor.submit(fn, *args, **kwargs)
+        self.outstanding += 1
+        future.add_done_callback(lambda f: self.done.put((f, callback)))
+        if self.outstanding == 1:
+            self.root.after(self.POLL_MS, self._poll)
+        return future
+    
+    def _poll(self):
+        while True:
+            try:
+                future, callback = self.done.get_nowait()
+            except queue.Empty:
+                break
+            self.outstanding -= 1
+            if future.cancelled() or self.closed:
+                continue
+            error = future.exception()
+            callback(None if error else future.result(), error)
+            
+        if self.outstanding and not self.closed:
+            self.root.after(self.POLL_MS, self._poll)
+            
+    def shutdown(self):
+        """Drop queued calls and stop delivering results"""
+        self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class TreeDiffRenderer:
+    """
+    Brings a flat Treeview in line with a new result set by patching only what changed.
+    
+    Rows are keyed by book_id, which is used as the Treeview item ID. A
+    render deletes the rows that are gone, inserts the new ones, rewrites
+    the values of changed rows and reorders only if the order changed.
+    Striping tags are rewritten only on rows whose parity flipped.
+    """
+    
+    def __init__(self, tree):
+        """
+        Args:
+            tree (ttk.Treeview): Treeview to manage; nothing else should insert into it
+        """
+        self.tree = tree
+        self.rows = {}
+        self.order = []
+        self.tags = {}
+        
+    def __len__(self):
+        return len(self.order)
+    
+    @staticmethod
+    def item_id(row):
+        return str(row[0])
+    
+    def render(self, rows, offset=0):
+        """
+        Show rows in the given order
+        
+        Args:
+            rows (list): Book rows whose first value is the book_id
+            offset (int): Absolute position of the first row, so striping
+                stays stable while a window slides over a longer list
+                
+        Returns:
+            dict: Number of rows inserted, updated, moved, deleted and restriped
+        """
+        counts = {'inserted': 0, 'updated': 0, 'moved': 0, 'deleted': 0, 'restriped': 0}
+        new_order = [self.item_id(row) for row in rows]
+        new_rows = dict(zip(new_order, rows))
+        
+        gone = [item for item in self.order if item not in new_rows]
+        if gone:
+            self.tree.delete(*gone)
+            for item in gone:
+                del self.rows[item]
+                del self.tags[item]
+            counts['deleted'] = len(gone)
+            
+        kept = [item for item in self.order if item in new_rows]
+        # Without moves, each new row can be inserted straight at its final index
+        in_place = kept == [item for item in new_order if item in self.rows]
+        
+        for index, item in enumerate(new_order):
+            row = new_rows[item]
+            tag = "evenrow" if (offset + index) % 2 == 0 else "oddrow"
+            if item not in self.rows:
+                self.tree.insert("", index if in_place else tk.END, iid=item, values=row, tags=(tag,))
+                counts['inserted'] += 1
+            else:
+                if self.rows[item] != row:
+                    self.tree.item(item, values=row)
+                    counts['updated'] += 1
+                if self.tags[item] != tag:
+                    self.tree.item(item, tags=(tag,))
+                    counts['restriped'] += 1
+            self.rows[item] = row
+            self.tags[item] = tag
+            
+        if not in_place:
+            kept_set = set(kept)
+            counts['moved'] = sum(
+                1 for old, new in zip(kept, (item for item in new_order if item in kept_set))
+                if old != new
+            )
+            self.tree.set_children("", *new_order)
+        self.order = new_order
+        return counts
+    
+    def remove(self, item):
+        """Delete one row and restripe the rows below it"""
+        if item in self.rows:
+            self.render([self.rows[other] for other in self.order if other != item])
+            
+    def patch(self, changed, removed=()):
+        """
+        Rewrite or drop rows in place, keeping their order
+        
+        Args:
+            changed (dict): book_id -> new row for rows to rewrite
+            removed (set): book_ids of rows to drop
+        """
+        rows = (self.rows[item] for item in self.order)
+        self.render([changed.get(row[0], row) for row in rows if row[0] not in removed])
+            
+    def clear(self):
+        self.render([])
+
+
+class VirtualBookView:
+    """
+    Shows a keyset-paginated book list in a Treeview, one sliding window at a time.
+    
+    At most max_pages pages of rows exist in the Treeview. Scrolling near the
+    bottom fetches the next page and drops rows from the top; scrolling near
+    the top does the reverse.
+    """
+    
+    # Fraction of the scroll range at either edge that triggers a page fetch
+    EDGE = 0.1
+    
+    def __init__(self, tree, scrollbar, page_size=200, max_pages=3, runner=None, on_error=None, on_scroll=None):
+        """
+        Args:
+            tree (ttk.Treeview): Treeview to fill
+            scrollbar (ttk.Scrollbar): Vertical scrollbar attached to the tree
+            page_size (int): Rows fetched per page
+            max_pages (int): Pages kept in the Treeview at once
+            runner (BackgroundRunner, optional): Fetch pages off the Tk thread
+            on_error (callable, optional): Called with the exception when a page fetch fails
+            on_scroll (callable, optional): Called without arguments whenever the
+                visible rows may have changed
+        """
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.runner = runner
+        self.on_error = on_error
+        self.on_scroll = on_scroll
+        self.renderer = TreeDiffRenderer(tree)
+        self.fetch_page = None
+        self.window = []
+        self.offset = 0
+        self.at_start = True
+        self.at_end = True
+        self._pending = False
+        self._generation = 0
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        
+    @property
+    def max_rows(self):
+        return self.page_size * self.max_pages
+    
+    def show(self, fetch_page, first_rows=None):
+        """
+        Replace the contents with the first page of a new source
+        
+        Args:
+            fetch_page (callable): Called as fetch_page(after=, before=, page_size=)
+                with (title, book_id) keys, like DatabaseConnection.get_books_page
+            first_rows (list, optional): First page if it was already fetched
+                
+        Returns:
+            int: Number of rows in the first page, or None if the fetch failed
+        """
+        self.fetch_page = fetch_page
+        self._generation += 1
+        self._pending = False
+        
+        rows = first_rows if first_rows is not None else fetch_page(page_size=self.page_size)
+        if rows is None:
+            return None
+        self.offset = 0
+        self.at_start = True
+        self.at_end = len(rows) < self.page_size
+        self._render(list(rows))
+        self.tree.yview_moveto(0)
+        return len(rows)
+    
+    def reload(self):
+        """
+        Re-fetch the rows in the window in place, e.g. after a write
+        
+        The scroll position is kept and only rows that changed are redrawn.
+        """
+        if self.fetch_page is None:
+            return
+        if not self.window or self.at_start:
+            after = None
+        else:
+            # Everything at or after the first row: (title, book_id - 1) sorts just before it
+            first = self.window[0]
+            after = (first[1], int(first[0]) - 1)
+        requested = max(len(self.window), self.page_size)
+        self._pending = True
+        
+        def apply(rows):
+            self.at_end = len(rows) < requested
+            self._render(list(rows))
+            
+        self._fetch(apply, after=after, page_size=requested)
+        
+    def __len__(self):
+        return len(self.window)
+    
+    def remove(self, item):
+        """Delete one row from the view and fix the striping of the rest"""
+        self._render([row for row in self.window if self.renderer.item_id(row) != item])
+        
+    def patch(self, changed, removed=()):
+        """Rewrite or drop rows in the window without fetching, see TreeDiffRenderer.patch"""
+        self._render([changed.get(row[0], row) for row in self.window if row[0] not in removed])
+        
+    def _render(self, rows):
+        self.window = rows
+        return self.renderer.render(rows, self.offset)
+    
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self.on_scroll:
+            self.on_scroll()
+        if self._pending or self.fetch_page is None or not self.window:
+            return
+        if float(last) > 1 - self.EDGE and not self.at_end:
+            self._pending = True
+            self.tree.after_idle(self._load_next)
+        elif float(first) < self.EDGE and not self.at_start:
+            self._pending = True
+            self.tree.after_idle(self._load_previous)
+            
+    def _fetch(self, apply, page_size=None, **kwargs):
+        """Fetch a page, on the runner if there is one, and hand it to apply()"""
+        generation = self._generation
+        page_size = page_size or self.page_size
+        
+        def deliver(rows, error):
+            # Pages of a source that show() has since replaced are dropped
+            if generation != self._generation:
+                return
+            self._pending = False
+            if error:
+                if self.on_error:
+                    self.on_error(error)
+            elif rows is not None:
+                apply(rows)
+                
+        if self.runner:
+            self.runner.submit(deliver, self.fetch_page, page_size=page_size, **kwargs)
+            return
+        try:
+            rows = self.fetch_page(page_size=page_size, **kwargs)
+        except Exception as e:
+            deliver(None, e)
+        else:
+            deliver(rows, None)
+            
+    def _move_view(self, shift, old_total):
+        """Keep the same rows on screen after shift rows were added or removed above them"""
+        first = self.tree.yview()[0]
+        total = len(self.window)
+        if total:
+            self.tree.yview_moveto((first * old_total + shift) / total)
+            
+    @staticmethod
+    def _key(row):
+        """Keyset pagination key (title, book_id) of a row"""
+        return (row[1], row[0])
+    
+    def _load_next(self):
+        if not self.window:
+            self._pending = False
+            return
+        self._fetch(self._append_page, after=self._key(self.window[-1]))
+        
+    def _append_page(self, rows):
+        self.at_end = len(rows) < self.page_size
+        if not rows:
+            return
+        old_total = len(self.window)
+        window = self.window + list(rows)
+        dropped = max(0, len(window) - self.max_rows)
+        if dropped:
+            window = window[dropped:]
+            self.offset += dropped
+            self.at_start = False
+        self._render(window)
+        if dropped:
+            self._move_view(-dropped, old_total)
+            
+    def _load_previous(self):
+        if not self.window:
+            self._pending = False
+            return
+        self._fetch(self._prepend_page, before=self._key(self.window[0]))
+        
+    def _prepend_page(self, rows):
+        self.at_start = len(rows) < self.page_size
+        if not rows:
+            return
+        old_total = len(self.window)
+        window = list(rows) + self.window
+        self.offset -= len(rows)
+        if len(window) > self.max_rows:
+            window = window[:self.max_rows]
+            self.at_end = False
+        self._render(window)
+        self._move_view(len(rows), old_total)
+
 
 class LibraryBookApp:
-    def __init__(self, root):
+    def __init__(self, root, virtual_scroll=True, search_delay_ms=300, use_cache=False,
+                 fast_start=False, snapshot_path='catalogue.snapshot', snapshot_max_age=24 * 3600):
+        """
+        Args:
+            root (tk.Tk): Main window
+            virtual_scroll (bool): Page books into the list as it scrolls instead
+                of loading the whole catalogue at once
+            search_delay_ms (int): Pause in typing before the search box runs a query
+            use_cache (bool): Keep the catalogue in memory and refresh it
+                incrementally instead of querying the database for every list
+            fast_start (bool): Show the window at once with the catalogue saved
+                at the last exit, and connect to the database in the background;
+                implies use_cache
+            snapshot_path (str): Catalogue snapshot file used by fast_start
+            snapshot_max_age (float): Seconds after which a snapshot is only shown,
+                and the cache is loaded from the database instead of reconciled
+        """
         self.root = root
         self.root.title("Library Book Records")
         self.root.geometry("900x600")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
-        # Initialize database connection
-        self.db = DatabaseConnection(config_file='config.ini')
+        # Queries run on worker threads so the window never waits on the database
+        self.runner = BackgroundRunner(self.root)
         
+        # Reads and writes go through the cache when it is enabled
+        self.use_cache = use_cache or fast_start
+        self.fast_start = fast_start
+        self.snapshot_path = snapshot_path if fast_start else None
+        self.snapshot_max_age = snapshot_max_age
+        self.snapshot = CatalogueSnapshot.open(snapshot_path) if fast_start else None
+        self._snapshot_marker = self.snapshot.marker if self.snapshot is not None else None
+        self.db = None
+        self.cache = None
+        self.source = None
+        self.search_delay_ms = search_delay_ms
+        self._search_after_id = None
+        self._search_future = None
+        self._search_generation = 0
+        
+        # Suggestions under the search box, when [search] autocomplete is enabled
+        self.suggestion_limit = 8
+        self._suggestions = []
+        self._suggest_generation = 0
+        self._picking = False
+        
+        # Values listed per breakdown in the statistics window, when [summary] is enabled
+        self.stats_limit = 50
+        
+        # Other desks' edits arrive from the change log, when [changes] is enabled
+        self.change_feed = None
+        self._changes_after_id = None
+        
+        # Details of the rows on screen are fetched ahead of the editor
+        self.prefetch_delay_ms = 150
+        self._prefetch_after_id = None
+        
+        self.virtual_scroll = virtual_scroll
+        self.book_view = None
+        self.renderer = None
         self.create_widgets()
-        self.load_books()
+        if fast_start:
+            # The database driver is imported and connected on a worker
+            self.show_snapshot()
+            self.runner.submit(self._database_opened, self._open_database)
+        else:
+            self._database_opened(self._open_database(), None)
+    
+    def _open_database(self):
+        """
+        Connect to the database and prepare the catalogue cache
+        
+        In fast-start mode this runs on a worker thread while the window
+        shows the snapshot. A fresh enough snapshot seeds the cache, and
+        the refresh then only reads the changes made since it was saved.
+        
+        Returns:
+            tuple: (DatabaseConnection, CatalogueCache or None, ChangeFeed or None)
+        """
+        # Imported here so the window can appear before the driver loads
+        from database import DatabaseConnection
+        from catalogue_cache import CatalogueCache
+        
+        # Initialize pooled database connection, reused by every action
+        db = DatabaseConnection(config_file='config.ini', pooled=True)
+        cache = CatalogueCache(db) if self.use_cache else None
+        # Subscribed before the first load, so no change falls between the two
+        feed = db.subscribe_changes() if db.changes_config['enabled'] else None
+        if cache is not None and self.snapshot is not None:
+            if self.snapshot.age <= self.snapshot_max_age:
+                cache.restore(self.snapshot)
+            cache.refresh()
+        return db, cache, feed
+    
+    def _database_opened(self, result, error):
+        """Switch the window from the snapshot to the database on the Tk thread"""
+        if error:
+            messagebox.showerror("Database Error", f"Error connecting to the database: {error}")
+            self.status_label.config(text="✗ Error connecting to the database")
+            return
+        self.db, self.cache, self.change_feed = result
+        self.source = self.cache if self.cache is not None else self.db
+        # Pages still being fetched from the snapshot keep it mapped until they finish
+        self.snapshot = None
+        # The list on screen is patched to the reconciled catalogue
+        self._request_books(self.search_var.get().strip())
+        if self.change_feed is not None:
+            self._schedule_change_poll()
+    
+    def _connected(self):
+        """Whether writes can run yet; tells the user to wait if not"""
+        if self.source is not None:
+            return True
+        messagebox.showinfo("Connecting", "Still connecting to the database, please try again in a moment")
+        return False
+    
+    def show_snapshot(self):
+        """Render the catalogue saved at the last exit while the database connects"""
+        if self.snapshot is None:
+            self.status_label.config(text="Connecting to the database...")
+            return
+        if self.book_view is not None:
+            first_rows = self.snapshot.get_books_page(page_size=self.book_view.page_size)
+            self.book_view.show(self.snapshot.get_books_page, first_rows=first_rows)
+        else:
+            self.renderer.render(self.snapshot.get_all_books())
+        saved = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.snapshot.saved_at))
+        self.status_label.config(text=f"Showing the catalogue saved {saved}, connecting to the database...")
+    
+    def on_close(self):
+        """Stop background queries, save the catalogue snapshot, close pooled connections and exit"""
+        if self._changes_after_id is not None:
+            self.root.after_cancel(self._changes_after_id)
+        self.runner.shutdown()
+        if self.snapshot_path and self.cache is not None and self.cache.marker != self._snapshot_marker:
+            # Only a cache that reached the database since startup has anything newer to save
+            self.cache.save_snapshot(self.snapshot_path)
+        if self.db is not None:
+            self.db.close()
+        self.root.destroy()
     
     # Desktop widgets    
     def create_widgets(self):
@@ -71,6 +572,19 @@ class LibraryBookApp:
             cursor = "hand2"
         ).pack(side = tk.LEFT, padx = 5)
         
+        # Statistics button
+        tk.Button(
+            button_frame,
+            text = "Statistics",
+            command = self.show_statistics,
+            bg = "#8e44ad",
+            fg = "white",
+            padx = 15,
+            pady = 5,
+            font = ("Arial", 10, "bold"),
+            cursor = "hand2"
+        ).pack(side = tk.LEFT, padx = 5)
+        
         # Search frame
         search_frame = tk.Frame(self.root, pady=10, bg = "#ecf0f1")
         search_frame.pack(fill = tk.X, padx = 20)
@@ -83,14 +597,32 @@ class LibraryBookApp:
         ).pack(side = tk.LEFT, padx=5)
         
         self.search_var = tk.StringVar()
-        self.search_var.trace('w', lambda *args: self.search_books())
-        search_entry = tk.Entry(
+        self.search_var.trace('w', lambda *args: self.on_search_typed())
+        self.search_entry = tk.Entry(
             search_frame,
             textvariable=self.search_var,
             width = 35,
             font = ("Arial", 10)
         )
-        search_entry.pack(side = tk.LEFT, padx = 5)
+        self.search_entry.pack(side = tk.LEFT, padx = 5)
+        self.search_entry.bind("<Return>", lambda event: self.run_search_now())
+        self.search_entry.bind("<Down>", lambda event: self.focus_suggestions())
+        self.search_entry.bind("<Escape>", lambda event: self.hide_suggestions())
+        
+        # Autocomplete dropdown, placed under the search box while it has suggestions
+        self.suggestion_list = tk.Listbox(
+            self.root,
+            height = self.suggestion_limit,
+            font = ("Arial", 10),
+            activestyle = "none",
+            selectbackground = "#3498db",
+            relief = tk.SOLID,
+            bd = 1
+        )
+        self.suggestion_list.bind("<ButtonRelease-1>", lambda event: self.pick_suggestion())
+        self.suggestion_list.bind("<Return>", lambda event: self.pick_suggestion())
+        self.suggestion_list.bind("<Escape>", lambda event: self.hide_suggestions())
+        self.suggestion_list.bind("<Up>", self._suggestion_up)
         
         tk.Button(
             search_frame,
@@ -154,6 +686,18 @@ class LibraryBookApp:
         vsb.config(command = self.tree.yview)
         hsb.config(command = self.tree.xview)
         
+        # Virtual scrolling takes over the vertical scroll callback
+        if self.virtual_scroll:
+            self.book_view = VirtualBookView(
+                self.tree, vsb,
+                runner=self.runner,
+                on_error=lambda e: self.status_label.config(text=f"✗ Error loading books: {e}"),
+                on_scroll=self.schedule_prefetch
+            )
+        else:
+            self.renderer = TreeDiffRenderer(self.tree)
+            self.tree.configure(yscrollcommand=lambda first, last: (vsb.set(first, last), self.schedule_prefetch()))
+        
         # Column headings
         self.tree.heading("ID", text = "Book ID")
         self.tree.heading("Title", text = "Title")
@@ -186,73 +730,420 @@ class LibraryBookApp:
         
         # Double click to edit
         self.tree.bind("<Double-1>", lambda event: self.edit_book_dialog())
+        
+        # Ctrl/Shift-click select several rows; Ctrl+A selects every loaded row
+        self.tree.bind("<Control-a>", lambda event: self.tree.selection_set(self.tree.get_children()))
     
     # Database operations
     def load_books(self):
         """Load all books from database"""
-        try:
-            # Clear the treeview
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Connect to database and get books
-            self.db.connect()
-            books = self.db.get_all_books()
-            
-            if books:
-                for index, book in enumerate(books):
-                    tag = "evenrow" if index % 2 == 0 else "oddrow"
-                    self.tree.insert("", tk.END, values=book, tags=(tag,))
-                
-                self.status_label.config(text=f"✓ Loaded {len(books)} books")
-            else:
-                self.status_label.config(text="No books found in database")
-                
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Error loading books: {e}")
-            self.status_label.config(text="✗ Error loading books")
-        finally:
-            self.db.disconnect()
+        self._request_books("")
+    
+    def on_search_typed(self):
+        """Update the suggestions and schedule a search after each change to the search box"""
+        if self._picking:
+            return
+        self.request_suggestions()
+        self.schedule_search()
+        
+    def schedule_search(self):
+        """Run search_books once typing pauses for search_delay_ms"""
+        self._cancel_scheduled_search()
+        self._search_after_id = self.root.after(self.search_delay_ms, self.search_books)
+        
+    def _cancel_scheduled_search(self):
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+            self._search_after_id = None
     
     def search_books(self):
         """Search books based on search term"""
-        search_term = self.search_var.get().strip()
+        self._search_after_id = None
+        self._request_books(self.search_var.get().strip())
+        
+    def _request_books(self, search_term):
+        """
+        Fetch all books, or the books matching search_term, on a worker thread
         
-        # Clear the treeview
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        Only the newest request is shown: a request still waiting for a
+        worker is cancelled and results of older ones are discarded.
+        """
+        if self.source is None:
+            # Fast start: the snapshot stays on screen until the database connects
+            if search_term:
+                self.status_label.config(text="Still connecting, the search runs once connected...")
+            return
+        
+        self._search_generation += 1
+        generation = self._search_generation
+        if self._search_future:
+            self._search_future.cancel()
             
-        if not search_term:
-            self.load_books()
+        if self.book_view is not None:
+            if search_term:
+                fetch_page = partial(self.source.search_books_page, search_term)
+            else:
+                fetch_page = self.source.get_books_page
+            # Later pages are fetched while scrolling, and tracked as such
+            call = partial(fetch_page, page_size=self.book_view.page_size)
+            fetch_page = self._tracked("scroll_books", fetch_page)
+        else:
+            fetch_page = None
+            if search_term:
+                call = partial(self.source.search_books, search_term)
+            else:
+                call = self.source.get_all_books
+                
+        if self.cache is not None and not search_term:
+            # Loading the list pulls in other desks' changes first
+            call = partial(self._refresh_cache_then, call)
+        call = self._tracked("search_books" if search_term else "load_books", call)
+                
+        self.status_label.config(text="Searching..." if search_term else "Loading books...")
+        self._search_future = self.runner.submit(
+            lambda books, error: self._show_books(generation, search_term, fetch_page, books, error),
+            call
+        )
+        
+    def _tracked(self, action, fn):
+        """Wrap fn so the queries it runs are recorded under a GUI action name"""
+        stats = self.db.query_stats
+        if stats is None:
+            return fn
+        
+        def run(*args, **kwargs):
+            with stats.action(action):
+                return fn(*args, **kwargs)
+        return run
+    
+    def _refresh_cache_then(self, call):
+        """Incrementally refresh the catalogue cache, then run call(); runs on a worker"""
+        self.cache.refresh()
+        return call()
+        
+    def _show_books(self, generation, search_term, fetch_page, books, error):
+        """Render the result of _request_books on the Tk thread"""
+        if generation != self._search_generation:
             return
+        self._search_future = None
         
-        try:
-            # Connect to database and search books
-            self.db.connect()
-            books = self.db.search_books(search_term)
+        action = "searching for" if search_term else "loading"
+        if error:
+            messagebox.showerror("Database Error", f"Error {action} books: {error}")
+            self.status_label.config(text=f"✗ Error {action} books")
+            return
+        if books is None:
+            self.status_label.config(text=f"✗ Error {action} books")
+            return
             
-            if books:
-                for index, book in enumerate(books):
-                    tag = "evenrow" if index % 2 == 0 else "oddrow"
-                    self.tree.insert("", tk.END, values=book, tags=(tag,))
+        # Both paths patch only the rows that differ from what is on screen
+        if self.book_view is not None:
+            self.book_view.show(fetch_page, first_rows=books)
+        else:
+            self.renderer.render(books)
                 
-                self.status_label.config(text=f"✓ Found {len(books)} books matching '{search_term}'")
-            else:
+        if not books:
+            if search_term:
                 self.status_label.config(text=f"No books found matching '{search_term}'")
-                
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Error searching for books: {e}")
-            self.status_label.config(text="✗ Error searching for books")
-        finally:
-            self.db.disconnect()
+            else:
+                self.status_label.config(text="No books found in database")
+        elif self.book_view is not None:
+            more = "" if self.book_view.at_end else " (scroll for more)"
+            matching = f" matching '{search_term}'" if search_term else ""
+            self.status_label.config(text=f"✓ Showing books{matching}{more}")
+        elif search_term:
+            self.status_label.config(text=f"✓ Found {len(books)} books matching '{search_term}'")
+        else:
+            self.status_label.config(text=f"✓ Loaded {len(books)} books")
     
+    def refresh_books(self):
+        """Re-fetch the books on screen after a write, redrawing only changed rows"""
+        if self.book_view is not None and self.book_view.fetch_page is not None:
+            self.book_view.reload()
+        else:
+            self._request_books(self.search_var.get().strip())
+            
     def clear_search(self):
         """Clear search and reload all books"""
         self.search_var.set("")
+        self._cancel_scheduled_search()
+        self.hide_suggestions()
         self.load_books()
         
+    def run_search_now(self):
+        """Search for the text in the search box without waiting for the typing pause"""
+        self._cancel_scheduled_search()
+        self.hide_suggestions()
+        self.search_books()
+        
+    # Change feed
+    def _schedule_change_poll(self):
+        interval_ms = int(self.db.changes_config['interval'] * 1000)
+        self._changes_after_id = self.root.after(interval_ms, self.poll_changes)
+        
+    def poll_changes(self):
+        """Read other desks' changes from the change log on a worker thread"""
+        self._changes_after_id = None
+        self.runner.submit(self._changes_arrived, self._read_changes)
+        
+    def _read_changes(self):
+        """Poll the change feed and apply the events to the catalogue cache; runs on a worker"""
+        events = self.change_feed.poll()
+        if events and self.cache is not None:
+            self.cache.apply_changes(events)
+        return events
+        
+    def _changes_arrived(self, events, error):
+        """Patch the list with polled changes on the Tk thread, then schedule the next poll"""
+        self._schedule_change_poll()
+        if error or not events:
+            return
+        if self.cache is not None:
+            # The cache already holds the changes, so the list re-reads memory only
+            self.refresh_books()
+            return
+        
+        shown = self.book_view.window if self.book_view is not None else self.renderer.rows.values()
+        shown = {row[0]: row for row in shown}
+        searching = bool(self.search_var.get().strip())
+        changed = {}
+        removed = set()
+        needs_reload = False
+        for operation, book_id, row in events:
+            if operation == 'delete':
+                if book_id in shown:
+                    removed.add(book_id)
+            elif book_id in shown and row[1] == shown[book_id][1] and not searching:
+                # Same title, so the row keeps its place in the list
+                changed[book_id] = row[:4]
+            elif book_id in shown or searching or self._in_view(row[1]):
+                # The book may move into, out of or within the rows on screen
+                needs_reload = True
+        if changed or removed:
+            if self.book_view is not None:
+                self.book_view.patch(changed, removed)
+            else:
+                self.renderer.patch(changed, removed)
+        if needs_reload:
+            self.refresh_books()
+        self.status_label.config(text=f"✓ {len(events)} changed books received")
+        
+    def _in_view(self, title):
+        """Whether a book with this title may sort among the rows in the virtual view's window"""
+        view = self.book_view
+        if view is None or not view.window:
+            return True
+        # Only a rough test: the database's collation decides the real order
+        title = title.casefold()
+        if not view.at_start and title < view.window[0][1].casefold():
+            return False
+        if not view.at_end and title > view.window[-1][1].casefold():
+            return False
+        return True
+        
+    # Catalogue statistics
+    def show_statistics(self):
+        """Open a window with book and availability counts by genre, author and decade"""
+        if not self._connected():
+            return
+        if self.db.book_stats is None:
+            messagebox.showinfo("Statistics", "Catalogue statistics are disabled, set enabled = true in the [summary] section of config.ini")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Catalogue Statistics")
+        dialog.geometry("560x480")
+        dialog.transient(self.root)
+        
+        summary_label = tk.Label(dialog, text="Counting books...", font=("Arial", 11, "bold"), anchor="w")
+        summary_label.pack(fill=tk.X, padx=10, pady=10)
+        
+        notebook = ttk.Notebook(dialog)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10)
+        tables = {}
+        for dimension in ('genre', 'author', 'decade'):
+            frame = tk.Frame(notebook)
+            notebook.add(frame, text=dimension.capitalize())
+            table = ttk.Treeview(frame, columns=("Value", "Books", "Available", "Ratio"), show="headings")
+            vsb = ttk.Scrollbar(frame, orient="vertical", command=table.yview)
+            table.configure(yscrollcommand=vsb.set)
+            vsb.pack(side=tk.RIGHT, fill=tk.Y)
+            table.pack(fill=tk.BOTH, expand=True)
+            table.heading("Value", text=dimension.capitalize())
+            table.heading("Books", text="Books")
+            table.heading("Available", text="Available")
+            table.heading("Ratio", text="% Available")
+            table.column("Value", width=240, anchor=tk.W)
+            table.column("Books", width=80, anchor=tk.E)
+            table.column("Available", width=80, anchor=tk.E)
+            table.column("Ratio", width=90, anchor=tk.E)
+            tables[dimension] = table
+        
+        def show(stats, error):
+            if not dialog.winfo_exists():
+                return
+            if error or stats is None:
+                summary_label.config(text=f"✗ Error loading statistics: {error or 'see the console'}")
+                return
+            summary_label.config(
+                text=f"{stats['books']} books, {stats['available']} available ({stats['available_ratio']:.0%})"
+            )
+            for dimension, table in tables.items():
+                table.delete(*table.get_children())
+                for value, books, available, ratio in stats[dimension]:
+                    if value is None:
+                        value = "Unknown"
+                    elif dimension == 'decade':
+                        value = f"{value}s"
+                    table.insert("", tk.END, values=(value, books, available, f"{ratio:.0%}"))
+        
+        def refresh():
+            summary_label.config(text="Counting books...")
+            # The first call loads the counters, so it runs off the Tk thread like a query
+            self.runner.submit(show, self.db.get_catalogue_stats, self.stats_limit)
+            
+        def rebuilt(stats, error):
+            if stats is None:
+                show(None, error)
+            elif dialog.winfo_exists():
+                refresh()
+            
+        def rebuild():
+            summary_label.config(text="Recounting the whole catalogue...")
+            self.runner.submit(rebuilt, self.db.rebuild_catalogue_stats)
+        
+        button_frame = tk.Frame(dialog)
+        button_frame.pack(pady=10)
+        
+        tk.Button(
+            button_frame,
+            text="Refresh",
+            command=refresh,
+            bg="#27ae60",
+            fg="white",
+            padx=15,
+            pady=5
+        ).pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(
+            button_frame,
+            text="Rebuild",
+            command=rebuild,
+            bg="#f39c12",
+            fg="white",
+            padx=15,
+            pady=5
+        ).pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(
+            button_frame,
+            text="Close",
+            command=dialog.destroy,
+            bg="#e74c3c",
+            fg="white",
+            padx=15,
+            pady=5
+        ).pack(side=tk.LEFT, padx=5)
+        
+        refresh()
+        
+    # Detail prefetch
+    def schedule_prefetch(self):
+        """Prefetch the details of the visible rows once scrolling pauses"""
+        if self.cache is not None or self.db is None or self.db.detail_cache is None:
+            # The catalogue cache already holds every column
+            return
+        if self._prefetch_after_id is not None:
+            self.root.after_cancel(self._prefetch_after_id)
+        self._prefetch_after_id = self.root.after(self.prefetch_delay_ms, self.prefetch_visible)
+        
+    def prefetch_visible(self):
+        """Load the details of the rows on screen into the detail cache on a worker thread"""
+        self._prefetch_after_id = None
+        items = self.tree.get_children()
+        if not items:
+            return
+        first, last = self.tree.yview()
+        start = int(first * len(items))
+        end = min(len(items), int(last * len(items)) + 1)
+        book_ids = [self.tree.item(item, 'values')[0] for item in items[start:end]]
+        # Books already cached cost no query, and failures only mean the editor fetches later
+        self.runner.submit(lambda details, error: None, self.db.get_books_details, book_ids)
+        
+    # Autocomplete
+    def request_suggestions(self):
+        """Fetch suggestions for the search box text from the in-process prefix index"""
+        if self.db is None or self.db.autocomplete is None:
+            return
+        prefix = self.search_var.get()
+        self._suggest_generation += 1
+        generation = self._suggest_generation
+        if not prefix.strip():
+            self.hide_suggestions()
+            return
+        # The first call loads the index, so it runs off the Tk thread like a query
+        self.runner.submit(
+            lambda suggestions, error: self._show_suggestions(generation, suggestions, error),
+            self.db.suggest, prefix, self.suggestion_limit
+        )
+        
+    def _show_suggestions(self, generation, suggestions, error):
+        """Fill the dropdown with the result of request_suggestions on the Tk thread"""
+        if generation != self._suggest_generation:
+            return
+        if error or not suggestions:
+            self.hide_suggestions()
+            return
+        self._suggestions = suggestions
+        self.suggestion_list.delete(0, tk.END)
+        for kind, text, count in suggestions:
+            books = f"{count} books" if count > 1 else "1 book"
+            self.suggestion_list.insert(tk.END, f"{text}    ({kind}, {books})")
+        self.suggestion_list.config(height=len(suggestions))
+        self.suggestion_list.place(in_=self.search_entry, x=0, rely=1.0, relwidth=1.5)
+        self.suggestion_list.lift()
+        
+    def hide_suggestions(self):
+        """Close the dropdown and ignore suggestions still on their way"""
+        self._suggest_generation += 1
+        self._suggestions = []
+        self.suggestion_list.place_forget()
+        
+    def focus_suggestions(self):
+        """Move the keyboard focus from the search box to the first suggestion"""
+        if not self._suggestions:
+            return
+        self.suggestion_list.focus_set()
+        self.suggestion_list.selection_clear(0, tk.END)
+        self.suggestion_list.selection_set(0)
+        self.suggestion_list.activate(0)
+        
+    def _suggestion_up(self, event):
+        """Go back to the search box when moving up from the first suggestion"""
+        if self.suggestion_list.index(tk.ACTIVE) == 0:
+            self.search_entry.focus_set()
+            return "break"
+        
+    def pick_suggestion(self):
+        """Put the chosen suggestion in the search box and search for it right away"""
+        selection = self.suggestion_list.curselection()
+        if not selection or selection[0] >= len(self._suggestions):
+            return
+        _, text, _ = self._suggestions[selection[0]]
+        # Setting the text must not reopen the dropdown or schedule another search
+        self._picking = True
+        try:
+            self.search_var.set(text)
+        finally:
+            self._picking = False
+        self.search_entry.focus_set()
+        self.search_entry.icursor(tk.END)
+        self.run_search_now()
+        
     def add_book_dialog(self):
         """Open dialog to add a new book"""
+        if not self._connected():
+            return
         # Create a custom dialog
         dialog = tk.Toplevel(self.root)
         dialog.title("Add New Book")
@@ -287,7 +1178,7 @@ class LibraryBookApp:
             author = author_var.get().strip()
             genre = genre_var.get().strip()
             year = year_var.get().strip()
-            isbn = isbn_var.get().strip()
+            isbn = isbn_var.get().strip() or None
             
             if not title or not author or not genre:
                 messagebox.showerror("Input Error", "Title, Author and Genre are required fields")
@@ -299,21 +1190,21 @@ class LibraryBookApp:
                 messagebox.showerror("Input Error", "Publication Year must be a number")
                 return
                 
-            # Add to database
-            try:
-                self.db.connect()
-                book_id = self.db.add_book(title, author, genre, year, isbn)
-                
-                if book_id:
+            # Add to database on a worker; the dialog stays open until it answers
+            def added(book_id, error):
+                if error:
+                    messagebox.showerror("Database Error", f"Error adding book: {error}")
+                elif book_id:
                     messagebox.showinfo("Success", "Book added successfully")
-                    dialog.destroy()
-                    self.load_books()
+                    if dialog.winfo_exists():
+                        dialog.destroy()
+                    self.refresh_books()
                 else:
                     messagebox.showerror("Database Error", "Failed to add book")
-            except Exception as e:
-                messagebox.showerror("Database Error", f"Error adding book: {e}")
-            finally:
-                self.db.disconnect()
+                    
+            self.runner.submit(
+                added, self._tracked("add_book", self.source.add_book), title, author, genre, year, isbn
+            )
                 
         # Button frame
         button_frame = tk.Frame(dialog)
@@ -341,14 +1232,33 @@ class LibraryBookApp:
     
     def edit_book_dialog(self):
         """Open dialog to edit selected book"""
+        if not self._connected():
+            return
         selected_item = self.tree.selection()
         
         if not selected_item:
             messagebox.showinfo("No Selection", "Please select a book to edit")
             return
+        if len(selected_item) > 1:
+            self.bulk_edit_dialog(selected_item)
+            return
             
         # Get book data from selection
         book_data = self.tree.item(selected_item[0], 'values')
+        
+        # The remaining columns are usually prefetched while the row was on
+        # screen; a cache miss queries on a worker, and the dialog opens once
+        # the row arrives
+        self.runner.submit(
+            partial(self._open_edit_dialog, book_data),
+            self._tracked("edit_book_details", self.source.get_book_details), book_data[0]
+        )
+        
+    def _open_edit_dialog(self, book_data, details, error):
+        """Open the edit dialog for one book with its details, on the Tk thread"""
+        if error:
+            self.status_label.config(text=f"✗ Error loading book details: {error}")
+            return
         book_id = book_data[0]
         
         # Create a custom dialog
@@ -371,21 +1281,8 @@ class LibraryBookApp:
         genre_var = tk.StringVar(value=book_data[3])
         tk.Entry(dialog, textvariable=genre_var, width=30).grid(row=2, column=1, padx=10, pady=10)
         
-        # Try to get additional info from database
-        try:
-            self.db.connect()
-            query = "SELECT publication_year, isbn FROM books WHERE book_id = %s"
-            result = self.db.execute_query(query, (book_id,))
-            if result and len(result[0]) >= 2:
-                year_value = result[0][0] if result[0][0] else ""
-                isbn_value = result[0][1] if result[0][1] else ""
-            else:
-                year_value = ""
-                isbn_value = ""
-            self.db.disconnect()
-        except:
-            year_value = ""
-            isbn_value = ""
+        year_value = (details or {}).get('publication_year') or ""
+        isbn_value = (details or {}).get('isbn') or ""
             
         tk.Label(dialog, text="Publication Year:", anchor="w").grid(row=3, column=0, padx=10, pady=10, sticky="w")
         year_var = tk.StringVar(value=str(year_value))
@@ -401,7 +1298,7 @@ class LibraryBookApp:
             author = author_var.get().strip()
             genre = genre_var.get().strip()
             year = year_var.get().strip()
-            isbn = isbn_var.get().strip()
+            isbn = isbn_var.get().strip() or None
             
             if not title or not author or not genre:
                 messagebox.showerror("Input Error", "Title, Author and Genre are required fields")
@@ -413,21 +1310,22 @@ class LibraryBookApp:
                 messagebox.showerror("Input Error", "Publication Year must be a number")
                 return
                 
-            # Update database
-            try:
-                self.db.connect()
-                success = self.db.update_book(book_id, title, author, genre, year, isbn)
-                
-                if success:
+            # Update database on a worker; the dialog stays open until it answers
+            def updated(success, error):
+                if error:
+                    messagebox.showerror("Database Error", f"Error updating book: {error}")
+                elif success:
                     messagebox.showinfo("Success", "Book updated successfully")
-                    dialog.destroy()
-                    self.load_books()
+                    if dialog.winfo_exists():
+                        dialog.destroy()
+                    self.refresh_books()
                 else:
                     messagebox.showerror("Database Error", "Failed to update book")
-            except Exception as e:
-                messagebox.showerror("Database Error", f"Error updating book: {e}")
-            finally:
-                self.db.disconnect()
+                    
+            self.runner.submit(
+                updated, self._tracked("update_book", self.source.update_book),
+                book_id, title, author, genre, year, isbn
+            )
                 
         # Button frame
         button_frame = tk.Frame(dialog)
@@ -455,11 +1353,16 @@ class LibraryBookApp:
         
     def delete_book(self):
         """Delete selected book"""
+        if not self._connected():
+            return
         selected_item = self.tree.selection()
         
         if not selected_item:
             messagebox.showinfo("No Selection", "Please select a book to delete")
             return
+        if len(selected_item) > 1:
+            self.delete_selected_books(selected_item)
+            return
             
         # Get book data from selection
         book_data = self.tree.item(selected_item[0], 'values')
@@ -470,29 +1373,193 @@ class LibraryBookApp:
         if not messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete '{book_title}'?"):
             return
             
-        # Delete from database
-        try:
-            self.db.connect()
-            if self.db.delete_book(book_id):
-                self.tree.delete(selected_item)
+        # Delete from database on a worker, then drop the row if it is still shown
+        def deleted(success, error):
+            if error:
+                messagebox.showerror("Database Error", f"Error deleting book: {error}")
+            elif success:
+                if self.book_view is not None:
+                    self.book_view.remove(selected_item[0])
+                else:
+                    self.renderer.remove(selected_item[0])
                 self.status_label.config(text=f"✓ Book '{book_title}' deleted")
             else:
                 messagebox.showerror("Database Error", "Failed to delete book")
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Error deleting book: {e}")
-        finally:
-            self.db.disconnect()
+                
+        self.status_label.config(text=f"Deleting '{book_title}'...")
+        self.runner.submit(deleted, self._tracked("delete_book", self.source.delete_book), book_id)
+            
+    # Bulk operations on a multi-row selection
+    def _selected_ids(self, items):
+        """Book IDs of the given Treeview items"""
+        return [self.tree.item(item, 'values')[0] for item in items]
+        
+    def _run_bulk(self, action, verb, fn, *args):
+        """
+        Run a bulk write on a worker thread and report its batch timings
+        
+        Args:
+            action (str): Name the queries are recorded under
+            verb (str): Past tense for the status bar, e.g. "Deleted"
+            fn (callable): Bulk method taking on_batch as a keyword argument
+            *args: Arguments for fn
+        """
+        label = action.replace('_', ' ').capitalize()
+        timings = []
+        
+        def on_batch(ids_in_batch, rows, seconds):
+            timings.append(seconds)
+            
+        def done(count, error):
+            if error or count is None:
+                messagebox.showerror("Database Error", f"{label} failed: {error or 'see the log'}")
+                self.status_label.config(text=f"✗ {label} failed, nothing was changed")
+                return
+            total_ms = sum(timings) * 1000
+            slowest_ms = max(timings, default=0) * 1000
+            self.status_label.config(
+                text=f"✓ {verb} {count} books in {len(timings)} batches "
+                     f"({total_ms:.0f} ms, slowest batch {slowest_ms:.0f} ms)"
+            )
+            self.refresh_books()
+            
+        self.status_label.config(text=f"{label}...")
+        self.runner.submit(done, self._tracked(action, partial(fn, on_batch=on_batch)), *args)
+        
+    def delete_selected_books(self, items):
+        """Delete every selected book in one transaction"""
+        if not messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {len(items)} books?"):
+            return
+        self._run_bulk("delete_books", "Deleted", self.source.delete_books, self._selected_ids(items))
+        
+    def bulk_edit_dialog(self, items):
+        """Open dialog to set author, genre or publication year on every selected book"""
+        book_ids = self._selected_ids(items)
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Edit {len(book_ids)} Books")
+        dialog.geometry("400x250")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        tk.Label(
+            dialog,
+            text="Fields left empty keep their current values",
+            anchor="w"
+        ).grid(row=0, column=0, columnspan=2, padx=10, pady=10, sticky="w")
+        
+        tk.Label(dialog, text="Author:", anchor="w").grid(row=1, column=0, padx=10, pady=10, sticky="w")
+        author_var = tk.StringVar()
+        tk.Entry(dialog, textvariable=author_var, width=30).grid(row=1, column=1, padx=10, pady=10)
+        
+        tk.Label(dialog, text="Genre:", anchor="w").grid(row=2, column=0, padx=10, pady=10, sticky="w")
+        genre_var = tk.StringVar()
+        tk.Entry(dialog, textvariable=genre_var, width=30).grid(row=2, column=1, padx=10, pady=10)
+        
+        tk.Label(dialog, text="Publication Year:", anchor="w").grid(row=3, column=0, padx=10, pady=10, sticky="w")
+        year_var = tk.StringVar()
+        tk.Entry(dialog, textvariable=year_var, width=30).grid(row=3, column=1, padx=10, pady=10)
+        
+        def update_books():
+            changes = {}
+            if author_var.get().strip():
+                changes['author'] = author_var.get().strip()
+            if genre_var.get().strip():
+                changes['genre'] = genre_var.get().strip()
+            year = year_var.get().strip()
+            if year:
+                try:
+                    changes['publication_year'] = int(year)
+                except ValueError:
+                    messagebox.showerror("Input Error", "Publication Year must be a number")
+                    return
+            if not changes:
+                messagebox.showerror("Input Error", "Enter at least one field to change")
+                return
+                
+            if not messagebox.askyesno("Confirm Edit", f"Change {', '.join(changes)} of {len(book_ids)} books?"):
+                return
+            dialog.destroy()
+            self._run_bulk("update_books", "Updated", self.source.update_books, book_ids, changes)
+            
+        button_frame = tk.Frame(dialog)
+        button_frame.grid(row=4, column=0, columnspan=2, pady=20)
+        
+        tk.Button(
+            button_frame,
+            text="Update Books",
+            command=update_books,
+            bg="#f39c12",
+            fg="white",
+            padx=15,
+            pady=5
+        ).pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(
+            button_frame,
+            text="Cancel",
+            command=dialog.destroy,
+            bg="#e74c3c",
+            fg="white",
+            padx=15,
+            pady=5
+        ).pack(side=tk.LEFT, padx=5)
 
 if __name__ == "__main__":
     # Check if database config exists, if not create a default one
     if not os.path.exists('config.ini'):
         with open('config.ini', 'w') as f:
             f.write('[database]\n')
+            f.write('backend = mysql\n')
             f.write('host = localhost\n')
             f.write('user = root\n')
             f.write('password = password\n')
             f.write('database = librarydb\n')
+            f.write('\n[pool]\n')
+            f.write('enabled = true\n')
+            f.write('min_size = 1\n')
+            f.write('max_size = 5\n')
+            f.write('idle_timeout = 300\n')
+            f.write('checkout_timeout = 10\n')
+            f.write('\n[search]\n')
+            f.write('mode = like\n')
+            f.write('min_fulltext_length = 3\n')
+            f.write('autocomplete = false\n')
+            f.write('\n[cache]\n')
+            f.write('enabled = false\n')
+            f.write('max_entries = 256\n')
+            f.write('ttl = 30\n')
+            f.write('details = false\n')
+            f.write('\n[statements]\n')
+            f.write('prepared = false\n')
+            f.write('max_prepared = 64\n')
+            f.write('\n[stats]\n')
+            f.write('enabled = true\n')
+            f.write('slow_query_ms = 500\n')
+            f.write('\n[circulation]\n')
+            f.write('loan_days = 21\n')
+            f.write('max_renewals = 2\n')
+            f.write('\n[summary]\n')
+            f.write('enabled = false\n')
+            f.write('refresh = 5\n')
+            f.write('\n[changes]\n')
+            f.write('enabled = false\n')
+            f.write('interval = 2\n')
+            f.write('\n[startup]\n')
+            f.write('fast_start = false\n')
+            f.write('snapshot = catalogue.snapshot\n')
+            f.write('snapshot_max_age = 24\n')
+    
+    # Read here rather than through DatabaseConnection, which fast start imports later
+    config = configparser.ConfigParser(inline_comment_prefixes=(';', '#'))
+    config.read('config.ini')
+    startup = config['startup'] if config.has_section('startup') else config[config.default_section]
     
     root = tk.Tk()
-    app = LibraryBookApp(root)
+    app = LibraryBookApp(
+        root,
+        fast_start=startup.getboolean('fast_start', fallback=False),
+        snapshot_path=startup.get('snapshot', fallback='catalogue.snapshot'),
+        snapshot_max_age=startup.getfloat('snapshot_max_age', fallback=24) * 3600
+    )
     root.mainloop()
\ No newline at end of file
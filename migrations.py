@@ -0,0 +1,449 @@
+"""
+Versioned schema migrations and query plan checks.
+
+Usage:
+    python migrations.py status
+    python migrations.py apply
+    python migrations.py apply --to 1
+    python migrations.py check
+
+schema.sql, as the application first shipped it, is the baseline schema
+(version 0); schema_sqlite.sql creates the SQLite equivalent of version 0
+plus the changes its engine needed from the start. Later schema changes
+are the MIGRATIONS below, applied in order to a live database and recorded
+in the schema_migrations table, so every install can be brought to the
+same version.
+
+The check command runs the DatabaseConnection read and write methods,
+captures the statements they send and prints the database's plan for
+each one. Full table scans, filesorts and temporary tables are flagged,
+and any that the method is not expected to need fail the check, so a
+dropped or unused index is caught before deployment.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from backends import Error
+from database import DatabaseConnection
+from query_stats import normalize_sql
+
+
+class Migration:
+    """One versioned schema change, with its statements for each backend"""
+
+    def __init__(self, version, name, mysql, sqlite):
+        """
+        Args:
+            version (int): Position in the migration order, starting at 1
+            name (str): Short description, recorded with the version
+            mysql (tuple): Statements for the mysql backend
+            sqlite (tuple): Statements for the sqlite backend
+        """
+        self.version = version
+        self.name = name
+        self.statements = {'mysql': mysql, 'sqlite': sqlite}
+
+
+MIGRATIONS = (
+    # get_all_books and the keyset pages select four columns ordered by
+    # (title, book_id). idx_title alone needs a row lookup per book, or a
+    # table scan plus filesort; this index answers both from the index.
+    # book_id comes second so the page order needs no sort; idx_title is a
+    # prefix of the new index and is dropped.
+    Migration(1, 'covering title index', mysql=(
+        "CREATE INDEX idx_title_cover ON books (title, book_id, author, genre)",
+        "DROP INDEX idx_title ON books",
+    ), sqlite=(
+        "CREATE INDEX idx_title_cover ON books (title, book_id, author, genre)",
+        "DROP INDEX idx_title",
+    )),
+    # The GUI used to store an empty ISBN rather than NULL; NULLs may repeat
+    Migration(2, 'unique isbn', mysql=(
+        "UPDATE books SET isbn = NULL WHERE isbn = ''",
+        "CREATE UNIQUE INDEX uq_books_isbn ON books (isbn)",
+    ), sqlite=(
+        "UPDATE books SET isbn = NULL WHERE isbn = ''",
+        "CREATE UNIQUE INDEX uq_books_isbn ON books (isbn)",
+    )),
+    # Change log read by change_feed.ChangeFeed, so clients poll for deltas by
+    # sequence number instead of reloading the table
+    Migration(3, 'book change log', mysql=(
+        """CREATE TABLE book_changes (
+            seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+            book_id INT NOT NULL,
+            op CHAR(1) NOT NULL,
+            changed_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            INDEX idx_changed_at (changed_at)
+        )""",
+        """CREATE TRIGGER trg_books_log_insert AFTER INSERT ON books
+        FOR EACH ROW INSERT INTO book_changes (book_id, op) VALUES (NEW.book_id, 'I')""",
+        """CREATE TRIGGER trg_books_log_update AFTER UPDATE ON books
+        FOR EACH ROW INSERT INTO book_changes (book_id, op) VALUES (NEW.book_id, 'U')""",
+        """CREATE TRIGGER trg_books_log_delete AFTER DELETE ON books
+        FOR EACH ROW INSERT INTO book_changes (book_id, op) VALUES (OLD.book_id, 'D')""",
+    ), sqlite=(
+        """CREATE TABLE book_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at DATETIME6 NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+        )""",
+        "CREATE INDEX idx_changed_at ON book_changes (changed_at)",
+        """CREATE TRIGGER trg_books_log_insert AFTER INSERT ON books
+        FOR EACH ROW BEGIN
+            INSERT INTO book_changes (book_id, op) VALUES (NEW.book_id, 'I');
+        END""",
+        # Only the update that moves updated_at is logged, not the one
+        # trg_books_after_update's own UPDATE starts from; migration 5 makes
+        # every update move it
+        """CREATE TRIGGER trg_books_log_update AFTER UPDATE ON books
+        FOR EACH ROW WHEN NEW.updated_at <> OLD.updated_at BEGIN
+            INSERT INTO book_changes (book_id, op) VALUES (NEW.book_id, 'U');
+        END""",
+        """CREATE TRIGGER trg_books_log_delete AFTER DELETE ON books
+        FOR EACH ROW BEGIN
+            INSERT INTO book_changes (book_id, op) VALUES (OLD.book_id, 'D');
+        END""",
+    )),
+    # Loans and holds for checkout, return and renew. books.available stays
+    # the lock that decides who gets a copy; the unique index on open loans
+    # also stops a second open loan of a copy written by any other client.
+    Migration(4, 'circulation', mysql=(
+        """CREATE TABLE loans (
+            loan_id INT AUTO_INCREMENT PRIMARY KEY,
+            book_id INT NOT NULL,
+            borrower VARCHAR(100) NOT NULL,
+            loaned_at DATETIME(6) NOT NULL,
+            due_at DATETIME(6) NOT NULL,
+            returned_at DATETIME(6) NULL,
+            renewals INT NOT NULL DEFAULT 0,
+            open_book_id INT AS (IF(returned_at IS NULL, book_id, NULL)) STORED,
+            UNIQUE INDEX uq_loans_open (open_book_id),
+            INDEX idx_loans_book (book_id, returned_at),
+            INDEX idx_loans_borrower (borrower, returned_at, due_at),
+            INDEX idx_loans_due (returned_at, due_at)
+        )""",
+        """CREATE TABLE holds (
+            hold_id INT AUTO_INCREMENT PRIMARY KEY,
+            book_id INT NOT NULL,
+            borrower VARCHAR(100) NOT NULL,
+            placed_at DATETIME(6) NOT NULL,
+            closed_at DATETIME(6) NULL,
+            INDEX idx_holds_book (book_id, closed_at)
+        )""",
+    ), sqlite=(
+        """CREATE TABLE loans (
+            loan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            borrower TEXT NOT NULL,
+            loaned_at DATETIME6 NOT NULL,
+            due_at DATETIME6 NOT NULL,
+            returned_at DATETIME6,
+            renewals INTEGER NOT NULL DEFAULT 0
+        )""",
+        "CREATE UNIQUE INDEX uq_loans_open ON loans (book_id) WHERE returned_at IS NULL",
+        "CREATE INDEX idx_loans_book ON loans (book_id, returned_at)",
+        "CREATE INDEX idx_loans_borrower ON loans (borrower, returned_at, due_at)",
+        "CREATE INDEX idx_loans_due ON loans (returned_at, due_at)",
+        """CREATE TABLE holds (
+            hold_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            borrower TEXT NOT NULL,
+            placed_at DATETIME6 NOT NULL,
+            closed_at DATETIME6
+        )""",
+        "CREATE INDEX idx_holds_book ON holds (book_id, closed_at)",
+    )),
+    # SQLite's updated_at trigger wrote the current millisecond, so a second
+    # update in the same millisecond left updated_at unchanged and was
+    # missing from book_changes. The trigger now always moves updated_at
+    # forward (schema_sqlite.sql has the same body for new databases).
+    # MySQL's trigger logs every update already.
+    Migration(5, 'monotonic sqlite updated_at', mysql=(), sqlite=(
+        "DROP TRIGGER IF EXISTS trg_books_after_update",
+        """CREATE TRIGGER trg_books_after_update AFTER UPDATE ON books
+        FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at BEGIN
+            UPDATE books SET updated_at = MAX(
+                strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'),
+                strftime('%Y-%m-%d %H:%M:%f', OLD.updated_at, '+0.001 seconds')
+            )
+            WHERE book_id = NEW.book_id;
+        END""",
+    )),
+    # Change marker read by CatalogueCache and the in-process indexes to
+    # refresh only the rows changed since their last read. Existing rows
+    # get the time of the migration. schema_sqlite.sql has the column and
+    # its trigger from the start.
+    Migration(6, 'book change marker', mysql=(
+        """ALTER TABLE books ADD COLUMN updated_at TIMESTAMP(6) NOT NULL
+        DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)""",
+        "CREATE INDEX idx_updated_at ON books (updated_at)",
+    ), sqlite=()),
+    # Tombstones of deleted books, so the same refreshes can drop them
+    # without a full reload
+    Migration(7, 'book deletion tombstones', mysql=(
+        """CREATE TABLE book_deletions (
+            book_id INT NOT NULL,
+            deleted_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            INDEX idx_deleted_at (deleted_at)
+        )""",
+        """CREATE TRIGGER trg_books_after_delete AFTER DELETE ON books
+        FOR EACH ROW INSERT INTO book_deletions (book_id) VALUES (OLD.book_id)""",
+    ), sqlite=()),
+    # FULLTEXT index for the 'natural' and 'boolean' search modes; SQLite
+    # uses the books_fts table from schema_sqlite.sql
+    Migration(8, 'fulltext search index', mysql=(
+        "CREATE FULLTEXT INDEX ft_books_search ON books (title, author, genre)",
+    ), sqlite=()),
+)
+
+MIGRATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+class MigrationRunner:
+    """Apply MIGRATIONS to a database and track which ones it has"""
+
+    def __init__(self, db, migrations=MIGRATIONS):
+        """
+        Args:
+            db (DatabaseConnection): Database to migrate
+            migrations (tuple): Migrations in version order
+        """
+        self.db = db
+        self.migrations = migrations
+
+    def applied(self):
+        """
+        Get the migrations already applied
+
+        Returns:
+            dict: version -> applied_at, or None if error
+        """
+        if self.db.execute_query(MIGRATIONS_TABLE_SQL, prepared=False) is None:
+            return None
+        rows = self.db.execute_query("SELECT version, applied_at FROM schema_migrations")
+        return None if rows is None else dict(rows)
+
+    def pending(self):
+        """
+        Get the migrations not applied yet
+
+        Returns:
+            list: Migrations in version order, or None if error
+        """
+        applied = self.applied()
+        if applied is None:
+            return None
+        return [migration for migration in self.migrations if migration.version not in applied]
+
+    def apply(self, target=None, on_apply=None):
+        """
+        Apply pending migrations in order, stopping at the first failure
+
+        Each migration and its schema_migrations row run in one transaction.
+        SQLite rolls a failed migration back completely; MySQL commits each
+        DDL statement on its own, so a migration that fails half way must
+        be finished or undone by hand.
+
+        Args:
+            target (int, optional): Last version to apply; all of them if None
+            on_apply (callable, optional): Called as on_apply(migration, seconds)
+                after each migration
+
+        Returns:
+            list: Versions applied, or None if a migration failed
+        """
+        pending = self.pending()
+        if pending is None:
+            return None
+        done = []
+        for migration in pending:
+            if target is not None and migration.version > target:
+                break
+            start = time.perf_counter()
+            try:
+                with self.db.transaction():
+                    for statement in migration.statements[self.db.backend.name]:
+                        self.db.execute_query(statement, prepared=False)
+                    self.db.execute_query(
+                        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        (migration.version, migration.name)
+                    )
+            except Error as e:
+                print(f"Migration {migration.version} ({migration.name}) failed: {e}")
+                return None
+            done.append(migration.version)
+            if on_apply:
+                on_apply(migration, time.perf_counter() - start)
+        return done
+
+
+class _Rollback(Exception):
+    """Raised to undo the writes a plan check made"""
+
+
+# The DatabaseConnection calls whose statements the check explains, with the
+# plan problems each is expected to have. Calls get the connection and a
+# sample (title, book_id) key; writes run in a transaction that is rolled back.
+PLAN_CHECKS = (
+    ('get_all_books', lambda db, book: db.get_all_books(), ()),
+    ('get_books_page', lambda db, book: db.get_books_page(page_size=50), ()),
+    ('get_books_page after', lambda db, book: db.get_books_page(after=book, page_size=50), ()),
+    ('get_books_page before', lambda db, book: db.get_books_page(before=book, page_size=50), ()),
+    # A leading wildcard cannot seek in an index
+    ('search_books like', lambda db, book: db.search_books('tolkien', mode='like'), ('full scan',)),
+    # Relevance order is computed per query
+    ('search_books natural', lambda db, book: db.search_books('tolkien', mode='natural'), ('filesort',)),
+    ('search_books boolean', lambda db, book: db.search_books('tolkien', mode='boolean'), ('filesort',)),
+    ('search_books_page like',
+     lambda db, book: db.search_books_page('tolkien', after=book, page_size=50, mode='like'), ('full scan',)),
+    ('search_books_page boolean',
+     lambda db, book: db.search_books_page('tolkien', after=book, page_size=50, mode='boolean'), ('filesort',)),
+    ('get_books_details', lambda db, book: db.get_books_details([book[1], book[1] + 1]), ()),
+    ('iter_books_changed_since', lambda db, book: list(db.iter_books_changed_since(db.get_server_time())), ()),
+    ('get_deleted_book_ids_since', lambda db, book: db.get_deleted_book_ids_since(db.get_server_time()), ()),
+    # Dumps read the whole table
+    ('iter_book_rows', lambda db, book: list(db.iter_book_rows()), ('full scan',)),
+    ('iter_book_rows like', lambda db, book: list(db.iter_book_rows('tolkien', mode='like')), ('full scan',)),
+    ('update_book', lambda db, book: db.update_book(book[1], book[0], 'Author', 'Genre'), ()),
+    ('update_books', lambda db, book: db.update_books([book[1]], {'genre': 'Genre'}), ()),
+    ('delete_book', lambda db, book: db.delete_book(book[1]), ()),
+    ('delete_books', lambda db, book: db.delete_books([book[1]]), ()),
+    ('purge_book_deletions', lambda db, book: db.purge_book_deletions(datetime(2000, 1, 1)), ()),
+    ('get_changes_since', lambda db, book: db.get_changes_since(0, 50), ()),
+    ('purge_book_changes', lambda db, book: db.purge_book_changes(datetime(2000, 1, 1)), ()),
+    ('checkout_books', lambda db, book: db.checkout_books([book[1], book[1] + 1], 'plan-check'), ()),
+    ('return_book', lambda db, book: db.return_book(book[1]), ()),
+    ('renew_loan', lambda db, book: db.renew_loan(book[1]), ()),
+    ('place_hold', lambda db, book: db.place_hold(book[1], 'plan-check'), ()),
+    ('get_loans borrower', lambda db, book: db.get_loans(borrower='plan-check'), ()),
+    ('get_loans overdue', lambda db, book: db.get_loans(overdue=True), ()),
+    ('get_holds', lambda db, book: db.get_holds(book[1]), ()),
+)
+
+
+def check_query_plans(db, checks=PLAN_CHECKS, verbose=False):
+    """
+    Explain the statements of every check and report unexpected plan problems
+
+    Args:
+        db (DatabaseConnection): Database to check; the in-process caches and
+            indexes are switched off so every call reaches it
+        checks (tuple): (name, call, allowed problems) entries
+        verbose (bool): Also print every plan row
+
+    Returns:
+        int: Number of unexpected problems found, or None if error
+    """
+    db.result_cache = None
+    db.detail_cache = None
+    db.search_index = None
+    db.autocomplete = None
+
+    first = db.get_books_page(page_size=1)
+    if first is None:
+        return None
+    # Keys of a real book, so the optimizer sees realistic values
+    book = (first[0][1], first[0][0]) if first else ('', 0)
+
+    failures = 0
+    for name, call, allowed in checks:
+        seen = set()
+        try:
+            with db.capture_statements() as statements:
+                with db.transaction():
+                    call(db, book)
+                    raise _Rollback()
+        except _Rollback:
+            pass
+        except Error as e:
+            print(f"{name}: could not run: {e}")
+            failures += 1
+            continue
+
+        found = []
+        shown = []
+        unexpected = 0
+        for query, params in statements:
+            key = normalize_sql(query)
+            if key in seen or not key.upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            seen.add(key)
+            plan = db.explain(query, params)
+            if plan is None:
+                print(f"{name}: could not explain: {key}")
+                unexpected += 1
+                continue
+            problems = db.backend.plan_problems(plan)
+            found.extend(problem + (f" on {table}" if table else "") for problem, table in problems)
+            bad = sum(1 for problem, _ in problems if problem not in allowed)
+            unexpected += bad
+            if bad or verbose:
+                shown.append((key, plan))
+
+        failures += unexpected
+        print(f"{'FAIL' if unexpected else 'ok':4} {name}: {', '.join(found) or 'no scans or sorts'}")
+        for key, plan in shown:
+            print(f"     {key}")
+            for row in plan:
+                print(f"     {row}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply schema migrations and check query plans.")
+    parser.add_argument('--config', default='config.ini', help="Database configuration file")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help="List applied and pending migrations")
+    apply_parser = commands.add_parser('apply', help="Apply pending migrations")
+    apply_parser.add_argument('--to', type=int, help="Last version to apply")
+    check_parser = commands.add_parser('check', help="EXPLAIN every query and flag scans and sorts")
+    check_parser.add_argument('--verbose', action='store_true', help="Print every plan")
+    args = parser.parse_args(argv)
+
+    db = DatabaseConnection(config_file=args.config, result_cache=False)
+    try:
+        runner = MigrationRunner(db)
+        if args.command == 'status':
+            applied = runner.applied()
+            if applied is None:
+                return 1
+            for migration in runner.migrations:
+                state = f"applied {applied[migration.version]}" if migration.version in applied else "pending"
+                print(f"{migration.version:4}  {migration.name:30} {state}")
+            return 0
+
+        if args.command == 'apply':
+            applied = runner.apply(
+                target=args.to,
+                on_apply=lambda migration, seconds: print(
+                    f"Applied {migration.version} ({migration.name}) in {seconds:.2f}s")
+            )
+            if applied is None:
+                return 1
+            if not applied:
+                print("Schema is up to date")
+            return 0
+
+        pending = runner.pending()
+        if pending:
+            print(f"Warning: {len(pending)} migrations are not applied, plans may differ after 'apply'")
+        failures = check_query_plans(db, verbose=args.verbose)
+        if failures is None:
+            return 1
+        print(f"{failures} unexpected plan problems" if failures else "All query plans ok")
+        return 1 if failures else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""
+Query instrumentation for DatabaseConnection.
+
+QueryStats keeps latency histograms and row, error and connection
+acquisition counters per SQL statement. It can also group them by
+application action (e.g. the GUI operation that issued the queries) and
+logs statements slower than a threshold with their parameters redacted.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+
+# Upper bounds of the latency histogram buckets in milliseconds; slower
+# samples land in a final overflow bucket
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+slow_query_logger = logging.getLogger('database.slow_query')
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(query):
+    """Collapse whitespace so the same statement always gets the same key"""
+    return ' '.join(query.split())
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with percentile estimates"""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms):
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def percentile(self, fraction):
+        """
+        Estimate a latency percentile
+
+        Args:
+            fraction (float): Percentile as a fraction, e.g. 0.95
+
+        Returns:
+            float: Upper bound of the bucket holding the percentile (the
+            maximum for the overflow bucket), or 0.0 if there are no samples
+        """
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return min(LATENCY_BUCKETS_MS[index], self.max_ms)
+                return self.max_ms
+        return self.max_ms
+
+    def snapshot(self):
+        buckets = {str(bound): count for bound, count in zip(LATENCY_BUCKETS_MS, self.counts)}
+        buckets['inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': round(self.percentile(0.50), 3),
+            'p95_ms': round(self.percentile(0.95), 3),
+            'p99_ms': round(self.percentile(0.99), 3),
+            'buckets': buckets,
+        }
+
+
+class _StatementStats:
+    """Counters for one statement or action"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.rows = 0
+        self.errors = 0
+
+    def snapshot(self):
+        snapshot = self.latency.snapshot()
+        snapshot['rows'] = self.rows
+        snapshot['errors'] = self.errors
+        return snapshot
+
+
+class QueryStats:
+    """
+    Thread-safe query instrumentation.
+
+    Statements are recorded under their whitespace-normalized SQL text and,
+    when issued inside an action() block, under the action name as well.
+    """
+
+    def __init__(self, slow_query_ms=None):
+        """
+        Args:
+            slow_query_ms (float, optional): Log statements slower than this
+                many milliseconds; None disables the slow-query log
+        """
+        self.slow_query_ms = slow_query_ms
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._push_stop = None
+        self.reset()
+
+    def reset(self):
+        """Clear every counter"""
+        with self._lock:
+            self._statements = {}
+            self._actions = {}
+            self._acquire = LatencyHistogram()
+            self._errors = {}
+            self._slow_queries = 0
+            self._since = time.time()
+
+    @contextmanager
+    def action(self, name):
+        """
+        Record the statements run by the calling thread inside the block under name
+
+        Args:
+            name (str): Action name, e.g. 'search_books'
+        """
+        previous = getattr(self._local, 'action', None)
+        self._local.action = name
+        try:
+            yield
+        finally:
+            self._local.action = previous
+
+    def record(self, query, elapsed, rows=0, params=None, error=None):
+        """
+        Record one executed statement
+
+        Args:
+            query (str): SQL text
+            elapsed (float): Seconds the statement took
+            rows (int): Rows returned or affected
+            params (sequence, optional): Statement parameters, only counted
+                in the slow-query log
+            error (Exception, optional): Error raised by the statement
+        """
+        key = normalize_sql(query)
+        elapsed_ms = elapsed * 1000
+        # DDL reports a rowcount of -1
+        rows = max(rows or 0, 0)
+        action = getattr(self._local, 'action', None)
+        slow = self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms
+
+        with self._lock:
+            targets = [self._statements.setdefault(key, _StatementStats())]
+            if action:
+                targets.append(self._actions.setdefault(action, _StatementStats()))
+            for stats in targets:
+                stats.latency.add(elapsed_ms)
+                stats.rows += rows
+                if error is not None:
+                    stats.errors += 1
+            if error is not None:
+                code = getattr(error, 'errno', None) or type(error).__name__
+                self._errors[code] = self._errors.get(code, 0) + 1
+            if slow:
+                self._slow_queries += 1
+
+        if slow:
+            # Parameters may hold patron data, so only their count is logged
+            count = len(params) if params else 0
+            slow_query_logger.warning(
+                "Slow query (%.1f ms, %d rows%s): %s [%d parameters redacted]",
+                elapsed_ms, rows, f", action {action}" if action else "", key, count
+            )
+
+    def record_acquire(self, elapsed):
+        """
+        Record the time spent getting a connection
+
+        Args:
+            elapsed (float): Seconds spent connecting or waiting for the pool
+        """
+        with self._lock:
+            self._acquire.add(elapsed * 1000)
+
+    def snapshot(self, reset=False):
+        """
+        Get a copy of all statistics
+
+        Args:
+            reset (bool): Clear the counters after taking the snapshot
+
+        Returns:
+            dict: 'statements' and 'actions' keyed by SQL text and action name,
+            plus 'connection_acquire', 'errors', 'slow_queries' and the
+            'since'/'until' wall-clock window
+        """
+        with self._lock:
+            snapshot = {
+                'since': self._since,
+                'until': time.time(),
+                'statements': {key: stats.snapshot() for key, stats in self._statements.items()},
+                'actions': {name: stats.snapshot() for name, stats in self._actions.items()},
+                'connection_acquire': self._acquire.snapshot(),
+                'errors': dict(self._errors),
+                'slow_queries': self._slow_queries,
+            }
+        if reset:
+            self.reset()
+        return snapshot
+
+    def top_statements(self, count=10, by='total_ms'):
+        """
+        Get the statements that cost the most
+
+        Args:
+            count (int): Number of statements to return
+            by (str): Snapshot field to rank by, e.g. 'total_ms', 'count' or 'p99_ms'
+
+        Returns:
+            list: (sql, stats) pairs, most expensive first
+        """
+        statements = self.snapshot()['statements']
+        return sorted(statements.items(), key=lambda item: item[1][by], reverse=True)[:count]
+
+    def push(self, callback, reset=False):
+        """
+        Send a snapshot to a callback
+
+        Args:
+            callback (callable): Called with the snapshot dict
+            reset (bool): Clear the counters after taking the snapshot
+        """
+        callback(self.snapshot(reset=reset))
+
+    def start_push(self, callback, interval=60.0, reset=True):
+        """
+        Push a snapshot to a callback every interval seconds from a daemon thread
+
+        Args:
+            callback (callable): Called with the snapshot dict
+            interval (float): Seconds between pushes
+            reset (bool): Clear the counters after each push, so each snapshot
+                covers one interval
+        """
+        self.stop_push()
+        stop = threading.Event()
+        self._push_stop = stop
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.push(callback, reset=reset)
+                except Exception as e:
+                    print(f"Error pushing query statistics: {e}")
+
+        threading.Thread(target=run, name="query-stats-push", daemon=True).start()
+
+    def stop_push(self):
+        """Stop the thread started by start_push()"""
+        if self._push_stop is not None:
+            self._push_stop.set()
+            self._push_stop = None
@@ -1,5 +1,6 @@
 -- Database creation and setup for Library Management System
 -- This script creates the database and necessary tables for the library application
+-- This is schema version 0; later changes are versioned migrations, applied with: python migrations.py apply
 
 -- Create the database if it doesn't exist
 CREATE DATABASE IF NOT EXISTS librarydb;
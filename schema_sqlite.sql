@@ -0,0 +1,81 @@
+-- Schema for the embedded SQLite backend
+-- Mirrors schema.sql; applied automatically when a new database file is opened
+-- Later schema changes are versioned migrations, applied with: python migrations.py apply
+
+-- Timestamps are stored as 'YYYY-MM-DD HH:MM:SS.SSS' local time, the DATETIME6
+-- type makes the backend return them as datetime objects
+CREATE TABLE IF NOT EXISTS books (
+    book_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL COLLATE NOCASE,
+    author TEXT NOT NULL COLLATE NOCASE,
+    genre TEXT NOT NULL COLLATE NOCASE,
+    publication_year INTEGER,
+    isbn TEXT,
+    available BOOLEAN DEFAULT 1,
+    added_date TEXT DEFAULT CURRENT_TIMESTAMP,
+    -- Change marker for incremental refreshes of client-side caches
+    updated_at DATETIME6 NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_updated_at ON books(updated_at);
+CREATE INDEX IF NOT EXISTS idx_title ON books(title);
+CREATE INDEX IF NOT EXISTS idx_author ON books(author);
+CREATE INDEX IF NOT EXISTS idx_genre ON books(genre);
+
+-- SQLite has no ON UPDATE column clause. The new value is at least a
+-- millisecond past the old one, so every update moves the marker, even
+-- two updates within the same millisecond
+CREATE TRIGGER IF NOT EXISTS trg_books_after_update AFTER UPDATE ON books
+FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE books SET updated_at = MAX(
+        strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'),
+        strftime('%Y-%m-%d %H:%M:%f', OLD.updated_at, '+0.001 seconds')
+    )
+    WHERE book_id = NEW.book_id;
+END;
+
+-- Tombstones for deleted books, so caches can drop them without a full reload
+CREATE TABLE IF NOT EXISTS book_deletions (
+    book_id INTEGER NOT NULL,
+    deleted_at DATETIME6 NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_deleted_at ON book_deletions(deleted_at);
+
+CREATE TRIGGER IF NOT EXISTS trg_books_after_delete AFTER DELETE ON books
+FOR EACH ROW
+BEGIN
+    INSERT INTO book_deletions (book_id) VALUES (OLD.book_id);
+END;
+
+-- FTS5 index used by the 'natural' and 'boolean' search modes, kept in step
+-- with the books table by triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    title, author, genre,
+    content = 'books', content_rowid = 'book_id',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_books_fts_insert AFTER INSERT ON books
+FOR EACH ROW
+BEGIN
+    INSERT INTO books_fts (rowid, title, author, genre)
+    VALUES (NEW.book_id, NEW.title, NEW.author, NEW.genre);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_books_fts_delete AFTER DELETE ON books
+FOR EACH ROW
+BEGIN
+    INSERT INTO books_fts (books_fts, rowid, title, author, genre)
+    VALUES ('delete', OLD.book_id, OLD.title, OLD.author, OLD.genre);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_books_fts_update AFTER UPDATE OF title, author, genre ON books
+FOR EACH ROW
+BEGIN
+    INSERT INTO books_fts (books_fts, rowid, title, author, genre)
+    VALUES ('delete', OLD.book_id, OLD.title, OLD.author, OLD.genre);
+    INSERT INTO books_fts (rowid, title, author, genre)
+    VALUES (NEW.book_id, NEW.title, NEW.author, NEW.genre);
+END;
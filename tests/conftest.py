@@ -0,0 +1,59 @@
+"""
+Shared fixtures: a migrated SQLite database in a temporary directory.
+
+The SQLite backend is built in, so the tests need no server. Every test
+database comes from the make_db fixture, which takes config sections as
+keyword arguments: [database] settings override the defaults, and
+replica={'east': {...}} writes a [replica:east] section per replica.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseConnection  # noqa: E402
+from migrations import MigrationRunner  # noqa: E402
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    """Open DatabaseConnections on migrated SQLite files, closing them afterwards"""
+    opened = []
+    migrated = set()
+
+    def make(replica=None, **sections):
+        config = tmp_path / f"config{len(opened)}.ini"
+        sections = {'database': {}, **sections}
+        sections['database'] = {'backend': 'sqlite', 'path': tmp_path / 'library.sqlite3', **sections['database']}
+        for name, settings in (replica or {}).items():
+            sections[f"replica:{name}"] = settings
+        lines = []
+        for name, settings in sections.items():
+            lines.append(f"[{name}]")
+            lines.extend(f"{key} = {value}" for key, value in settings.items())
+        config.write_text("\n".join(lines) + "\n")
+        db = DatabaseConnection(config_file=str(config))
+        opened.append(db)
+        # Each database file is migrated when it is first opened
+        path = str(sections['database']['path'])
+        if path not in migrated:
+            migrated.add(path)
+            assert MigrationRunner(db).apply() is not None
+        return db
+
+    yield make
+    for db in opened:
+        db.close()
+
+
+@pytest.fixture
+def db(make_db):
+    """A migrated SQLite database with the default settings"""
+    return make_db()
+
+
+def add_books(db, count, genre="Fiction"):
+    """Add count books titled 'Book 000' onwards and return their IDs"""
+    return [db.add_book(f"Book {number:03d}", f"Author {number % 7}", genre, 1950 + number) for number in range(count)]
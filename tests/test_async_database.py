@@ -0,0 +1,86 @@
+"""Tests of AsyncDatabaseConnection calls and their cancellation"""
+import asyncio
+import threading
+import time
+
+from async_database import AsyncDatabaseConnection, _Call
+from conftest import add_books
+
+# Takes several seconds unless interrupted
+SLOW_QUERY = """
+    WITH RECURSIVE numbers(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM numbers LIMIT 50000000)
+    SELECT COUNT(*) FROM numbers
+"""
+
+
+def test_calls_run_concurrently(db):
+    add_books(db, 5)
+
+    async def main():
+        async with AsyncDatabaseConnection(config_file=db.config_file, max_concurrency=2) as adb:
+            books, page = await asyncio.gather(adb.get_all_books(), adb.get_books_page(page_size=2))
+            return books, page
+
+    books, page = asyncio.run(main())
+    assert len(books) == 5
+    assert page == books[:2]
+
+
+def test_cancel_interrupts_the_running_statement(db):
+    async def main():
+        async with AsyncDatabaseConnection(config_file=db.config_file, max_concurrency=1) as adb:
+            task = asyncio.ensure_future(adb._run('execute_query', SLOW_QUERY))
+            await asyncio.sleep(0.2)
+            start = time.perf_counter()
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            # The worker and its connection are free again once the statement stops
+            books = await adb.get_all_books()
+            return books, time.perf_counter() - start
+
+    books, seconds = asyncio.run(main())
+    assert books == []
+    assert seconds < 1
+
+
+def test_cancel_sends_the_interrupt_while_holding_the_connection(make_db):
+    db = make_db(pool={'enabled': 'true'})
+    seen = []
+    started = threading.Event()
+    call = _Call(db, 'execute_query', (SLOW_QUERY,), {})
+
+    def interrupt(connection, replica=None):
+        # Still the call's connection, and run() cannot clear it until this returns
+        seen.append((connection is call.connection, call._lock.locked()))
+        db.backend.interrupt(connection)
+
+    db.interrupt = interrupt
+    original_use = call.use
+
+    def use(connection, replica):
+        original_use(connection, replica)
+        started.set()
+
+    call.use = use
+    worker = threading.Thread(target=call.run, daemon=True)
+    start = time.perf_counter()
+    worker.start()
+    assert started.wait(5)
+    time.sleep(0.1)
+    call.cancel()
+    worker.join(10)
+    assert time.perf_counter() - start < 1
+    assert seen == [(True, True)]
+    assert call.connection is None
+
+
+def test_cancel_after_the_call_finished_sends_nothing(db):
+    interrupted = []
+    db.interrupt = lambda connection, replica=None: interrupted.append(connection)
+    call = _Call(db, 'get_all_books', (), {})
+    assert call.run() == []
+    call.cancel()
+    assert interrupted == []
@@ -0,0 +1,77 @@
+"""Autocomplete: suggestions and their book counts follow the catalogue through writes."""
+import random
+from collections import Counter
+
+from autocomplete import Autocompleter, normalize, word_starts
+
+
+def reference(rows, prefix):
+    """(kind, normalized text) -> book count for every title and author a prefix matches"""
+    prefix = normalize(prefix)
+    counts = Counter()
+    for _, title, author, _ in rows:
+        for kind, value in (('title', title), ('author', author)):
+            folded = normalize(value)
+            if any(key.startswith(prefix) for key in word_starts(folded)):
+                counts[(kind, folded)] += 1
+    return counts
+
+
+def check(index, rows, prefix, limit):
+    expected = reference(rows, prefix)
+    suggestions = index.suggest(prefix, limit)
+    assert len(suggestions) == min(limit, len(expected))
+    for kind, text, count in suggestions:
+        assert expected[(kind, normalize(text))] == count
+    counts = [count for _, _, count in suggestions]
+    assert counts == sorted(expected.values(), reverse=True)[:limit]
+
+
+def test_matches_word_starts_ignoring_case_and_accents():
+    index = Autocompleter()
+    index.build([
+        (1, "The Lord of the Rings", "J.R.R. Tolkien", "Fantasy"),
+        (2, "The Hobbit", "J.R.R. Tolkien", "Fantasy"),
+        (3, "Les Misérables", "Victor Hugo", "Classic"),
+    ])
+    assert index.suggest("tolk") == [('author', "J.R.R. Tolkien", 2)]
+    assert index.suggest("OF THE R") == [('title', "The Lord of the Rings", 1)]
+    assert index.suggest("misera") == [('title', "Les Misérables", 1)]
+    assert index.suggest("  ") == []
+
+
+def test_counts_follow_random_writes():
+    generator = random.Random(7)
+    words = ["Alpha", "Beta", "Gamma", "Delta", "Ärger", "alpha beta"]
+    rows = {
+        book_id: (book_id, generator.choice(words), generator.choice(words[:3]), "Fiction")
+        for book_id in range(1, 200)
+    }
+    index = Autocompleter(memo_size=5)
+    index.build(rows.values())
+    for step in range(300):
+        book_id = generator.randrange(1, 260)
+        if generator.random() < 0.3:
+            rows.pop(book_id, None)
+            index.remove(book_id)
+        else:
+            rows[book_id] = (book_id, generator.choice(words), generator.choice(words), "Fiction")
+            index.add(*rows[book_id])
+        if step % 25 == 0:
+            for prefix in ("a", "al", "alpha b", "arg", "d"):
+                check(index, rows.values(), prefix, 3)
+                check(index, rows.values(), prefix, 50)
+
+
+def test_connection_suggests_after_its_writes(make_db):
+    db = make_db(search={'autocomplete': 'true'})
+    assert make_db().suggest("x") is None
+    book_id = db.add_book("Dune", "Frank Herbert", "Science Fiction")
+    assert db.suggest("her") == [('author', "Frank Herbert", 1)]
+    db.add_book("Dune Messiah", "Frank Herbert", "Science Fiction")
+    db.update_book(book_id, "Children of Dune", "Frank Herbert", "Science Fiction")
+    assert sorted(db.suggest("dune")) == [('title', "Children of Dune", 1), ('title', "Dune Messiah", 1)]
+    assert db.suggest("dune ") == [('title', "Dune Messiah", 1)]
+    assert db.suggest("frank") == [('author', "Frank Herbert", 2)]
+    db.delete_book(book_id)
+    assert db.suggest("frank") == [('author', "Frank Herbert", 1)]
@@ -0,0 +1,47 @@
+"""Tests of the SQLite backend's statement translation and of reading the MySQL settings"""
+from types import SimpleNamespace
+
+from backends import _sqlite_sql
+from conftest import add_books
+from database import DatabaseConnection
+
+
+def test_placeholders_become_question_marks():
+    assert _sqlite_sql("SELECT * FROM books WHERE title = %s AND author = %s") == (
+        "SELECT * FROM books WHERE title = ? AND author = ?"
+    )
+
+
+def test_percent_s_inside_quotes_is_kept():
+    assert _sqlite_sql("SELECT '%s', \"%s\" FROM books WHERE genre = %s") == (
+        "SELECT '%s', \"%s\" FROM books WHERE genre = ?"
+    )
+    assert _sqlite_sql("SELECT 'it''s %s' WHERE a = %s") == "SELECT 'it''s %s' WHERE a = ?"
+    assert _sqlite_sql("SELECT strftime('%Y-%m-%d %H:%M:%S', 'now')") == (
+        "SELECT strftime('%Y-%m-%d %H:%M:%S', 'now')"
+    )
+
+
+def test_like_pattern_literal_with_parameter(db):
+    add_books(db, 3)
+    db.add_book("Glass House", "Author", "Poetry")
+    rows = db.execute_query(
+        "SELECT title FROM books WHERE title LIKE '%s%' AND genre = %s", ('Poetry',)
+    )
+    assert rows == [("Glass House",)]
+
+
+def test_mysql_settings_allow_inline_comments(tmp_path):
+    config = tmp_path / "config.ini"
+    # The [database] example from the README
+    config.write_text(
+        "[database]\nhost = localhost\nuser = your_username\npassword = your_password\n"
+        "database = librarydb\nport = 3306  ; optional\n"
+    )
+    db = DatabaseConnection.__new__(DatabaseConnection)
+    db.config_file = str(config)
+    db.backend = SimpleNamespace(name='mysql')
+    assert db._read_config() == {
+        'host': 'localhost', 'user': 'your_username', 'password': 'your_password',
+        'database': 'librarydb', 'port': 3306,
+    }
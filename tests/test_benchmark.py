@@ -0,0 +1,79 @@
+"""Benchmark harness: latency summaries, regression checks and the synthetic catalogue."""
+from collections import Counter
+
+from benchmark.generate import CatalogueGenerator, isbn13
+from benchmark.run import Benchmark, compare, percentile, summarize
+
+
+def test_percentile_is_nearest_rank():
+    samples = list(range(1, 101))
+    assert percentile(samples, 0.50) == 50
+    assert percentile(samples, 0.95) == 95
+    assert percentile(samples, 0.99) == 99
+    assert percentile(samples, 1.0) == 100
+    assert percentile([7], 0.99) == 7
+    assert percentile([1, 2, 3], 0.0) == 1
+    assert percentile([], 0.5) == 0.0
+
+
+def test_summary_in_milliseconds():
+    summary = summarize([0.004, 0.001, 0.002, 0.003], rows=40)
+    assert summary == {
+        'calls': 4, 'rows': 40,
+        'p50_ms': 2.0, 'p95_ms': 4.0, 'p99_ms': 4.0, 'mean_ms': 2.5, 'max_ms': 4.0,
+        'ops_per_s': 400.0,
+    }
+    assert 'rows' not in summarize([0.001])
+    assert summarize([])['ops_per_s'] == 0.0
+
+
+def test_regressions_beyond_the_threshold_are_reported():
+    baseline = {'operations': {
+        'get_all_books': {'p95_ms': 10.0},
+        'search_broad': {'p95_ms': 10.0},
+        'add_book': {'p95_ms': 0.0},
+    }}
+    results = {'operations': {
+        'get_all_books': {'p95_ms': 11.5},
+        'search_broad': {'p95_ms': 10.9},
+        'add_book': {'p95_ms': 3.0},
+        'delete_book': {'p95_ms': 9.0},
+    }}
+    # Operations missing from the baseline, or without a time in it, are not compared
+    assert compare(results, baseline) == [('get_all_books', 10.0, 11.5)]
+    assert compare(results, baseline, threshold=0.2) == []
+
+
+def test_same_seed_same_catalogue():
+    assert list(CatalogueGenerator(300, seed=9)) == list(CatalogueGenerator(300, seed=9))
+    assert list(CatalogueGenerator(300, seed=9)) != list(CatalogueGenerator(300, seed=10))
+    generator = CatalogueGenerator(300, seed=9)
+    assert list(generator) == list(generator)
+
+
+def test_isbns_are_unique_and_valid():
+    books = list(CatalogueGenerator(5000, seed=3))
+    isbns = [book[4] for book in books]
+    assert len(set(isbns)) == len(isbns)
+    for isbn in isbns[:50]:
+        total = sum(int(digit) * (3 if index % 2 else 1) for index, digit in enumerate(isbn))
+        assert len(isbn) == 13 and total % 10 == 0
+    assert isbn13(0) == "9780000000002"
+
+
+def test_authors_and_genres_are_skewed():
+    generator = CatalogueGenerator(4000, seed=1)
+    authors = Counter(book[1] for book in generator)
+    genres = Counter(book[2] for book in generator)
+    assert len(authors) <= 4000 // 20
+    assert genres.most_common(1)[0][0] == generator.common_genre()
+    assert authors[generator.rare_author()] < authors.most_common(1)[0][1]
+
+
+def test_write_passes_respect_unique_isbns(db):
+    benchmark = Benchmark(db, CatalogueGenerator(200, seed=5), repeat=2, writes=20, group_size=7)
+    assert benchmark.load()['rows'] == 200
+    operations = benchmark.run()
+    assert {'add_book', 'add_book_grouped', 'update_book', 'delete_book'} <= set(operations)
+    assert operations['update_book']['calls'] == 20
+    assert len(db.get_all_books()) == 200
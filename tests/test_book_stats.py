@@ -0,0 +1,82 @@
+"""Catalogue statistics: the counters always agree with GROUP BY over the books table."""
+from conftest import add_books
+
+from book_stats import BookStats, decade_of, verify
+
+
+def assert_counts_match(db):
+    assert db.get_catalogue_stats() is not None
+    assert verify(db, db.book_stats) == []
+
+
+def test_disabled_by_default(db):
+    assert db.get_catalogue_stats() is None
+    assert db.get_stat_count('genre', 'Fiction') is None
+
+
+def test_counters_follow_this_clients_writes(make_db):
+    db = make_db(summary={'enabled': 'true'})
+    ids = add_books(db, 20)
+    assert_counts_match(db)
+    assert db.get_stat_count('genre', 'Fiction') == (20, 20)
+
+    db.add_book("Late Poem", "Poet", "Poetry", None)
+    db.update_book(ids[0], "Book 000", "Author 0", "Poetry", 1999)
+    db.update_books(ids[1:4], {'genre': 'Drama'})
+    db.delete_book(ids[4])
+    db.delete_books(ids[5:7])
+    assert_counts_match(db)
+    assert db.get_stat_count('genre', 'Poetry') == (2, 2)
+    assert db.get_stat_count('decade', None) == (1, 1)
+    assert db.get_stat_count('decade', 1990) == (1, 1)
+
+
+def test_counters_follow_loans(make_db):
+    db = make_db(summary={'enabled': 'true'})
+    ids = add_books(db, 5)
+    assert_counts_match(db)
+    db.checkout_books(ids[:3], "ann")
+    assert db.get_catalogue_stats()['available'] == 2
+    db.return_book(ids[0])
+    assert_counts_match(db)
+    assert db.get_stat_count('genre', 'Fiction') == (5, 3)
+
+
+def test_rolled_back_writes_are_not_counted(make_db):
+    db = make_db(summary={'enabled': 'true'})
+    add_books(db, 3)
+    assert_counts_match(db)
+    try:
+        with db.transaction():
+            db.add_book("Never", "Nobody", "Fiction")
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert db.get_stat_count('genre', 'Fiction') == (3, 3)
+
+
+def test_refresh_picks_up_other_clients(make_db):
+    db = make_db(summary={'enabled': 'true', 'refresh': 0})
+    other = make_db()
+    ids = add_books(other, 6)
+    assert_counts_match(db)
+    other.add_book("Elsewhere", "Someone", "Travel", 2001)
+    other.update_book(ids[0], "Book 000", "Author 0", "Travel")
+    other.delete_book(ids[1])
+    other.checkout_book(ids[2], "bob")
+    assert_counts_match(db)
+    assert db.get_stat_count('genre', 'Travel') == (2, 2)
+    assert db.get_catalogue_stats()['available'] == 5
+
+
+def test_reading_an_unchanged_book_again_leaves_counts_alone():
+    stats = BookStats()
+    stats.add(1, "Dune", "Frank Herbert", "Science Fiction", 1965)
+    stats.add(1, "Dune", "Frank Herbert", "Science Fiction", 1965)
+    stats.update(2, "Unknown", "Nobody", "Fiction")
+    assert stats.totals() == (1, 1)
+    assert stats.count('decade', decade_of(1965)) == (1, 1)
+    stats.set_available(1, False)
+    stats.remove(1)
+    assert stats.totals() == (0, 0)
+    assert stats.top('author') == []
@@ -0,0 +1,44 @@
+"""Bulk import: batched inserts return IDs in input order and load all or nothing."""
+import json
+
+from conftest import add_books
+
+import import_books
+
+
+def books(count):
+    return ((f"Bulk {number:04d}", f"Author {number}", "Fiction", 2000, None) for number in range(count))
+
+
+def test_ids_follow_input_order_across_batches(db):
+    batches = []
+    ids = db.add_books_bulk(books(25), batch_size=10, on_batch=lambda rows, first_id: batches.append(rows))
+    assert batches == [10, 10, 5]
+    details = db.get_books_details(ids)
+    assert [details[book_id]['title'] for book_id in ids] == [f"Bulk {number:04d}" for number in range(25)]
+
+
+def test_dict_records_and_count_only(db):
+    records = [{'title': "Dune", 'author': "Frank Herbert", 'genre': "Science Fiction"}] * 3
+    assert db.add_books_bulk(records, batch_size=2, return_ids=False) == 3
+    assert len(db.get_all_books()) == 3
+
+
+def test_failed_batch_commits_nothing(db):
+    add_books(db, 2)
+    records = list(books(15)) + [(None, "No Title", "Fiction", None, None)]
+    assert db.add_books_bulk(records, batch_size=10) is None
+    assert len(db.get_all_books()) == 2
+
+
+def test_loader_skips_invalid_records(db, tmp_path):
+    path = tmp_path / "books.jsonl"
+    lines = [
+        {'title': "Dune", 'author': "Frank Herbert", 'genre': "Science Fiction", 'publication_year': "1965"},
+        {'title': "", 'author': "Nobody", 'genre': "Fiction"},
+        {'title': "Emma", 'author': "Jane Austen", 'genre': "Romance", 'publication_year': "soon"},
+    ]
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\nnot json\n")
+    assert import_books.main([str(path), '--config', db.config_file, '--batch-size', '2']) == 0
+    rows = db.execute_query("SELECT title, publication_year FROM books")
+    assert rows == [("Dune", 1965)]
@@ -0,0 +1,79 @@
+"""Bulk delete and update: chunked statements in one transaction, all or nothing."""
+import time
+
+import pytest
+from conftest import add_books
+
+
+def test_ids_are_chunked_by_batch_size(db):
+    ids = add_books(db, 5)
+    batches = []
+    with db.capture_statements() as statements:
+        deleted = db.delete_books(ids, batch_size=2, on_batch=lambda *args: batches.append((args, len(statements))))
+    assert deleted == 5
+    assert [params for query, params in statements] == [ids[0:2], ids[2:4], ids[4:5]]
+    # on_batch runs after each statement, with the chunk size, rows affected and seconds taken
+    assert [(chunk, rows, ran) for (chunk, rows, seconds), ran in batches] == [(2, 2, 1), (2, 2, 2), (1, 1, 3)]
+    assert all(isinstance(seconds, float) and seconds >= 0 for (chunk, rows, seconds), ran in batches)
+    assert db.get_all_books() == []
+
+
+def test_update_sets_fields_on_every_chunk(db):
+    ids = add_books(db, 5)
+    start = time.perf_counter()
+    timings = []
+    changed = db.update_books(ids[1:], {'genre': 'Poetry', 'publication_year': 2001}, batch_size=3,
+                              on_batch=lambda chunk, rows, seconds: timings.append(seconds))
+    assert changed == 4
+    assert len(timings) == 2 and sum(timings) <= time.perf_counter() - start
+    details = db.get_books_details(ids)
+    assert [(details[book_id]['genre'], details[book_id]['publication_year']) for book_id in ids] == (
+        [('Fiction', 1950)] + [('Poetry', 2001)] * 4
+    )
+
+
+def test_a_failing_batch_rolls_back_the_earlier_ones(db):
+    ids = add_books(db, 6)
+    db.execute_query("""
+        CREATE TRIGGER keep_book_004 BEFORE DELETE ON books WHEN OLD.title = 'Book 004'
+        BEGIN SELECT RAISE(ABORT, 'Book 004 is kept'); END
+    """)
+    batches = []
+    assert db.delete_books(ids, batch_size=2, on_batch=lambda *args: batches.append(args)) is None
+    assert len(batches) == 2
+    assert len(db.get_all_books()) == 6
+
+
+def test_a_failing_callback_rolls_back_too(db):
+    ids = add_books(db, 4)
+
+    def on_batch(chunk, rows, seconds):
+        raise RuntimeError("stop")
+
+    with pytest.raises(RuntimeError):
+        db.update_books(ids, {'genre': 'Poetry'}, batch_size=2, on_batch=on_batch)
+    assert {row[3] for row in db.get_all_books()} == {'Fiction'}
+
+
+def test_string_and_repeated_ids(db):
+    ids = add_books(db, 3)
+    assert db.delete_books([str(ids[2]), str(ids[0]), str(ids[0])]) == 2
+    assert [row[0] for row in db.get_all_books()] == [ids[1]]
+
+
+def test_empty_input_runs_nothing(db):
+    batches = []
+    with db.capture_statements() as statements:
+        assert db.delete_books([], on_batch=lambda *args: batches.append(args)) == 0
+        assert db.update_books(iter(()), {'genre': 'Poetry'}, on_batch=lambda *args: batches.append(args)) == 0
+        assert db.update_books([1], {}) == 0
+    assert statements == [] and batches == []
+
+
+def test_unknown_fields_and_bad_batch_size_are_rejected(db):
+    ids = add_books(db, 2)
+    with pytest.raises(ValueError, match="shelf"):
+        db.update_books(ids, {'genre': 'Poetry', 'shelf': 'B2'})
+    with pytest.raises(ValueError):
+        db.delete_books(ids, batch_size=0)
+    assert len(db.get_all_books()) == 2
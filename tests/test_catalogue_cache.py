@@ -0,0 +1,70 @@
+"""Tests of CatalogueCache: writes through it, and incremental refresh of other clients' writes"""
+from catalogue_cache import CatalogueCache
+from conftest import add_books
+
+
+def cached_titles(cache):
+    return [row[1] for row in cache.get_all_books()]
+
+
+def test_cache_matches_the_database_after_load(db):
+    add_books(db, 10)
+    cache = CatalogueCache(db)
+    assert cache.load()
+    assert cache.get_all_books() == db.get_all_books()
+
+
+def test_bulk_writes_accept_generators(db):
+    book_ids = add_books(db, 6)
+    cache = CatalogueCache(db)
+    assert cache.load()
+
+    assert cache.update_books((book_id for book_id in book_ids[:3]), {'genre': 'Poetry'}) == 3
+    assert [cache.get_book(book_id)[3] for book_id in book_ids[:3]] == ['Poetry'] * 3
+
+    assert cache.delete_books(book_id for book_id in book_ids[3:]) == 3
+    assert len(cache) == 3
+    assert cache.get_all_books() == db.get_all_books()
+
+
+def test_refresh_applies_other_clients_writes(make_db):
+    db = make_db()
+    other = make_db()
+    kept, changed, deleted = add_books(db, 3)
+    cache = CatalogueCache(db)
+    assert cache.load()
+
+    other.update_book(changed, "Renamed", "Author", "Fiction")
+    other.delete_book(deleted)
+    added = other.add_book("Added elsewhere", "Author", "Fiction")
+
+    assert cache.refresh() is not None
+    assert cache.get_all_books() == db.get_all_books()
+    assert {row[0] for row in cache.get_all_books()} == {kept, changed, added}
+
+
+def test_search_and_pages_follow_title_order(db):
+    add_books(db, 25)
+    cache = CatalogueCache(db)
+    assert cache.load()
+    first = cache.get_books_page(page_size=10)
+    second = cache.get_books_page(after=(first[-1][1], first[-1][0]), page_size=10)
+    assert first + second == db.get_all_books()[:20]
+    assert cache.search_books("book 01") == db.search_books("book 01", mode='like')
+
+
+def test_mixed_case_titles_follow_the_database_collation(db):
+    for title in ("banana", "Apple", "cherry", "Date", "apple", "éclair", "Éclair"):
+        db.add_book(title, "Author", "Fiction")
+    cache = CatalogueCache(db)
+    assert cache.load()
+    assert cache.get_all_books() == db.get_all_books()
+    db_page = db.get_books_page(page_size=3)
+    after = (db_page[-1][1], db_page[-1][0])
+    assert cache.get_books_page(after=after, page_size=3) == db.get_books_page(after=after, page_size=3)
+    before = (db_page[-1][1], db_page[-1][0])
+    assert cache.get_books_page(before=before, page_size=2) == db.get_books_page(before=before, page_size=2)
+
+    renamed = cache.add_book("aardvark", "Author", "Fiction")
+    cache.update_book(renamed, "DATE", "Author", "Fiction")
+    assert cache.get_all_books() == db.get_all_books()
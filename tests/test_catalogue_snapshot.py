@@ -0,0 +1,85 @@
+"""Catalogue snapshots: saved rows read back unchanged, and pages match the database."""
+import pytest
+from conftest import add_books
+
+from catalogue_cache import CatalogueCache
+from catalogue_snapshot import CatalogueSnapshot, write_snapshot
+
+
+def saved_snapshot(db, tmp_path):
+    cache = CatalogueCache(db)
+    assert cache.load()
+    path = str(tmp_path / "catalogue.snapshot")
+    assert cache.save_snapshot(path)
+    return cache, CatalogueSnapshot.open(path)
+
+
+def test_rows_read_back_unchanged(db, tmp_path):
+    add_books(db, 8)
+    db.add_book("Book 003", "Anonymous", "Poetry")
+    db.add_book("Émile", "Jean-Jacques Rousseau", "Philosophy", 1762, "978-0-465-01931-1")
+    cache, snapshot = saved_snapshot(db, tmp_path)
+    assert len(snapshot) == 10
+    assert snapshot.marker == cache.marker
+    assert list(snapshot) == [cache.get_book(row[0]) for row in cache.get_all_books()]
+    snapshot.close()
+
+
+def test_pages_match_the_database(db, tmp_path):
+    add_books(db, 20)
+    for number in range(3):
+        db.add_book("Book 007", f"Other {number}", "Fiction", 2000)
+    _, snapshot = saved_snapshot(db, tmp_path)
+    assert snapshot.get_all_books() == db.get_all_books()
+    after = before = None
+    while True:
+        page = snapshot.get_books_page(after=after, page_size=4)
+        assert page == db.get_books_page(after=after, page_size=4)
+        if len(page) < 4:
+            break
+        after = (page[-1][1], page[-1][0])
+        before = (page[0][1], page[0][0])
+    assert snapshot.get_books_page(before=before, page_size=4) == db.get_books_page(before=before, page_size=4)
+    window = dict(after=("Book 005", 0), before=("Book 010", 0), page_size=100)
+    assert snapshot.get_books_page(**window) == db.get_books_page(**window)
+    snapshot.close()
+
+
+def test_restored_cache_catches_up_on_refresh(db, tmp_path):
+    ids = add_books(db, 5)
+    _, snapshot = saved_snapshot(db, tmp_path)
+    db.add_book("Book 100", "Author", "Fiction")
+    db.update_book(ids[0], "Renamed", "Author 0", "Fiction")
+    db.delete_book(ids[1])
+    cache = CatalogueCache(db)
+    cache.restore(snapshot)
+    assert len(cache) == 5
+    assert cache.refresh() is not None
+    assert cache.get_all_books() == db.get_all_books()
+    snapshot.close()
+
+
+def test_unusable_files_are_ignored(tmp_path):
+    assert CatalogueSnapshot.open(str(tmp_path / "missing.snapshot")) is None
+    path = tmp_path / "broken.snapshot"
+    path.write_bytes(b"LIBSNAP1" + bytes(40))
+    assert CatalogueSnapshot.open(str(path)) is None
+    path.write_bytes(b"short")
+    assert CatalogueSnapshot.open(str(path)) is None
+
+
+def test_mixed_case_pages_line_up_with_database_cursors(db, tmp_path):
+    for title in ("banana", "Apple", "cherry", "Date", "apple", "éclair", "Éclair"):
+        db.add_book(title, "Author", "Fiction")
+    _, snapshot = saved_snapshot(db, tmp_path)
+    assert snapshot.get_all_books() == db.get_all_books()
+    for row in db.get_all_books():
+        key = (row[1], row[0])
+        assert snapshot.get_books_page(after=key, page_size=3) == db.get_books_page(after=key, page_size=3)
+        assert snapshot.get_books_page(before=key, page_size=3) == db.get_books_page(before=key, page_size=3)
+    snapshot.close()
+
+
+def test_only_known_folds_are_recorded(tmp_path):
+    with pytest.raises(ValueError):
+        write_snapshot(str(tmp_path / "catalogue.snapshot"), [], None, fold=str.lower)
@@ -0,0 +1,82 @@
+"""Tests of the book_changes log and ChangeFeed on the SQLite backend"""
+from change_feed import ChangeFeed
+from conftest import add_books
+
+
+def logged(db, book_id, op):
+    rows = db.execute_query("SELECT COUNT(*) FROM book_changes WHERE book_id = %s AND op = %s", (book_id, op))
+    return rows[0][0]
+
+
+def test_updates_in_the_same_millisecond_are_all_logged(db):
+    book_id = add_books(db, 1)[0]
+    # One transaction runs the updates well within a millisecond of each other
+    with db.transaction():
+        for number in range(20):
+            db.execute_query("UPDATE books SET genre = %s WHERE book_id = %s", (f"Genre {number}", book_id))
+    assert logged(db, book_id, 'U') == 20
+
+
+def test_updated_at_always_moves_forward(db):
+    book_id = add_books(db, 1)[0]
+    stamps = []
+    with db.transaction():
+        for available in (0, 1, 0, 1):
+            db.execute_query("UPDATE books SET available = %s WHERE book_id = %s", (available, book_id))
+            stamps.append(db.execute_query("SELECT updated_at FROM books WHERE book_id = %s", (book_id,))[0][0])
+    assert stamps == sorted(set(stamps))
+
+
+def test_checkout_return_checkout_update_logs_four_updates(db):
+    book_id = add_books(db, 1)[0]
+    assert db.checkout_book(book_id, "card-1")
+    assert db.return_book(book_id)
+    assert db.checkout_book(book_id, "card-1")
+    assert db.update_book(book_id, "Retitled", "Author", "Fiction")
+    assert logged(db, book_id, 'U') == 4
+
+
+def test_poll_merges_changes_per_book(db):
+    kept, changed, deleted = add_books(db, 3)
+    feed = ChangeFeed(db, db.get_change_seq())
+    db.update_book(changed, "New title", "Author", "Fiction")
+    db.update_book(changed, "Newer title", "Author", "Fiction")
+    db.delete_book(deleted)
+    new = db.add_book("Fresh", "Author", "Fiction")
+    db.update_book(new, "Fresh, revised", "Author", "Fiction")
+
+    events = {book_id: (operation, row) for operation, book_id, row in feed.poll()}
+    assert kept not in events
+    assert events[changed][0] == 'update' and events[changed][1][1] == "Newer title"
+    assert events[deleted] == ('delete', None)
+    # The subscriber has not seen the new book yet, so it stays an insert
+    assert events[new][0] == 'insert' and events[new][1][1] == "Fresh, revised"
+    assert feed.poll() == []
+
+
+def test_poll_waits_for_a_gap_then_skips_it(db):
+    first, second = add_books(db, 2)
+    feed = ChangeFeed(db, db.get_change_seq(), gap_timeout=60)
+    db.update_book(first, "One", "Author", "Fiction")
+    db.update_book(second, "Two", "Author", "Fiction")
+    # Hide the first entry, as if its transaction had not committed yet
+    rows = db.execute_query("SELECT seq, book_id, op, changed_at FROM book_changes ORDER BY seq DESC LIMIT 2")
+    late = rows[1]
+    db.execute_query("DELETE FROM book_changes WHERE seq = %s", (late[0],))
+
+    assert [book_id for _, book_id, _ in feed.poll()] == [second]
+    assert feed.seq == late[0] - 1
+    # The late transaction commits: the gap is re-read and delivered once
+    db.execute_query("INSERT INTO book_changes (seq, book_id, op, changed_at) VALUES (%s, %s, %s, %s)", late)
+    assert [book_id for _, book_id, _ in feed.poll()] == [first]
+    assert feed.poll() == []
+
+    # A gap that never fills is given up after gap_timeout
+    feed.gap_timeout = 0
+    db.update_book(first, "Three", "Author", "Fiction")
+    db.update_book(second, "Four", "Author", "Fiction")
+    newest = db.get_change_seq()
+    db.execute_query("DELETE FROM book_changes WHERE seq = %s", (newest - 1,))
+    assert [book_id for _, book_id, _ in feed.poll()] == [second]
+    assert feed.poll() == []
+    assert feed.seq == newest
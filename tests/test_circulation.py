@@ -0,0 +1,83 @@
+"""Checkout claims: a copy is lent to one borrower at a time, holders first."""
+import threading
+
+from conftest import add_books
+
+
+def open_loans(db, book_id):
+    return db.get_loans(book_id=book_id)
+
+
+def test_checkout_and_return(db):
+    book_id = add_books(db, 1)[0]
+    loan_id = db.checkout_book(book_id, "ann")
+    assert loan_id is not None
+    assert db.checkout_book(book_id, "bob") is None
+    assert [loan['loan_id'] for loan in open_loans(db, book_id)] == [loan_id]
+    assert db.return_book(book_id)
+    assert not db.return_book(book_id)
+    assert open_loans(db, book_id) == []
+    assert db.checkout_book(book_id, "bob") is not None
+
+
+def test_stack_checkout_skips_copies_on_loan(db):
+    ids = add_books(db, 4)
+    db.checkout_book(ids[1], "ann")
+    loans = db.checkout_books(reversed(ids), "bob")
+    assert sorted(loans) == [ids[0], ids[2], ids[3]]
+    assert {loan['book_id'] for loan in db.get_loans(borrower="bob")} == set(loans)
+
+
+def test_hold_queue_decides_who_gets_a_returned_copy(db):
+    book_id = add_books(db, 1)[0]
+    db.checkout_book(book_id, "ann")
+    db.place_hold(book_id, "bob")
+    eve_hold = db.place_hold(book_id, "eve")
+    db.place_hold(book_id, "cat")
+    assert db.cancel_hold(eve_hold)
+    assert not db.cancel_hold(eve_hold)
+    db.return_book(book_id)
+    assert db.checkout_book(book_id, "cat") is None
+    assert db.checkout_book(book_id, "bob") is not None
+    # bob's hold is fulfilled, so cat is first once the copy comes back
+    assert [hold['borrower'] for hold in db.get_holds(book_id)] == ["cat"]
+    db.return_book(book_id)
+    assert db.checkout_book(book_id, "cat") is not None
+
+
+def test_renewals_are_limited(make_db):
+    db = make_db(circulation={'max_renewals': '1'})
+    book_id = add_books(db, 1)[0]
+    db.checkout_book(book_id, "ann", loan_days=7)
+    due = db.renew_loan(book_id, loan_days=14)
+    assert due is not None
+    assert db.renew_loan(book_id) is None
+    assert open_loans(db, book_id)[0]['renewals'] == 1
+
+
+def test_held_copy_cannot_be_renewed(db):
+    book_id = add_books(db, 1)[0]
+    db.checkout_book(book_id, "ann")
+    db.place_hold(book_id, "bob")
+    assert db.renew_loan(book_id) is None
+    assert db.renew_loan(add_books(db, 1)[0]) is None
+
+
+def test_racing_desks_lend_a_copy_once(make_db):
+    desks = [make_db() for _ in range(6)]
+    book_id = add_books(desks[0], 1)[0]
+    start = threading.Barrier(len(desks))
+    loans = []
+
+    def checkout(desk, borrower):
+        start.wait()
+        loans.append(desk.checkout_book(book_id, borrower))
+
+    threads = [threading.Thread(target=checkout, args=(desk, f"reader {n}")) for n, desk in enumerate(desks)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    lent = [loan_id for loan_id in loans if loan_id is not None]
+    assert len(lent) == 1
+    assert [loan['loan_id'] for loan in open_loans(desks[0], book_id)] == lent
@@ -0,0 +1,58 @@
+"""Detail cache: full rows are served from memory and dropped by writes to them."""
+from conftest import add_books
+
+
+def test_details_are_cached_per_book(make_db):
+    db = make_db(cache={'details': 'true'})
+    ids = add_books(db, 4)
+    details = db.get_books_details(ids[:2])
+    assert sorted(details) == ids[:2]
+    assert details[ids[0]]['title'] == "Book 000"
+    details[ids[0]]['title'] = "changed by the caller"
+    assert db.get_book_details(ids[0])['title'] == "Book 000"
+    db.get_books_details(ids)
+    stats = db.get_detail_cache_stats()
+    assert (stats['hits'], stats['misses']) == (3, 4)
+
+
+def test_missing_books_are_left_out(make_db):
+    db = make_db(cache={'details': 'true'})
+    ids = add_books(db, 2)
+    assert sorted(db.get_books_details(ids + [ids[-1] + 100])) == ids
+    assert db.get_book_details(ids[-1] + 100) is None
+
+
+def test_writes_drop_the_books_they_touch(make_db):
+    db = make_db(cache={'details': 'true'})
+    ids = add_books(db, 4)
+    db.get_books_details(ids)
+    db.update_book(ids[0], "Renamed", "Author 0", "Fiction")
+    db.update_books(ids[1:3], {'genre': 'Poetry'})
+    db.delete_book(ids[3])
+    details = db.get_books_details(ids)
+    assert details[ids[0]]['title'] == "Renamed"
+    assert details[ids[1]]['genre'] == details[ids[2]]['genre'] == "Poetry"
+    assert ids[3] not in details
+
+
+def test_checkout_drops_the_cached_availability(make_db):
+    db = make_db(cache={'details': 'true'})
+    book_id = add_books(db, 1)[0]
+    assert db.get_book_details(book_id)['available']
+    assert db.checkout_book(book_id, "reader") is not None
+    assert not db.get_book_details(book_id)['available']
+    assert db.return_book(book_id)
+    assert db.get_book_details(book_id)['available']
+
+
+def test_uncommitted_rows_are_not_cached(make_db):
+    db = make_db(cache={'details': 'true'})
+    book_id = add_books(db, 1)[0]
+    try:
+        with db.transaction():
+            db.update_book(book_id, "Uncommitted", "Author 0", "Fiction")
+            assert db.get_book_details(book_id)['title'] == "Uncommitted"
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert db.get_book_details(book_id)['title'] == "Book 000"
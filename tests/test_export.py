@@ -0,0 +1,44 @@
+"""Export: streamed files hold every matching row and can be imported again."""
+import csv
+import gzip
+import json
+
+import pytest
+from conftest import add_books
+
+import import_books
+
+
+def test_csv_export_imports_again(db, make_db, tmp_path):
+    add_books(db, 12)
+    path = str(tmp_path / "books.csv")
+    chunks = []
+    result = db.export_books(path, chunk_size=5, on_chunk=lambda rows, seconds: chunks.append(rows))
+    assert result['rows'] == 12 and chunks == [5, 5, 2]
+    with open(path, newline='', encoding='utf-8') as f:
+        exported = list(csv.DictReader(f))
+    assert [row['title'] for row in exported] == [f"Book {number:03d}" for number in range(12)]
+
+    copy = make_db(database={'path': tmp_path / "copy.sqlite3"})
+    assert import_books.main([path, '--config', copy.config_file]) == 0
+    columns = "title, author, genre, publication_year"
+    query = f"SELECT {columns} FROM books ORDER BY book_id"
+    assert copy.execute_query(query) == db.execute_query(query)
+
+
+def test_compressed_search_export(db, tmp_path):
+    add_books(db, 5)
+    db.add_book("Dune", "Frank Herbert", "Science Fiction", 1965)
+    path = str(tmp_path / "books.jsonl.gz")
+    assert db.export_books(path, 'jsonl', search_term="herbert", compression='gzip')['rows'] == 1
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert [(row['title'], row['publication_year']) for row in rows] == [("Dune", 1965)]
+
+
+def test_failed_export_leaves_no_file(db, tmp_path):
+    add_books(db, 3)
+    with pytest.raises(ValueError):
+        db.export_books(str(tmp_path / "books.csv"), 'xml')
+    assert db.export_books(str(tmp_path / "missing" / "books.csv")) is None
+    assert not list(tmp_path.glob("books.csv*"))
@@ -0,0 +1,70 @@
+"""FULLTEXT search modes on the SQLite FTS5 index, and the LIKE fallback for short terms."""
+import pytest
+
+from backends import MySQLBackend
+
+BOOKS = [
+    ("Dune", "Frank Herbert", "Science Fiction"),
+    ("Dune Messiah", "Brian Herbert", "Science Fiction"),
+    ("The Frank Diaries", "Anne Frank", "Memoir"),
+    ("A Long Journey Past the Dune Sea", "Lena Marsh", "Travel"),
+    ("Fondue Recipes", "Ivo Grant", "Cooking"),
+    ("Titan Oxford", "Mara Quill", "History"),
+]
+
+
+@pytest.fixture
+def library(db):
+    for title, author, genre in BOOKS:
+        db.add_book(title, author, genre)
+    return db
+
+
+def titles(rows):
+    return [row[1] for row in rows]
+
+
+def test_natural_matches_any_word_and_boolean_every_word_prefix(library):
+    assert sorted(titles(library.search_books("dune frank", mode='natural'))) == [
+        "A Long Journey Past the Dune Sea", "Dune", "Dune Messiah", "The Frank Diaries",
+    ]
+    assert titles(library.search_books("dune frank", mode='boolean')) == ["Dune"]
+    # Only boolean mode matches word prefixes
+    assert titles(library.search_books("messi", mode='boolean')) == ["Dune Messiah"]
+    assert library.search_books("messi", mode='natural') == []
+
+
+def test_best_matches_come_first(library):
+    # Title order would put the long title first
+    assert titles(library.search_books("dune", mode='natural')) == [
+        "Dune", "Dune Messiah", "A Long Journey Past the Dune Sea",
+    ]
+
+
+def test_terms_shorter_than_min_fulltext_length_use_like(library):
+    assert library._fulltext_query("du", 'natural') is None
+    assert library._search_condition("du", 'natural')[2] is False
+    # A substring match, which the FTS5 index cannot find
+    assert titles(library.search_books("du", mode='natural')) == [
+        "A Long Journey Past the Dune Sea", "Dune", "Dune Messiah", "Fondue Recipes",
+    ]
+
+
+def test_terms_of_only_short_words_use_like(library):
+    assert library._fulltext_query("an ox", 'boolean') is None
+    assert library._fulltext_query("an ox", 'natural') is None
+    assert titles(library.search_books("an ox", mode='boolean')) == ["Titan Oxford"]
+
+
+def test_search_strings_drop_short_words_and_quote_operators(library):
+    assert library._fulltext_query("the dune NOT -frank", 'natural') == '"the" OR "dune" OR "NOT" OR "frank"'
+    assert library._fulltext_query("of dune", 'boolean') == '"dune"*'
+    # Unquoted, "NOT" would be an FTS5 operator missing its right operand
+    assert library.search_books("dune NOT", mode='boolean') == []
+
+
+def test_mysql_search_strings():
+    backend = MySQLBackend.__new__(MySQLBackend)
+    assert backend.fulltext_query(" dune of arrakis ", ["dune", "arrakis"], 'natural') == "dune of arrakis"
+    assert backend.fulltext_query("dune of arrakis", ["dune", "arrakis"], 'boolean') == "+dune* +arrakis*"
+    assert backend.fulltext_query("of", [], 'boolean') is None
@@ -0,0 +1,326 @@
+"""
+Desktop app plumbing: worker results reach the Tk thread, searches are
+debounced and stale results dropped, and the book list is patched row by row.
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import library_app_new
+from conftest import add_books
+from library_app_new import BackgroundRunner, LibraryBookApp, TreeDiffRenderer, VirtualBookView
+
+
+class FakeRoot:
+    """Stands in for tk.Tk: after() callbacks run only when the test says so"""
+
+    def __init__(self):
+        self.pending = {}
+        self.next_id = 0
+        self.thread = threading.current_thread()
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.pending[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        del self.pending[after_id]
+
+    def run_pending(self):
+        pending, self.pending = self.pending, {}
+        for callback in pending.values():
+            callback()
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args))
+
+
+def drain(root, runner, timeout=5):
+    """Run the Tk polls until every submitted call has been delivered"""
+    deadline = time.monotonic() + timeout
+    while runner.outstanding:
+        assert time.monotonic() < deadline, "worker calls did not finish"
+        time.sleep(0.005)
+        root.run_pending()
+
+
+@pytest.fixture
+def root():
+    return FakeRoot()
+
+
+@pytest.fixture
+def runner(root):
+    runner = BackgroundRunner(root)
+    yield runner
+    runner.shutdown()
+
+
+def test_results_and_errors_are_delivered_on_the_tk_thread(root, runner):
+    delivered = []
+
+    def callback(result, error):
+        delivered.append((result, type(error), threading.current_thread()))
+
+    runner.submit(callback, threading.current_thread)
+    runner.submit(callback, int, "not a number")
+    drain(root, runner)
+    worker, failed = sorted(delivered, key=lambda item: item[0] is None)
+    assert worker[0] is not root.thread and worker[1] is type(None)
+    assert failed[:2] == (None, ValueError)
+    assert {item[2] for item in delivered} == {root.thread}
+    # Polling stops once nothing is outstanding
+    assert not root.pending
+
+
+def test_shutdown_drops_undelivered_results(root, runner):
+    delivered = []
+    runner.submit(lambda result, error: delivered.append(result), lambda: 1)
+    runner.shutdown()
+    time.sleep(0.05)
+    root.run_pending()
+    assert delivered == []
+
+
+def make_app(root, runner, source=None):
+    """A LibraryBookApp with fake widgets, built without a display"""
+    app = LibraryBookApp.__new__(LibraryBookApp)
+    app.root = root
+    app.runner = runner
+    app.db = SimpleNamespace(query_stats=None)
+    app.source = source
+    app.cache = None
+    app.book_view = None
+    app.renderer = Recorder()
+    app.status_label = Recorder()
+    app.search_var = SimpleNamespace(get=lambda: "")
+    app.search_delay_ms = 300
+    app._search_after_id = None
+    app._search_future = None
+    app._search_generation = 0
+    return app
+
+
+def test_typing_runs_one_search_after_the_pause(root, runner):
+    app = make_app(root, runner)
+    searches = []
+    app.search_books = lambda: searches.append(True)
+    for _ in range(3):
+        app.schedule_search()
+    assert len(root.pending) == 1 and searches == []
+    root.run_pending()
+    assert searches == [True]
+
+
+def test_results_of_superseded_searches_are_discarded(root, runner):
+    release = threading.Event()
+
+    def search_books(term):
+        if term == "slow":
+            release.wait(5)
+        return [(1, term, "Author", "Genre")]
+
+    app = make_app(root, runner, SimpleNamespace(search_books=search_books))
+    app._request_books("slow")
+    app._request_books("fast")
+    # The newer search finishes first; the older one is delivered afterwards
+    while app._search_future is not None:
+        time.sleep(0.005)
+        root.run_pending()
+    release.set()
+    drain(root, runner)
+    assert app.renderer.calls == [('render', ([(1, "fast", "Author", "Genre")],))]
+
+
+def test_single_book_delete_runs_on_a_worker(root, runner, monkeypatch):
+    threads = []
+
+    def delete_book(book_id):
+        threads.append(threading.current_thread())
+        return True
+
+    monkeypatch.setattr(library_app_new.messagebox, 'askyesno', lambda *args: True)
+    app = make_app(root, runner, SimpleNamespace(delete_book=delete_book))
+    app.tree = SimpleNamespace(selection=lambda: ("7",), item=lambda item, option: ("7", "Dune"))
+    app.delete_book()
+    assert app.renderer.calls == []
+    drain(root, runner)
+    assert threads and threads[0] is not root.thread
+    assert app.renderer.calls == [('remove', ("7",))]
+
+
+class FakeTree:
+    """Stands in for a flat ttk.Treeview and counts the writes made to it"""
+
+    def __init__(self):
+        self.children = []
+        self.values = {}
+        self.tags = {}
+        self.writes = {'insert': 0, 'values': 0, 'tags': 0, 'delete': 0, 'set_children': 0}
+        self.view = (0.0, 1.0)
+        self.idle = []
+
+    def insert(self, parent, index, iid, values, tags):
+        self.children.insert(len(self.children) if index == "end" else index, iid)
+        self.values[iid], self.tags[iid] = values, tags
+        self.writes['insert'] += 1
+
+    def item(self, iid, values=None, tags=None):
+        if values is not None:
+            self.values[iid] = values
+            self.writes['values'] += 1
+        if tags is not None:
+            self.tags[iid] = tags
+            self.writes['tags'] += 1
+
+    def delete(self, *items):
+        self.children = [item for item in self.children if item not in items]
+        self.writes['delete'] += len(items)
+
+    def set_children(self, parent, *items):
+        self.children = list(items)
+        self.writes['set_children'] += 1
+
+    def configure(self, **options):
+        pass
+
+    def yview(self):
+        return self.view
+
+    def yview_moveto(self, fraction):
+        self.view = (fraction, fraction + 0.1)
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+
+    def run_idle(self):
+        idle, self.idle = self.idle, []
+        for callback in idle:
+            callback()
+
+
+def book(book_id, title=None, author="Author"):
+    return (book_id, title or f"Book {book_id:03d}", author, "Fiction")
+
+
+def no_changes(**counts):
+    return {'inserted': 0, 'updated': 0, 'moved': 0, 'deleted': 0, 'restriped': 0, **counts}
+
+
+def test_first_render_inserts_striped_rows():
+    tree = FakeTree()
+    assert TreeDiffRenderer(tree).render([book(n) for n in range(4)]) == no_changes(inserted=4)
+    assert tree.children == ["0", "1", "2", "3"]
+    assert [tree.tags[item] for item in tree.children] == [("evenrow",), ("oddrow",)] * 2
+
+
+def test_one_edited_row_is_one_update():
+    tree = FakeTree()
+    renderer = TreeDiffRenderer(tree)
+    rows = [book(n) for n in range(5)]
+    renderer.render(rows)
+    writes = dict(tree.writes)
+    rows[2] = book(2, author="Someone Else")
+    assert renderer.render(rows) == no_changes(updated=1)
+    assert tree.writes == {**writes, 'values': writes['values'] + 1}
+    assert tree.values["2"][2] == "Someone Else"
+
+
+def test_moves_and_restriping_are_counted():
+    tree = FakeTree()
+    renderer = TreeDiffRenderer(tree)
+    renderer.render([book(n) for n in range(4)])
+    # Swapping two rows moves both and flips their parity
+    assert renderer.render([book(n) for n in (1, 0, 2, 3)]) == no_changes(moved=2, restriped=2)
+    assert tree.children == ["1", "0", "2", "3"]
+    assert [tree.tags[item][0] for item in tree.children] == ["evenrow", "oddrow"] * 2
+
+
+def test_insert_and_delete_restripe_only_the_rows_below():
+    tree = FakeTree()
+    renderer = TreeDiffRenderer(tree)
+    renderer.render([book(n) for n in (0, 2, 3)])
+    assert renderer.render([book(n) for n in (0, 1, 2, 3)]) == no_changes(inserted=1, restriped=2)
+    assert tree.children == ["0", "1", "2", "3"] and tree.writes['set_children'] == 0
+    renderer.remove("0")
+    assert tree.children == ["1", "2", "3"]
+    assert [tree.tags[item][0] for item in tree.children] == ["evenrow", "oddrow", "evenrow"]
+    # Sliding the window by one row flips every row
+    assert renderer.render([book(n) for n in (1, 2, 3)], offset=1) == no_changes(restriped=3)
+
+
+def test_patch_rewrites_and_drops_rows_in_place():
+    tree = FakeTree()
+    renderer = TreeDiffRenderer(tree)
+    renderer.render([book(n) for n in range(4)])
+    renderer.patch({3: book(3, "Renamed")}, removed={1})
+    assert tree.children == ["0", "2", "3"] and tree.values["3"][1] == "Renamed"
+
+
+def make_view(db, count=25, page_size=5, max_pages=2):
+    add_books(db, count)
+    tree = FakeTree()
+    view = VirtualBookView(tree, scrollbar=SimpleNamespace(set=lambda first, last: None),
+                           page_size=page_size, max_pages=max_pages)
+    assert view.show(db.get_books_page) == page_size
+    return view, tree
+
+
+def shown(tree):
+    return [tree.values[item][1] for item in tree.children]
+
+
+def test_scrolling_slides_a_bounded_window(db):
+    view, tree = make_view(db)
+    assert shown(tree) == [f"Book {n:03d}" for n in range(5)] and not view.at_end
+
+    for _ in range(2):
+        view._on_scroll(0.5, 0.95)
+        tree.run_idle()
+    # Two pages at most: the first page was dropped from the top
+    assert shown(tree) == [f"Book {n:03d}" for n in range(5, 15)]
+    assert view.offset == 5 and not view.at_start
+    assert [tree.tags[item][0] for item in tree.children[:2]] == ["oddrow", "evenrow"]
+
+    view._on_scroll(0.02, 0.5)
+    tree.run_idle()
+    assert shown(tree) == [f"Book {n:03d}" for n in range(10)]
+    assert view.offset == 0 and not view.at_end
+    # A full page may not be the first; an empty one before it settles that
+    view._on_scroll(0.02, 0.5)
+    tree.run_idle()
+    assert view.at_start and len(shown(tree)) == 10
+
+
+def test_reload_after_an_edit_rewrites_one_row(db):
+    view, tree = make_view(db)
+    writes = dict(tree.writes)
+    book_id = int(tree.children[3])
+    db.update_book(book_id, "Book 003", "New Author", "Fiction")
+    view.reload()
+    assert tree.writes == {**writes, 'values': writes['values'] + 1}
+    assert tree.values[str(book_id)][2] == "New Author"
+
+
+def test_pages_of_a_replaced_source_are_dropped(db):
+    add_books(db, 12)
+    submitted = []
+    runner = SimpleNamespace(submit=lambda callback, fn, **kwargs: submitted.append((callback, fn(**kwargs))))
+    tree = FakeTree()
+    view = VirtualBookView(tree, scrollbar=SimpleNamespace(set=lambda first, last: None), page_size=5,
+                           runner=runner)
+    view.show(db.get_books_page)
+    view._on_scroll(0.5, 0.95)
+    tree.run_idle()
+    view.show(lambda **kwargs: [], first_rows=[book(99)])
+    callback, rows = submitted[0]
+    callback(rows, None)
+    assert tree.children == ["99"]
@@ -0,0 +1,39 @@
+"""Migrations: applied once, kept when the database is reopened, and plans stay index-backed."""
+from conftest import add_books
+
+from migrations import MIGRATIONS, MigrationRunner, check_query_plans
+
+
+def indexes(db):
+    return {row[0] for row in db.execute_query("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_every_migration_is_applied_once(db):
+    assert [migration.version for migration in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1))
+    runner = MigrationRunner(db)
+    assert sorted(runner.applied()) == [migration.version for migration in MIGRATIONS]
+    assert runner.pending() == []
+    assert runner.apply() == []
+
+
+def test_reopening_keeps_migrated_schema(make_db):
+    first = make_db()
+    assert 'idx_title_cover' in indexes(first)
+    assert 'idx_title' not in indexes(first)
+    # A new backend opens the same file; the baseline script must not undo migration 1
+    assert 'idx_title' not in indexes(make_db())
+
+
+def test_new_client_opens_while_a_write_is_pending(make_db):
+    writer = make_db()
+    reader = make_db(database={'busy_timeout': '0.5'})
+    with writer.transaction():
+        writer.add_book("Pending", "A", "Fiction")
+        assert reader.get_all_books() == []
+    assert len(reader.get_all_books()) == 1
+
+
+def test_query_plans_use_indexes(db, capsys):
+    add_books(db, 50)
+    assert check_query_plans(db) == 0
+    assert "FAIL" not in capsys.readouterr().out
@@ -0,0 +1,64 @@
+"""Keyset pagination: pages follow (title, book_id) order in both directions."""
+from conftest import add_books
+
+
+def expected_order(db):
+    return sorted(db.execute_query("SELECT book_id, title, author, genre FROM books"), key=lambda row: (row[1], row[0]))
+
+
+def add_duplicates(db):
+    add_books(db, 25)
+    # Equal titles are ordered by book_id, so pages must not skip or repeat them
+    for number in range(5):
+        db.add_book("Book 010", f"Other {number}", "Poetry", 2000)
+
+
+def test_forward_pages_cover_the_table_once(db):
+    add_duplicates(db)
+    rows, after = [], None
+    while True:
+        page = db.get_books_page(after=after, page_size=4)
+        rows.extend(page)
+        if len(page) < 4:
+            break
+        after = (page[-1][1], page[-1][0])
+    assert rows == expected_order(db)
+
+
+def test_backward_pages_mirror_forward_pages(db):
+    add_duplicates(db)
+    expected = expected_order(db)
+    rows = []
+    page = db.get_books_page(after=(expected[-5][1], expected[-5][0]), page_size=4)
+    assert page == expected[-4:]
+    before = (page[0][1], page[0][0])
+    while True:
+        page = db.get_books_page(before=before, page_size=4)
+        rows[:0] = page
+        if len(page) < 4:
+            break
+        before = (page[0][1], page[0][0])
+    assert rows == expected[:-4]
+
+
+def test_after_and_before_bound_a_window(db):
+    add_duplicates(db)
+    expected = expected_order(db)
+    after, before = expected[3], expected[10]
+    page = db.get_books_page(after=(after[1], after[0]), before=(before[1], before[0]), page_size=100)
+    assert page == expected[4:10]
+
+
+def test_iter_books_matches_the_table_order(db):
+    add_duplicates(db)
+    assert list(db.iter_books(page_size=3)) == expected_order(db)
+
+
+def test_search_pages_follow_title_order(db):
+    add_duplicates(db)
+    expected = [row for row in expected_order(db) if row[3] == "Poetry"]
+    page = db.search_books_page("Poetry", page_size=2)
+    assert page == expected[:2]
+    page = db.search_books_page("Poetry", after=(page[-1][1], page[-1][0]), page_size=2)
+    assert page == expected[2:4]
+    assert list(db.iter_search_books("Poetry", page_size=2)) == expected
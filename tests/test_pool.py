@@ -0,0 +1,112 @@
+"""Connection pool: bounded size, liveness checks, and clean connections handed back."""
+import threading
+import time
+
+import pytest
+from conftest import add_books
+
+from backends import PoolError
+from database import ConnectionPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def is_connected(self):
+        return self.alive
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.alive = False
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect(**config):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    return ConnectionPool({}, connect, **kwargs), opened
+
+
+def test_min_size_is_opened_and_max_size_is_a_limit():
+    pool, opened = make_pool(min_size=2, max_size=3, checkout_timeout=0.05)
+    assert len(opened) == 2
+    held = [pool.get_connection() for _ in range(3)]
+    assert len(set(map(id, held))) == 3
+    with pytest.raises(PoolError):
+        pool.get_connection()
+    stats = pool.get_stats()
+    assert (stats['size'], stats['in_use'], stats['waits']) == (3, 3, 1)
+
+
+def test_waiting_checkout_gets_a_released_connection():
+    pool, _ = make_pool(min_size=0, max_size=1, checkout_timeout=5)
+    connection = pool.get_connection()
+    threading.Timer(0.05, pool.release, (connection,)).start()
+    assert pool.get_connection() is connection
+
+
+def test_dead_connections_are_replaced():
+    pool, opened = make_pool(min_size=1, max_size=1)
+    opened[0].alive = False
+    connection = pool.get_connection()
+    assert connection is opened[1]
+    assert pool.get_stats()['failed_liveness_checks'] == 1
+
+
+def test_release_rolls_back_an_open_transaction():
+    pool, _ = make_pool(min_size=1, max_size=1)
+    connection = pool.get_connection()
+    connection.in_transaction = True
+    pool.release(connection)
+    assert connection.rollbacks == 1
+    assert pool.get_connection() is connection
+
+
+def test_idle_connections_above_min_size_are_evicted():
+    pool, opened = make_pool(min_size=1, max_size=3, idle_timeout=0.01)
+    held = [pool.get_connection() for _ in range(3)]
+    for connection in held:
+        pool.release(connection)
+    time.sleep(0.02)
+    pool.get_connection()
+    stats = pool.get_stats()
+    assert stats['evictions'] == 2
+    assert stats['size'] == 1
+
+
+def test_closed_pool_refuses_checkouts():
+    pool, opened = make_pool(min_size=2, max_size=2)
+    pool.close()
+    assert not any(connection.alive for connection in opened)
+    with pytest.raises(PoolError):
+        pool.get_connection()
+    with pytest.raises(ValueError):
+        make_pool(min_size=3, max_size=2)
+
+
+def test_threads_share_a_pooled_connection(make_db):
+    db = make_db(pool={'enabled': 'true', 'min_size': '1', 'max_size': '3'})
+    add_books(db, 10)
+    results = []
+
+    def read():
+        for _ in range(20):
+            results.append(len(db.get_all_books()))
+
+    threads = [threading.Thread(target=read) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [10] * 120
+    stats = db.get_pool_stats()
+    assert stats['size'] <= 3 and stats['in_use'] == 0
@@ -0,0 +1,60 @@
+"""Query instrumentation: per-statement and per-action counters, and a redacted slow-query log."""
+import logging
+
+from conftest import add_books
+
+from query_stats import LatencyHistogram, QueryStats
+
+
+def test_statements_are_counted_under_normalized_sql(db):
+    add_books(db, 3)
+    db.reset_query_stats()
+    db.execute_query("SELECT   title\n FROM books")
+    db.execute_query("SELECT title FROM books")
+    stats = db.get_query_stats()['statements']["SELECT title FROM books"]
+    assert (stats['count'], stats['rows'], stats['errors']) == (2, 6, 0)
+
+
+def test_errors_and_actions(db):
+    db.reset_query_stats()
+    with db.query_stats.action('shelve'):
+        db.add_book("Dune", "Frank Herbert", "Science Fiction")
+        assert db.execute_query("SELECT * FROM no_such_table") is None
+    snapshot = db.get_query_stats(reset=True)
+    assert snapshot['actions']['shelve']['errors'] == 1
+    assert snapshot['actions']['shelve']['count'] >= 2
+    assert sum(snapshot['errors'].values()) == 1
+    assert db.get_query_stats()['statements'] == {}
+
+
+def test_slow_queries_are_logged_without_parameters(make_db, caplog):
+    db = make_db(stats={'slow_query_ms': '0'})
+    with caplog.at_level(logging.WARNING, logger='database.slow_query'):
+        db.execute_query("SELECT title FROM books WHERE author = %s", ("secret patron",))
+    assert db.get_query_stats()['slow_queries'] >= 1
+    assert "[1 parameters redacted]" in caplog.text
+    assert "secret patron" not in caplog.text
+
+
+def test_disabled_stats(make_db):
+    db = make_db(stats={'enabled': 'false'})
+    assert db.get_query_stats() is None
+
+
+def test_percentiles_are_bucket_bounds():
+    histogram = LatencyHistogram()
+    for elapsed_ms in [0.05] * 90 + [3] * 9 + [20000]:
+        histogram.add(elapsed_ms)
+    assert histogram.percentile(0.5) == 0.1
+    assert histogram.percentile(0.95) == 5
+    assert histogram.percentile(1.0) == 20000
+    assert LatencyHistogram().percentile(0.5) == 0.0
+
+
+def test_top_statements_rank_by_field():
+    stats = QueryStats()
+    for _ in range(3):
+        stats.record("SELECT 1", 0.001)
+    stats.record("SELECT 2", 0.5)
+    assert [sql for sql, _ in stats.top_statements(by='count')] == ["SELECT 1", "SELECT 2"]
+    assert [sql for sql, _ in stats.top_statements(count=1)] == ["SELECT 2"]
@@ -0,0 +1,43 @@
+"""Read replicas: catalogue reads go to replicas, writes and fresh reads to the primary."""
+from conftest import add_books
+
+
+# Replicas that fail twice are left out for a minute
+EJECT = {'eject_after': 2, 'eject_for': 60}
+
+
+def test_reads_go_to_the_replicas(make_db, tmp_path):
+    # Separate files holding one book stand in for lagging replicas
+    replica = {}
+    for name in ("east", "west"):
+        add_books(make_db(database={'path': tmp_path / f"{name}.sqlite3"}), 1)
+        replica[name] = {'path': tmp_path / f"{name}.sqlite3"}
+    primary = make_db(replica=replica, replicas=EJECT)
+    add_books(primary, 3)
+    assert len(primary.get_all_books()) == 1
+    assert len(primary.get_books_page(page_size=10)) == 1
+    stats = primary.get_replica_stats()
+    assert stats['east']['reads'] + stats['west']['reads'] == 2
+    assert stats['east']['reads'] == stats['west']['reads']
+
+
+def test_transactions_and_recent_writes_read_the_primary(make_db, tmp_path):
+    add_books(make_db(database={'path': tmp_path / "east.sqlite3"}), 1)
+    primary = make_db(replica={'east': {'path': tmp_path / "east.sqlite3"}}, replicas={'read_your_writes': 60, **EJECT})
+    add_books(primary, 3)
+    # add_books wrote just now, so this thread reads its own writes
+    assert len(primary.get_all_books()) == 3
+    with primary.transaction():
+        assert len(primary.get_books_page(page_size=10)) == 3
+    assert primary.get_replica_stats()['east']['reads'] == 0
+
+
+def test_failing_replica_falls_back_and_is_ejected(make_db, tmp_path, capsys):
+    # A directory cannot be opened as a database
+    primary = make_db(replica={'east': {'path': tmp_path}}, replicas=EJECT)
+    add_books(primary, 3)
+    for _ in range(3):
+        assert len(primary.get_all_books()) == 3
+    stats = primary.get_replica_stats()['east']
+    assert (stats['errors'], stats['ejections'], stats['ejected']) == (2, 1, True)
+    assert "Replica east ejected" in capsys.readouterr().out
@@ -0,0 +1,81 @@
+"""Result cache: repeated reads are served from memory until a write invalidates them."""
+from conftest import add_books
+
+from database import ResultCache
+
+
+def test_repeated_read_is_a_hit_and_a_copy(make_db):
+    db = make_db(cache={'enabled': 'true'})
+    add_books(db, 5)
+    first = db.get_all_books()
+    first.clear()
+    assert len(db.get_all_books()) == 5
+    assert db.get_cache_stats()['hits'] == 1
+
+
+def test_write_invalidates_cached_results(make_db):
+    db = make_db(cache={'enabled': 'true'})
+    ids = add_books(db, 5)
+    assert len(db.search_books("Book")) == 5
+    db.add_book("Book 999", "New Author", "Fiction")
+    assert len(db.search_books("Book")) == 6
+    db.delete_book(ids[0])
+    assert len(db.search_books("Book")) == 5
+    db.update_book(ids[1], "Renamed", "Author 1", "Fiction")
+    assert len(db.search_books("Book")) == 4
+
+
+def test_transaction_reads_bypass_the_cache_until_commit(make_db):
+    db = make_db(cache={'enabled': 'true'})
+    add_books(db, 3)
+    assert len(db.get_all_books()) == 3
+    with db.transaction():
+        db.add_book("Book 100", "Author", "Fiction")
+        assert len(db.get_all_books()) == 4
+        # The uncommitted row must not have been cached for other threads
+        assert db.get_cache_stats()['entries'] == 0
+    assert len(db.get_all_books()) == 4
+
+
+def test_rolled_back_write_is_not_served(make_db):
+    db = make_db(cache={'enabled': 'true'})
+    add_books(db, 3)
+    try:
+        with db.transaction():
+            db.add_book("Book 100", "Author", "Fiction")
+            db.get_all_books()
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert len(db.get_all_books()) == 3
+
+
+def test_longer_term_is_filtered_from_a_cached_prefix(make_db):
+    db = make_db(cache={'enabled': 'true'})
+    add_books(db, 30)
+    uncached = make_db()
+    db.search_books("Book 0")
+    for term in ("Book 01", "book 02", "Author 3"):
+        assert db.search_books(term) == uncached.search_books(term)
+    # "Author 3" has no cached prefix and goes to the database
+    assert db.get_cache_stats()['superset_hits'] == 2
+
+
+def test_stale_generation_is_not_stored():
+    cache = ResultCache()
+    generation = cache.generation
+    cache.invalidate()
+    cache.put(('all',), [1], generation)
+    assert cache.get(('all',)) is None
+
+
+def test_entries_expire_and_evict():
+    cache = ResultCache(max_entries=2, ttl=0)
+    cache.put('a', [1], cache.generation)
+    assert cache.get('a') is None
+    assert cache.get_stats()['expirations'] == 1
+    cache = ResultCache(max_entries=2)
+    for key in 'abc':
+        cache.put(key, [key], cache.generation)
+    assert cache.get('a') is None and cache.get('c') == ['c']
+    assert cache.get_stats()['evictions'] == 1
@@ -0,0 +1,127 @@
+"""Statement cache: cursors are reused per connection, prepared ones are bounded and dropped after errors."""
+from backends import BackendError
+from database import ER_UNSUPPORTED_PS, StatementCache, _returns_rows
+
+
+class FakeCursor:
+    def __init__(self, prepared, fail_with=None):
+        self.prepared = prepared
+        self.fail_with = fail_with
+        self.closed = False
+        self.executed = []
+        self.rowcount = 1
+
+    def execute(self, query, params=()):
+        self.executed.append((query, params))
+        if self.fail_with is not None:
+            raise BackendError("statement failed", errno=self.fail_with)
+
+    def fetchall(self):
+        return [(1, "Dune")]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    """Records the cursor() calls made on it; prepared cursors can be made to fail"""
+
+    def __init__(self, prepared_errno=None):
+        self.prepared_errno = prepared_errno
+        self.calls = []
+        self.cursors = []
+        self.commits = 0
+
+    def cursor(self, prepared=False, buffered=False, dictionary=False):
+        self.calls.append({'prepared': prepared, 'buffered': buffered, 'dictionary': dictionary})
+        self.cursors.append(FakeCursor(prepared, self.prepared_errno if prepared else None))
+        return self.cursors[-1]
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_plain_cursors_are_reused_per_row_format():
+    statements = StatementCache()
+    connection = FakeConnection()
+    first = statements.cursor(connection, "SELECT 1")
+    assert statements.cursor(connection, "SELECT 2") is first
+    as_dicts = statements.cursor(connection, "SELECT 1", dictionary=True)
+    assert as_dicts is not first
+    assert connection.calls == [
+        {'prepared': False, 'buffered': True, 'dictionary': False},
+        {'prepared': False, 'buffered': True, 'dictionary': True},
+    ]
+    assert statements.cursor(FakeConnection(), "SELECT 1") is not first
+    assert statements.get_stats() == {'prepares': 0, 'reuses': 1, 'closes': 0}
+
+
+def test_prepared_cursors_beyond_the_limit_are_closed_oldest_first():
+    statements = StatementCache(max_prepared=2)
+    connection = FakeConnection()
+    a = statements.cursor(connection, "SELECT a", prepared=True)
+    b = statements.cursor(connection, "SELECT b", prepared=True)
+    # Using a again makes b the least recently used
+    assert statements.cursor(connection, "SELECT a", prepared=True) is a
+    c = statements.cursor(connection, "SELECT c", prepared=True)
+    assert [cursor.closed for cursor in (a, b, c)] == [False, True, False]
+    assert all(call['prepared'] for call in connection.calls)
+    assert statements.get_stats() == {'prepares': 3, 'reuses': 1, 'closes': 1}
+    # The plain cursor does not count towards max_prepared
+    statements.cursor(connection, "SELECT d")
+    assert not a.closed and not c.closed
+
+
+def test_discarded_cursor_is_closed_and_replaced():
+    statements = StatementCache()
+    connection = FakeConnection()
+    cursor = statements.cursor(connection, "SELECT a", prepared=True)
+    statements.discard(connection, cursor)
+    assert cursor.closed
+    assert statements.cursor(connection, "SELECT a", prepared=True) is not cursor
+
+
+def test_returns_rows_is_cached_by_sql_text():
+    _returns_rows.cache_clear()
+    assert _returns_rows("  select * FROM books")
+    assert _returns_rows("PRAGMA table_info(books)")
+    assert not _returns_rows("UPDATE books SET title = %s")
+    assert not _returns_rows("")
+    assert _returns_rows("  select * FROM books")
+    assert _returns_rows.cache_info().hits == 1
+
+
+def use_connection(db, connection):
+    db._acquire = lambda: (connection, None)
+
+
+def test_execute_query_reuses_the_cursor_across_calls(db):
+    connection = FakeConnection()
+    use_connection(db, connection)
+    assert db.execute_query("SELECT title FROM books", prepared=False) == [(1, "Dune")]
+    assert db.execute_query("UPDATE books SET title = %s", ("Emma",), prepared=False) == 1
+    assert len(connection.cursors) == 1
+    assert connection.cursors[0].executed == [
+        ("SELECT title FROM books", ()),
+        ("UPDATE books SET title = %s", ("Emma",)),
+    ]
+    assert connection.commits == 1
+
+
+def test_unpreparable_statement_falls_back_to_plain_text(db):
+    connection = FakeConnection(prepared_errno=ER_UNSUPPORTED_PS)
+    use_connection(db, connection)
+    assert db.execute_query("SHOW TABLES", prepared=True) == [(1, "Dune")]
+    prepared, plain = connection.cursors
+    assert prepared.closed and prepared.prepared
+    assert not plain.prepared and plain.executed == [("SHOW TABLES", ())]
+    assert db.statements.cursor(connection, "SHOW TABLES", prepared=False) is plain
+
+
+def test_failed_statement_discards_its_cursor(db):
+    connection = FakeConnection(prepared_errno=1064)
+    use_connection(db, connection)
+    assert db.execute_query("SELEC 1", prepared=True) is None
+    assert len(connection.cursors) == 1 and connection.cursors[0].closed
+    assert db.execute_query("SELEC 1", prepared=True) is None
+    assert len(connection.cursors) == 2
@@ -0,0 +1,70 @@
+"""Transactions: blocks commit together, failed blocks and savepoints roll back."""
+import pytest
+
+from backends import TransactionError
+from conftest import add_books
+
+
+def titles(db):
+    return sorted(row[1] for row in db.get_all_books())
+
+
+def test_block_commits_every_write(make_db):
+    db, other = make_db(), make_db()
+    with db.transaction():
+        db.add_book("One", "A", "Fiction")
+        db.add_book("Two", "B", "Fiction")
+        assert titles(other) == []
+    assert titles(other) == ["One", "Two"]
+
+
+def test_exception_rolls_back_the_block(db):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.add_book("One", "A", "Fiction")
+            raise RuntimeError
+    assert titles(db) == []
+
+
+def test_failed_statement_rolls_back_the_block(db):
+    with pytest.raises(TransactionError):
+        with db.transaction():
+            db.add_book("One", "A", "Fiction")
+            assert db.execute_query("INSERT INTO no_such_table VALUES (1)") is None
+    assert titles(db) == []
+
+
+def test_failed_savepoint_keeps_the_outer_block(db):
+    with db.transaction():
+        db.add_book("Kept", "A", "Fiction")
+        with pytest.raises(TransactionError):
+            with db.transaction():
+                db.add_book("Dropped", "B", "Fiction")
+                db.execute_query("INSERT INTO no_such_table VALUES (1)")
+    assert titles(db) == ["Kept"]
+
+
+def test_commit_callbacks_run_only_on_commit(db):
+    ran = []
+    with db.transaction():
+        db._on_commit(lambda: ran.append("outer"))
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db._on_commit(lambda: ran.append("inner"))
+                raise RuntimeError
+        assert ran == []
+    assert ran == ["outer"]
+
+
+def test_unit_of_work_groups_commits(make_db):
+    db, other = make_db(), make_db()
+    with db.unit_of_work(group_size=3):
+        ids = add_books(db, 4)
+        # The first three writes committed as a group, the fourth is pending
+        assert len(other.get_all_books()) == 3
+        assert db.update_book(ids[0], "Renamed", "Author 0", "Fiction")
+    assert len(other.get_all_books()) == 4
+    assert "Renamed" in titles(other)
+    with pytest.raises(ValueError):
+        with db.unit_of_work(group_size=0):
+            pass
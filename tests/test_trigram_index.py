@@ -0,0 +1,72 @@
+"""Tests that the trigram index answers LIKE searches like the database does"""
+import pytest
+
+from text_fold import fold_ascii_case, fold_text
+from trigram_index import TrigramIndex
+
+TITLES = [
+    ("Émile", "Jean-Jacques Rousseau", "Philosophy"),
+    ("emile and the Detectives", "Erich Kästner", "Children"),
+    ("Ångström Units", "Anders Ångström", "Science"),
+    ("The Hobbit", "J.R.R. Tolkien", "Fantasy"),
+    ("Harry Potter", "J.K. Rowling", "Fantasy"),
+    ("A", "B", "C"),
+]
+TERMS = ["e", "E", "é", "É", "em", "emi", "emile", "ÉMILE", "arry", "ARRY", "ång", "ang", "h", "hob", "tolkien",
+         "fantasy", "x", "qz", "the d", "ès"]
+
+
+@pytest.fixture
+def indexed(make_db):
+    plain = make_db()
+    for title, author, genre in TITLES:
+        plain.add_book(title, author, genre)
+    return plain, make_db(search={'mode': 'like', 'trigram_index': 'true'})
+
+
+@pytest.mark.parametrize('term', TERMS)
+def test_index_matches_sqlite_like(indexed, term):
+    plain, db = indexed
+    assert db.search_books(term) == plain.search_books(term)
+
+
+def test_index_is_used_for_short_terms(indexed):
+    _, db = indexed
+    db.search_books("seed")
+    assert db.search_index.loaded
+
+    class NoScan(dict):
+        def __iter__(self):
+            raise AssertionError("scanned every book")
+
+        keys = values = items = __iter__
+
+    db.search_index._text = NoScan(db.search_index._text)
+    assert [row[1] for row in db.search_index.search("RR")] == ["Harry Potter"]
+    assert [row[1] for row in db.search_index.search("ob")] == ["The Hobbit"]
+
+
+def test_mysql_folding_ignores_accents():
+    index = TrigramIndex(fold=fold_text)
+    index.build((book_id, *fields) for book_id, fields in enumerate(TITLES, 1))
+    assert [row[1] for row in index.search("emile")] == ["Émile", "emile and the Detectives"]
+    assert [row[1] for row in index.search("É")] == [row[1] for row in index.search("e")]
+
+
+def test_sqlite_folding_keeps_accents():
+    index = TrigramIndex(fold=fold_ascii_case)
+    index.build((book_id, *fields) for book_id, fields in enumerate(TITLES, 1))
+    assert [row[1] for row in index.search("emile")] == ["emile and the Detectives"]
+    assert [row[1] for row in index.search("Émile")] == ["Émile"]
+
+
+def test_writes_update_short_term_postings(indexed):
+    _, db = indexed
+    assert db.search_books("zq") == []
+    book_id = db.add_book("Zqx", "Someone", "Other")
+    assert [row[0] for row in db.search_books("zq")] == [book_id]
+    db.update_book(book_id, "Plain", "Someone", "Other")
+    assert db.search_books("zq") == []
+    assert [row[0] for row in db.search_books("pl")] == [book_id]
+    db.delete_book(book_id)
+    assert db.search_books("pl") == []
@@ -0,0 +1,33 @@
+"""
+Text folding that reproduces how the database compares strings.
+
+LIKE and the title collation ignore case (and, on MySQL, accents), so the
+in-process indexes and caches fold text before matching or sorting it.
+This module only uses the standard library, so it can be imported before
+the database driver.
+"""
+import unicodedata
+
+
+def fold_text(text):
+    """Case- and accent-insensitive form of text, approximating MySQL's default collation"""
+    text = str(text)
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+
+def fold_ascii_case(text):
+    """Text with only its ASCII letters lowercased, the way SQLite's LIKE and NOCASE compare it"""
+    return str(text).translate(_ASCII_LOWER)
+
+
+# Folds by the name files record them under, e.g. catalogue snapshots
+FOLDS = {
+    'text': fold_text,
+    'ascii_case': fold_ascii_case,
+}
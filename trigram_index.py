@@ -0,0 +1,199 @@
+"""
+In-process trigram index for substring search.
+
+Every sequence of up to three characters of a book's folded title, author
+and genre maps to a sorted array of the book IDs containing it. A term of
+one to three characters is answered by its own posting list, and a longer
+term only looks at the books in the shortest posting list of its
+trigrams and checks their text for the whole term, so no query scans the
+catalogue. Matching follows search_books in 'like' mode: substring match
+on any of the three fields, with text folded the way the backend's LIKE
+compares it, results ordered by title.
+"""
+from array import array
+from bisect import bisect_left, insort
+from functools import lru_cache
+
+from book_index import BookIndex
+from text_fold import fold_text
+
+# Separates the fields in the indexed text, so no match spans two fields
+_SEPARATOR = '\x00'
+
+# Longest indexed sequence; shorter terms are looked up whole
+_GRAM = 3
+
+
+def trigrams(text):
+    """The set of trigrams in a folded text"""
+    return {text[index:index + _GRAM] for index in range(len(text) - _GRAM + 1)}
+
+
+def grams(text):
+    """The set of one-, two- and three-character sequences in a folded text"""
+    return {
+        text[index:index + length]
+        for length in range(1, _GRAM + 1)
+        for index in range(len(text) - length + 1)
+    }
+
+
+class TrigramIndex(BookIndex):
+    """
+    Trigram inverted index over the books table.
+
+    Posting lists are array('I') of sorted book IDs, 4 bytes per entry
+    instead of a Python int object each. Writes update the lists in
+    place, so the index can follow a DatabaseConnection's own writes.
+    """
+
+    def __init__(self, overlap=2.0, fold=fold_text):
+        """
+        Args:
+            overlap (float): Seconds each refresh re-reads before the previous
+                marker, to pick up transactions that committed late
+            fold (callable): Folds text the way the backend's LIKE compares it,
+                e.g. the backend's like_fold
+        """
+        super().__init__(overlap)
+        self.fold = fold
+        # Authors and genres repeat a lot, so their folded grams are cached
+        self._field_grams = lru_cache(maxsize=65536)(self._fold_field)
+        self._postings = {}
+        self._text = {}
+        self._rows = {}
+        self._sort_keys = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _fold_field(self, value):
+        """Folded text and grams of one field"""
+        folded = self.fold(value)
+        return folded, frozenset(grams(folded))
+
+    def _document(self, title, author, genre):
+        """The folded text to match against and its grams"""
+        fields = [self._field_grams(value) for value in (title, author, genre)]
+        text = _SEPARATOR.join(folded for folded, _ in fields)
+        return text, fields[0][1] | fields[1][1] | fields[2][1]
+
+    # Building
+    def build(self, rows):
+        """
+        Replace the index contents
+
+        Args:
+            rows (iterable): (book_id, title, author, genre) tuples
+        """
+        lists = {}
+        texts = {}
+        summaries = {}
+        sort_keys = {}
+        for book_id, title, author, genre in rows:
+            text, book_grams = self._document(title, author, genre)
+            texts[book_id] = text
+            summaries[book_id] = (book_id, title, author, genre)
+            sort_keys[book_id] = (text.partition(_SEPARATOR)[0], book_id)
+            for gram in book_grams:
+                lists.setdefault(gram, []).append(book_id)
+
+        postings = {gram: array('I', sorted(ids)) for gram, ids in lists.items()}
+        with self._lock:
+            self._postings = postings
+            self._text = texts
+            self._rows = summaries
+            self._sort_keys = sort_keys
+
+    # Incremental updates
+    def add(self, book_id, title, author, genre):
+        """Index a book, replacing any previous version of it"""
+        text, new_grams = self._document(title, author, genre)
+        with self._lock:
+            self._rows[book_id] = (book_id, title, author, genre)
+            self._sort_keys[book_id] = (text.partition(_SEPARATOR)[0], book_id)
+            old = self._text.get(book_id)
+            if old == text:
+                return
+            old_grams = self._grams_of(old) if old is not None else frozenset()
+            for gram in old_grams - new_grams:
+                self._discard(gram, book_id)
+            for gram in new_grams - old_grams:
+                postings = self._postings.get(gram)
+                if postings is None:
+                    self._postings[gram] = array('I', (book_id,))
+                elif not postings or postings[-1] < book_id:
+                    # New books get the highest ID, so this is the usual case
+                    postings.append(book_id)
+                else:
+                    insort(postings, book_id)
+            self._text[book_id] = text
+
+    def update(self, book_id, title, author, genre):
+        """Re-index a book that is already indexed; unknown IDs are ignored"""
+        with self._lock:
+            if book_id in self._text:
+                self.add(book_id, title, author, genre)
+
+    def remove(self, book_id):
+        """Drop a book from the index"""
+        with self._lock:
+            text = self._text.pop(book_id, None)
+            if text is None:
+                return
+            del self._rows[book_id]
+            del self._sort_keys[book_id]
+            for gram in self._grams_of(text):
+                self._discard(gram, book_id)
+
+    @staticmethod
+    def _grams_of(text):
+        """Grams of an indexed text, field by field"""
+        found = set()
+        for folded in text.split(_SEPARATOR):
+            found |= grams(folded)
+        return found
+
+    def _discard(self, gram, book_id):
+        postings = self._postings.get(gram)
+        if postings is None:
+            return
+        index = bisect_left(postings, book_id)
+        if index < len(postings) and postings[index] == book_id:
+            del postings[index]
+            if not postings:
+                del self._postings[gram]
+
+    # Search
+    def search(self, search_term):
+        """
+        Find books whose title, author or genre contains search_term
+
+        Args:
+            search_term (str): Term to search for
+
+        Returns:
+            list: (book_id, title, author, genre) ordered by title, or None if
+            the term has LIKE wildcards (or characters) the index cannot reproduce
+        """
+        if any(char in search_term for char in '%_\\' + _SEPARATOR):
+            return None
+        needle = self.fold(search_term)
+
+        with self._lock:
+            if not needle:
+                found = list(self._text)
+            elif len(needle) <= _GRAM:
+                # Short terms are indexed whole, so their posting list is the answer
+                found = list(self._postings.get(needle, ()))
+            else:
+                # Every match is in the shortest posting list. Checking those
+                # books' text directly is cheaper than intersecting the other
+                # lists, and also rejects trigrams that match out of order.
+                candidates = min(
+                    (self._postings.get(gram, ()) for gram in trigrams(needle)), key=len
+                )
+                text = self._text
+                found = [book_id for book_id in candidates if needle in text[book_id]]
+            found.sort(key=self._sort_keys.__getitem__)
+            return [self._rows[book_id] for book_id in found]